@@ -3,13 +3,13 @@ import sys
 import os
 import argparse
 import pandas as pd
-import openmatrix as omx
 import sqlite3
 from itertools import product
 
 # Import modules from core code (two levels up) by setting path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'metamodel_py'))
 import rdr_AESingleRun
+import rdr_DemandCatalog
 import rdr_setup
 import rdr_supporting
 import rdr_CompileAE
@@ -99,13 +99,11 @@ def main():
         raise Exception(("INSUFFICIENT HAZARD INPUT DATA ERROR: missing input files for " +
                          "scenario space defined by {}".format(model_params_file)))
 
-    hazard = pd.read_excel(model_params_file, sheet_name='Hazards',
-                           usecols=['Hazard Event'],
-                           converters={'Hazard Event': str})
+    hazard = rdr_supporting.read_model_params(model_params_file, 'Hazards', logger,
+                                              usecols=['Hazard Event'])
             
-    recovery = pd.read_excel(model_params_file, sheet_name='RecoveryStages',
-                             usecols=['Recovery Stages'],
-                             converters={'Recovery Stages': str})
+    recovery = rdr_supporting.read_model_params(model_params_file, 'RecoveryStages', logger,
+                                                usecols=['Recovery Stages'])
 
     hazard = set(hazard['Hazard Event'].dropna().tolist())
     logger.config("List of hazards: \t{}".format(', '.join(str(e) for e in hazard)))
@@ -141,19 +139,10 @@ def main():
         rdr_AESingleRun.run_AESingleRun(run_params, input_dir, output_dir, cfg, logger)
 
         # run AequilibraE a second time if a 'nocar' trip table exists
-        mtx_fldr = 'matrices'
-        demand_file = os.path.join(input_dir, 'AEMaster', mtx_fldr, run_params['socio'] + '_demand_summed.omx')
-        if not os.path.exists(demand_file):
-            logger.error("DEMAND OMX FILE ERROR: {} could not be found".format(demand_file))
-            raise Exception("DEMAND OMX FILE ERROR: {} could not be found".format(demand_file))
-        f = omx.open_file(demand_file)
-        if 'nocar' in f.list_matrices():
-            f.close()
+        if rdr_DemandCatalog.has_nocar_matrix(run_params['socio'], input_dir, logger):
             run_params['matrix_name'] = 'nocar'
 
             rdr_AESingleRun.run_AESingleRun(run_params, input_dir, output_dir, cfg, logger)
-        else:
-            f.close()
 
     # An AequilibraE run produces one line in the NetSkim CSV
     # This row has to be pulled out of the output file and compiled into the output CSV
@@ -186,9 +175,8 @@ def main():
 def check_hazards_coverage(model_params_file, input_folder, logger):
     logger.info("Start: check_hazards_coverage")
     is_covered = 1
-    hazard_events = pd.read_excel(model_params_file, sheet_name='Hazards',
-                                  usecols=['Hazard Event', 'Filename'],
-                                  converters={'Hazard Event': str, 'Filename': str})
+    hazard_events = rdr_supporting.read_model_params(model_params_file, 'Hazards', logger,
+                                                     usecols=['Hazard Event', 'Filename'])
 
     for index, row in hazard_events.iterrows():
         filename = os.path.join(input_folder, 'Hazards', str(row['Filename']) + '.csv')
@@ -3,13 +3,13 @@ import sys
 import os
 import argparse
 import pandas as pd
-import openmatrix as omx
 import sqlite3
 from itertools import product
 
 # Import modules from core code (two levels up) by setting path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'metamodel_py'))
 import rdr_AESingleRun
+import rdr_DemandCatalog
 import rdr_setup
 import rdr_supporting
 
@@ -84,22 +84,16 @@ def main():
     run_params['run_minieq'] = cfg['run_minieq']  # possibilities: 1 or 0
     run_params['matrix_name'] = 'matrix'  # always run AequilibraE for the default 'matrix'
 
+    # link flows of the baseline network are compared to the TDM run, so traffic assignment is always run
+    cfg['aeq_run_type'] = 'RT'
+
     rdr_AESingleRun.run_AESingleRun(run_params, input_dir, output_dir, cfg, logger)
 
     # run AequilibraE a second time if a 'nocar' trip table exists
-
-    demand_file = os.path.join(input_dir, 'AEMaster', 'matrices', run_params['socio'] + '_demand_summed.omx')
-    if not os.path.exists(demand_file):
-        logger.error("DEMAND OMX FILE ERROR: {} could not be found".format(demand_file))
-        raise Exception("DEMAND OMX FILE ERROR: {} could not be found".format(demand_file))
-    f = omx.open_file(demand_file)
-    if 'nocar' in f.list_matrices():
-        f.close()
+    if rdr_DemandCatalog.has_nocar_matrix(run_params['socio'], input_dir, logger):
         run_params['matrix_name'] = 'nocar'
 
         rdr_AESingleRun.run_AESingleRun(run_params, input_dir, output_dir, cfg, logger)
-    else:
-        f.close()
 
     logger.info("Finished baseline network run")
 
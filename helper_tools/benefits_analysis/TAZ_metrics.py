@@ -10,7 +10,6 @@ import sys
 import os
 import sqlite3
 import pandas as pd
-import openmatrix as omx
 import subprocess
 from itertools import product
 import shutil
@@ -21,6 +20,7 @@ import benefits_analysis_config_reader
 # Import modules from core code (two levels up) by setting path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'metamodel_py'))
 import rdr_AESingleRun
+import rdr_DemandCatalog
 import rdr_setup
 import rdr_supporting
 
@@ -397,10 +397,7 @@ def main():
                 else:
                     nocar = False
                     if os.path.exists(os.path.join(demand_folder, omx_demand_file)):
-                        omx_file = omx.open_file(os.path.join(demand_folder, omx_demand_file))
-                        if 'nocar' in omx_file.list_matrices():
-                            nocar = True
-                        omx_file.close()
+                        nocar = rdr_DemandCatalog.has_nocar_matrix(i, input_dir, logger)
                     elif os.path.exists(os.path.join(demand_folder, nocar_csv_demand_file)):
                         nocar = True
 
@@ -455,10 +452,10 @@ def main():
         else:
             try:
                 if os.path.exists(omx_demand_file):
-                    omx_file = omx.open_file(omx_demand_file)
-                    assert('matrix' in omx_file.list_matrices())
-                    assert('taz' in omx_file.list_mappings())
-                    matrix_shape = omx_file['matrix'].shape
+                    demand_info = rdr_DemandCatalog.get_demand_info(i, input_dir, logger)
+                    assert('matrix' in demand_info['matrices'])
+                    assert('taz' in demand_info['mappings'])
+                    matrix_shape = demand_info['matrices']['matrix']['shape']
                     assert(matrix_shape[0] == matrix_shape[1])
                 elif os.path.exists(csv_demand_file):
                     trips = pd.read_csv(os.path.join(demand_folder, csv_demand_file),
@@ -475,15 +472,14 @@ def main():
                 error_list.append(error_text)
             else:
                 if os.path.exists(omx_demand_file):
-                    if 'nocar' in omx_file.list_matrices():
+                    if 'nocar' in demand_info['matrices']:
                         try:
-                            matrix_shape = omx_file['nocar'].shape
+                            matrix_shape = demand_info['matrices']['nocar']['shape']
                             assert(matrix_shape[0] == matrix_shape[1])
                         except:
                             error_text = "DEMAND FILE ERROR: OMX file 'nocar' trip table is not square for socio {}".format(i)
                             logger.error(error_text)
                             error_list.append(error_text)
-                    omx_file.close()
                 elif os.path.exists(csv_demand_file):
                     if os.path.exists(nocar_csv_demand_file):
                         try:
@@ -533,24 +529,21 @@ def main():
     run_params['run_minieq'] = TAZ_metrics_cfg['run_minieq']
     run_params['matrix_name'] = 'matrix'  # always run AequilibraE for the default 'matrix'
 
-    # Method rdr_AESingleRun.run_AESingleRun runs both 'SP' and 'RT'; TAZ metrics notebook uses config file parameter to pull correct skims from outputs
+    # Method rdr_AESingleRun.run_AESingleRun runs 'SP', and 'RT' unless aeq_run_type is 'SP'; TAZ metrics notebook uses config file parameter to pull correct skims from outputs
+    # TAZ metrics runs are written to the benefits analysis directory, so they are run with the run type of the TAZ metrics config file rather than the RDR config file
+    cfg['aeq_run_type'] = TAZ_metrics_cfg['run_type']
+    # Transit metrics are calculated from the routing link flows (see rdr_setup.py), so they are not calculated for 'SP'
+    if cfg['aeq_run_type'] == 'SP' and cfg['calc_transit_metrics']:
+        logger.warning("TAZ metrics run_type is 'SP', so transit metrics are not calculated for the TAZ metrics runs")
+        cfg['calc_transit_metrics'] = False
     # Determining whether run has already been done takes place within run_AESingleRun method
     rdr_AESingleRun.run_AESingleRun(run_params, input_dir, output_dir, cfg, logger)
 
     # Run AequilibraE a second time if a 'nocar' trip table exists
-    mtx_fldr = 'matrices'
-    demand_file = os.path.join(input_dir, 'AEMaster', mtx_fldr, run_params['socio'] + '_demand_summed.omx')
-    if not os.path.exists(demand_file):
-        logger.error("DEMAND OMX FILE ERROR: {} could not be found".format(demand_file))
-        raise Exception("DEMAND OMX FILE ERROR: {} could not be found".format(demand_file))
-    f = omx.open_file(demand_file)
-    if 'nocar' in f.list_matrices():
-        f.close()
+    if rdr_DemandCatalog.has_nocar_matrix(run_params['socio'], input_dir, logger):
         run_params['matrix_name'] = 'nocar'
         # Determining whether run has already been done takes place within run_AESingleRun method
         rdr_AESingleRun.run_AESingleRun(run_params, input_dir, output_dir, cfg, logger)
-    else:
-        f.close()
 
     logger.info("Finished running AequilibraE for baseline 'no action' scenario")
 
@@ -559,24 +552,15 @@ def main():
     run_params['resil'] = TAZ_metrics_cfg['resil']
     run_params['matrix_name'] = 'matrix'  # always run AequilibraE for the default 'matrix'
 
-    # Method rdr_AESingleRun.run_AESingleRun runs both 'SP' and 'RT'; TAZ metrics notebook uses config file parameter to pull correct skims from outputs
+    # Method rdr_AESingleRun.run_AESingleRun runs 'SP', and 'RT' unless aeq_run_type is 'SP'; TAZ metrics notebook uses config file parameter to pull correct skims from outputs
     # Determining whether run has already been done takes place within run_AESingleRun method
     rdr_AESingleRun.run_AESingleRun(run_params, input_dir, output_dir, cfg, logger)
 
     # Run AequilibraE a second time if a 'nocar' trip table exists
-    mtx_fldr = 'matrices'
-    demand_file = os.path.join(input_dir, 'AEMaster', mtx_fldr, run_params['socio'] + '_demand_summed.omx')
-    if not os.path.exists(demand_file):
-        logger.error("DEMAND OMX FILE ERROR: {} could not be found".format(demand_file))
-        raise Exception("DEMAND OMX FILE ERROR: {} could not be found".format(demand_file))
-    f = omx.open_file(demand_file)
-    if 'nocar' in f.list_matrices():
-        f.close()
+    if rdr_DemandCatalog.has_nocar_matrix(run_params['socio'], input_dir, logger):
         run_params['matrix_name'] = 'nocar'
         # Determining whether run has already been done takes place within run_AESingleRun method
         rdr_AESingleRun.run_AESingleRun(run_params, input_dir, output_dir, cfg, logger)
-    else:
-        f.close()
 
     logger.info("Finished running AequilibraE for resilience project scenario")
 
@@ -711,8 +695,8 @@ def setup_sql_nodes(input_dir, logger):
         logger.error("SQLITE DB ERROR: {} could not be found".format(network_db))
         raise Exception("SQLITE DB ERROR: {} could not be found".format(network_db))
     else:
-        df_node = pd.read_csv(node_file, usecols=['node_id', 'x_coord', 'y_coord', 'node_type'],
-                              converters={'node_id': str, 'x_coord': float, 'y_coord': float, 'node_type': str})
+        df_node = rdr_supporting.read_typed_csv(node_file, 'node', logger,
+                                                usecols=['node_id', 'x_coord', 'y_coord', 'node_type'])
 
         with sqlite3.connect(network_db) as db_con:
             # Use to_sql to import df_node as table named GMNS_node
@@ -5,10 +5,12 @@ import datetime
 import csv
 import configparser
 import logging
+import numpy as np
 from scipy import stats
 
 # Import modules from core code (two levels up) by setting path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'metamodel_py'))
+import rdr_BinLookup
 
 # The following code takes a GIS-based raster data set representing exposure data (such as a flood depth grid data set
 # and determines the maximum exposure value for each segment in a given transportation network within a user-specified
@@ -398,46 +400,45 @@ def exposure_grid_overlay(cfg, logger):
         # Use manual approach where a user-defined CSV lists the range of values and the link availability associated
         # with each range
         # Minimum (inclusive) and maximum (exclusive) value must be defined for each range.
-        with arcpy.da.UpdateCursor("network_with_exposure_lyr", ['grid_code', 'link_availability']) as ucursor:
+        bin_lookup = rdr_BinLookup.read_bin_lookup(link_availability_csv)
+        oids = []
+        grid_codes = []
+        with arcpy.da.SearchCursor("network_with_exposure_lyr", ['OID@', 'grid_code']) as scursor:
+            for gis_row in scursor:
+                oids.append(gis_row[0])
+                grid_codes.append(gis_row[1])
+        # Set to fully available if the value is not in the table
+        link_availability = dict(zip(oids, rdr_BinLookup.lookup_bin_values(bin_lookup,
+                                                                           np.array(grid_codes, dtype=float),
+                                                                           default=1)))
+        with arcpy.da.UpdateCursor("network_with_exposure_lyr", ['OID@', 'link_availability']) as ucursor:
             for gis_row in ucursor:
-                # Read through the CSV
-                # for line in CSV
-                with open(link_availability_csv, 'r') as rf:
-                    line_num = 1
-                    for line in rf:
-                        if line_num > 1:
-                            csv_row = line.rstrip('\n').split(',')
-                            if gis_row[0] is not None:
-                                if float(csv_row[0]) <= float(gis_row[0]) < float(csv_row[1]):
-                                    gis_row[1] = csv_row[2]
-                        line_num += 1
-                # Set to fully available if the value is not in the table
-                if gis_row[1] is None:
-                    gis_row[1] = 1
+                gis_row[1] = link_availability[gis_row[0]]
                 ucursor.updateRow(gis_row)
 
     if link_availability_approach == 'facility_type_manual':
         # Use manual approach where a user-defined CSV lists the range of values and the link availability associated
         # with each range for every facility type
         # Minimum (inclusive) and maximum (exclusive) value must be defined for each range.
-        with arcpy.da.UpdateCursor("network_with_exposure_lyr", ['grid_code', 'facility_type', 'link_availability']) as ucursor:
+        # Facility types are compared as numbers
+        bin_lookup = rdr_BinLookup.read_bin_lookup(link_availability_csv, keyed=True, key_type=float)
+        oids = []
+        grid_codes = []
+        facility_types = []
+        with arcpy.da.SearchCursor("network_with_exposure_lyr", ['OID@', 'grid_code', 'facility_type']) as scursor:
+            for gis_row in scursor:
+                oids.append(gis_row[0])
+                grid_codes.append(gis_row[1])
+                facility_types.append(gis_row[2])
+        # Segments with no exposure or no facility type are not in any range
+        # Set to fully available if the value is not in the table
+        link_availability = dict(zip(oids, rdr_BinLookup.lookup_bin_values(bin_lookup,
+                                                                           np.array(grid_codes, dtype=float),
+                                                                           keys=np.array(facility_types, dtype=float),
+                                                                           default=1)))
+        with arcpy.da.UpdateCursor("network_with_exposure_lyr", ['OID@', 'link_availability']) as ucursor:
             for gis_row in ucursor:
-                # Read through the CSV
-                # for line in CSV
-                with open(link_availability_csv, 'r') as rf:
-                    line_num = 1
-                    for line in rf:
-                        if line_num > 1:
-                            csv_row = line.rstrip('\n').split(',')
-                            if gis_row[0] is not None and gis_row[1] is not None:
-                            # The above ensures we skip segments with no exposure and no facility type
-                                if float(gis_row[1]) == float(csv_row[0]):
-                                    if float(csv_row[1]) <= float(gis_row[0]) < float(csv_row[2]):
-                                        gis_row[2] = csv_row[3]
-                        line_num += 1
-                # Set to fully available if the value is not in the table
-                if gis_row[2] is None:
-                    gis_row[2] = 1
+                gis_row[1] = link_availability[gis_row[0]]
                 ucursor.updateRow(gis_row)
 
     if link_availability_approach == 'beta_distribution_function':
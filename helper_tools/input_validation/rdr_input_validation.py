@@ -13,13 +13,13 @@ import shutil
 import logging
 import sqlite3
 import pandas as pd
-import openmatrix as omx
 from itertools import product
 import numpy as np
 import datetime
 
 # Import modules from core code (two levels up) by setting path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'metamodel_py'))
+import rdr_DemandCatalog
 import rdr_setup
 import rdr_supporting
 
@@ -521,10 +521,7 @@ def main():
                             else:
                                 nocar = False
                                 if os.path.exists(os.path.join(demand_folder, omx_demand_file)):
-                                    omx_file = omx.open_file(os.path.join(demand_folder, omx_demand_file))
-                                    if 'nocar' in omx_file.list_matrices():
-                                        nocar = True
-                                    omx_file.close()
+                                    nocar = rdr_DemandCatalog.has_nocar_matrix(i, input_folder, logger)
                                 elif os.path.exists(os.path.join(demand_folder, nocar_csv_demand_file)):
                                     nocar = True
 
@@ -622,10 +619,10 @@ def main():
                 else:
                     try:
                         if omx_demand_file in demand_file_list:
-                            omx_file = omx.open_file(os.path.join(demand_folder, omx_demand_file))
-                            assert('matrix' in omx_file.list_matrices())
-                            assert('taz' in omx_file.list_mappings())
-                            matrix_shape = omx_file['matrix'].shape
+                            demand_info = rdr_DemandCatalog.get_demand_info(i, input_folder, logger)
+                            assert('matrix' in demand_info['matrices'])
+                            assert('taz' in demand_info['mappings'])
+                            matrix_shape = demand_info['matrices']['matrix']['shape']
                             assert(matrix_shape[0] == matrix_shape[1])
                         elif csv_demand_file in demand_file_list:
                             trips = pd.read_csv(os.path.join(demand_folder, csv_demand_file),
@@ -642,15 +639,14 @@ def main():
                         error_list.append(error_text)
                     else:
                         if omx_demand_file in demand_file_list:
-                            if 'nocar' in omx_file.list_matrices():
+                            if 'nocar' in demand_info['matrices']:
                                 try:
-                                    matrix_shape = omx_file['nocar'].shape
+                                    matrix_shape = demand_info['matrices']['nocar']['shape']
                                     assert(matrix_shape[0] == matrix_shape[1])
                                 except:
                                     error_text = "DEMAND FILE ERROR: OMX file 'nocar' trip table is not square for socio {}".format(i)
                                     logger.error(error_text)
                                     error_list.append(error_text)
-                            omx_file.close()
                         elif csv_demand_file in demand_file_list:
                             if nocar_csv_demand_file in demand_file_list:
                                 try:
@@ -95,6 +95,24 @@ param_list.append(aeq_max_iter)
 aeq_rgap_target = Param('aeq_rgap_target', dtype = 'float', value = 0.01, required = False, short = 'agt')
 param_list.append(aeq_rgap_target)
 
+parallel_workers = Param('parallel_workers', dtype = 'int', value = 1, required = False, short = 'pwk')
+param_list.append(parallel_workers)
+
+run_folder_provisioning = Param('run_folder_provisioning', dtype = 'options', value = 'copy', required = False, options = ['copy', 'link'], short = 'rfp')
+param_list.append(run_folder_provisioning)
+
+aeq_graph_source = Param('aeq_graph_source', dtype = 'options', value = 'database', required = False, options = ['database', 'dataframe'], short = 'ags')
+param_list.append(aeq_graph_source)
+
+intermediate_format = Param('intermediate_format', dtype = 'options', value = 'csv', required = False, options = ['csv', 'parquet', 'feather'], short = 'itf')
+param_list.append(intermediate_format)
+
+save_debug_demand = Param('save_debug_demand', dtype = 'options', value = 0, required = False, options = [0, 1], short = 'sdd')
+param_list.append(save_debug_demand)
+
+gis_output = Param('gis_output', dtype = 'options', value = 'per_run', required = False, options = ['per_run', 'shared'], short = 'gso')
+param_list.append(gis_output)
+
 # ===================
 # DISRUPTION VALUES
 # ===================
@@ -650,7 +650,7 @@ def set_metamodel_1(go_to:str = 'sequential') -> None:
 
 def set_metamodel_2(go_to:str = 'sequential') -> None:
     parameter = params.aeq_run_type
-    message = 'Set AequilibraE model run type. SP is shortest path and RT is routing (default).'
+    message = 'Set AequilibraE model run type. SP is shortest path and RT is routing (default). SP skips traffic assignment, so no link flows are produced.'
     if go_to in [parameter.short, 'sequential']:
         params.current_param.value = parameter.short
         uinput = ut.build_input(parameter, message)
@@ -713,6 +713,66 @@ def set_metamodel_3(go_to:str = 'sequential') -> None:
         go_to = 'sequential'
         params.previous_param.value = parameter.short
 
+    parameter = params.parallel_workers
+    message = 'Parallel Workers for AequilibraE Runs\nDefines the number of AequilibraE runs executed at the same time in separate processes. Default value is 1 if left blank.\nA larger number will reduce runtime on machines with multiple cores, but will increase memory use.'
+    if go_to in [parameter.short, 'sequential']:
+        params.current_param.value = parameter.short
+        uinput = ut.build_input(parameter, message, low = 1, high = 1024)
+        if uinput != '':
+            parameter.value = uinput
+        go_to = 'sequential'
+        params.previous_param.value = parameter.short
+
+    parameter = params.run_folder_provisioning
+    message = "Run Folder Provisioning for AequilibraE Runs\nDefines how each AequilibraE run folder is set up from the AEMaster folder. Options are: \n'copy' (default) = Copy the AEMaster folder and demand OMX file into every run folder. \n'link' = Clone a trimmed template of the AequilibraE project database and link read-only files such as the demand OMX file instead of copying them. Reduces disk use and runtime for large numbers of runs."
+    if go_to in [parameter.short, 'sequential']:
+        params.current_param.value = parameter.short
+        uinput = ut.build_input(parameter, message)
+        if uinput != '':
+            parameter.value = uinput
+        go_to = 'sequential'
+        params.previous_param.value = parameter.short
+
+    parameter = params.aeq_graph_source
+    message = "AequilibraE Graph Source\nDefines how the AequilibraE graph of each run is built. Options are: \n'database' (default) = Fill the links table of the AequilibraE project database and build the graphs of all modes from it. \n'dataframe' = Build the car graph directly from the network links table of the run, skipping the project database links table."
+    if go_to in [parameter.short, 'sequential']:
+        params.current_param.value = parameter.short
+        uinput = ut.build_input(parameter, message)
+        if uinput != '':
+            parameter.value = uinput
+        go_to = 'sequential'
+        params.previous_param.value = parameter.short
+
+    parameter = params.intermediate_format
+    message = "Intermediate File Format for AequilibraE Runs\nDefines the file format of the network links, link availability, and link flow tables written in each AequilibraE run folder. Options are: \n'csv' (default) = CSV files, readable in any text editor or spreadsheet (useful for debugging). \n'parquet' = Parquet files with typed columns, smaller and faster to read and write. \n'feather' = Feather files with typed columns, fastest to read and write."
+    if go_to in [parameter.short, 'sequential']:
+        params.current_param.value = parameter.short
+        uinput = ut.build_input(parameter, message)
+        if uinput != '':
+            parameter.value = uinput
+        go_to = 'sequential'
+        params.previous_param.value = parameter.short
+
+    parameter = params.save_debug_demand
+    message = "Save Debug Demand Tables\nIf demand is provided as CSV files instead of an OMX file, the CSV files are converted to an OMX file by the first AequilibraE run.\n0 (default) skips writing debug tables.\n1 also writes the converted matrices as full O-D tables in the output directory for debugging. The debug tables can be very large for regional networks."
+    if go_to in [parameter.short, 'sequential']:
+        params.current_param.value = parameter.short
+        uinput = ut.build_input(parameter, message)
+        if uinput != '':
+            parameter.value = uinput
+        go_to = 'sequential'
+        params.previous_param.value = parameter.short
+
+    parameter = params.gis_output
+    message = "GIS Output of AequilibraE Runs\nDefines how the GIS files of the network links and nodes are written by AequilibraE runs if TrueShape.csv is provided. Options are: \n'per_run' (default) = Write link_flow_full.json (GeoJSON of the network links with link flows) and node.json in each run folder. \n'shared' = Write the link geometry of each network and the nodes once as FlatGeobuf files in the aeq_runs/gis folder, to be joined on link_id with the link_flow_full table of each run."
+    if go_to in [parameter.short, 'sequential']:
+        params.current_param.value = parameter.short
+        uinput = ut.build_input(parameter, message)
+        if uinput != '':
+            parameter.value = uinput
+        go_to = 'sequential'
+        params.previous_param.value = parameter.short
+
     os.system('cls')
     set_disruption_1(go_to)
 
@@ -45,7 +45,7 @@ def main():
     help_text = """
     The command-line input expected for this script is as follows:
 
-    TheFilePathOfThisScript ConfigFilePath TaskToRun
+    TheFilePathOfThisScript ConfigFilePath TaskToRun [--parallel_workers N]
 
     Valid values of TaskToRun include:
 
@@ -60,6 +60,7 @@ def main():
             -calc_link_availability method determines disruption on each link
             -create_network_link_csv method creates disrupted network file for AequilibraE
             -load disrupted network for AequilibraE
+            -runs are executed in parallel if parallel_workers (config file or --parallel_workers argument) is above 1
             aeq_compile: compile core model results across all runs
 
             # Regression
@@ -87,7 +88,10 @@ def main():
     parser.add_argument("task", choices=("lhs", "aeq_run", "aeq_compile", "rr",
                                          "recov_init", "recov_calc", "o", "test"), type=str)
 
-    if len(sys.argv) == 3:
+    parser.add_argument("--parallel_workers", help="Number of AequilibraE runs to execute at the same time in the aeq_run task (overrides config file)",
+                        type=int, default=None)
+
+    if len(sys.argv) >= 3:
         args = parser.parse_args()
     else:
         parser.print_help()
@@ -111,6 +115,13 @@ def main():
         print('ERROR: config file {} is not an accepted format!'.format(args.config_file))
         sys.exit()
 
+    # command-line override of number of parallel AequilibraE workers
+    if args.parallel_workers is not None:
+        if args.parallel_workers <= 0:
+            error_list.append("COMMAND LINE ERROR: {} is an invalid value for parallel_workers, should be an integer greater than zero".format(str(args.parallel_workers)))
+        else:
+            cfg['parallel_workers'] = args.parallel_workers
+
     # set up file directories
     # ----------------------------------------------------------------------------------------------
     input_folder = cfg['input_dir']
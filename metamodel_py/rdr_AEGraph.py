@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+
+# ---------------------------------------------------------------------------------------------------
+# Name: rdr_AEGraph
+#
+# Builds the AequilibraE car graph of a run directly from its network links table (Group{projgroup}_*), used
+# when aeq_graph_source = 'dataframe'. The graph is the same as the one built by project.network.build_graphs()
+# after the links table of project_database.sqlite is filled from the network links table, without the SQLite
+# round trip or building the graphs of the other modes.
+# A disrupted network differs from the base network of the same socio, projgroup, and matrix_name only in capacity
+# (capacity * lanes * link_available) and in the links removed (link_available = 0), so the graph of a disrupted
+# network is derived from a cached graph of the base network by scaling and masking its link arrays.
+#
+# ---------------------------------------------------------------------------------------------------
+import os
+import copy
+import sqlite3
+import numpy as np
+import pandas as pd
+from aequilibrae.paths import Graph
+import rdr_supporting
+
+# network links table most recently created in this process by create_network_link_csv, keyed by
+# (file path, modification time), so a graph built in the same process does not read the csv file back
+_network_links_cache = {}
+
+# base network graphs built in this process, keyed by (base network file path, modification time, matrix_name)
+# holds the base network links, the graph link fields, and the prepared graph, oldest entry dropped when full
+_base_graph_cache = {}
+BASE_GRAPH_CACHE_SIZE = 4
+
+
+# ==============================================================================
+
+
+def cache_network_links(network_file, links):
+    _network_links_cache.clear()
+    _network_links_cache[(os.path.abspath(network_file), os.path.getmtime(network_file))] = links
+
+
+# ==============================================================================
+
+
+def get_network_links(network_file, logger):
+    if not os.path.exists(network_file):
+        logger.error("NETWORK CSV FILE ERROR: {} could not be found".format(network_file))
+        raise Exception("NETWORK CSV FILE ERROR: {} could not be found".format(network_file))
+
+    cache_key = (os.path.abspath(network_file), os.path.getmtime(network_file))
+    if cache_key in _network_links_cache:
+        logger.debug("using network links table of {} created by this process".format(network_file))
+        return _network_links_cache[cache_key]
+
+    logger.debug("reading network links table {}".format(network_file))
+    links = rdr_supporting.read_table(network_file,
+                                      usecols=['link_id', 'from_node_id', 'to_node_id', 'directed', 'length',
+                                               'facility_type', 'capacity', 'free_speed', 'allowed_uses', 'travel_time',
+                                               'toll', 'alpha', 'beta', 'link_available'],
+                                      converters={'link_id': str, 'from_node_id': str, 'to_node_id': str,
+                                                  'facility_type': str, 'allowed_uses': str})
+    links.columns = links.columns.str.strip()
+    return links
+
+
+# ==============================================================================
+
+
+def get_graph_network(links):
+    # Converts a network links table to the AequilibraE link fields used by the graph, as done by the SQL statements
+    # filling the links table in prepare_base_network and prepare_disrupt_network:
+    # unavailable links are dropped, capacity (already multiplied by lanes and link_available) and speed apply to
+    # the AB direction only, and free_flow_time is the travel_time of the network file
+    links = links.loc[links['link_available'] > 0, :]
+    network = pd.DataFrame({'link_id': links['link_id'].astype(np.int64).values,
+                            'a_node': links['from_node_id'].astype(np.int64).values,
+                            'b_node': links['to_node_id'].astype(np.int64).values,
+                            'direction': links['directed'].astype(np.int64).values,
+                            'distance': links['length'].astype(float).values,
+                            'modes': links['allowed_uses'].fillna('').astype(str).values,
+                            'capacity_ab': links['capacity'].astype(float).values,
+                            'capacity_ba': 0.0,
+                            'speed_ab': links['free_speed'].astype(float).values,
+                            'speed_ba': 0.0,
+                            'free_flow_time': links['travel_time'].astype(float).values,
+                            'toll': links['toll'].astype(float).values,
+                            'alpha': links['alpha'].astype(float).values,
+                            'beta': links['beta'].astype(float).values})
+
+    # as in build_graphs, links that do not allow cars get b_node = a_node and are culled from the graph
+    no_car = ~network['modes'].str.contains('c')
+    network.loc[no_car, 'b_node'] = network.loc[no_car, 'a_node']
+
+    return network
+
+
+# ==============================================================================
+
+
+def get_centroids(network_db):
+    # centroids are the nodes of project_database.sqlite flagged as centroids, as in build_graphs
+    with sqlite3.connect(network_db) as db_con:
+        centroids = np.array([i[0] for i in db_con.execute("select node_id from nodes where is_centroid=1 order by node_id;").fetchall()],
+                             np.uint32)
+    db_con.close()
+    return centroids if centroids.shape[0] else None
+
+
+# ==============================================================================
+
+
+def build_car_graph(network_file, network_db, logger):
+    logger.debug("building car graph from network links table {}".format(network_file))
+    links = get_network_links(network_file, logger)
+
+    return prepare_car_graph(get_graph_network(links), network_db, logger)
+
+
+# ==============================================================================
+
+
+def build_disrupted_car_graph(network_file, base_network_file, matrix_name, network_db, logger):
+    # Builds the car graph of disrupted network links table network_file from the cached graph of base network links
+    # table base_network_file: if no links are removed, the prepared base graph is copied and its capacity scaled by
+    # link_available; otherwise the removed links are masked out of the base graph link fields before preparing it
+    # Falls back to build_car_graph if the two tables do not have the same links in the same order
+    links = get_network_links(network_file, logger)
+    base = get_base_graph(base_network_file, matrix_name, network_db, logger)
+
+    link_available = links['link_available'].values.astype(float)
+    if (not np.array_equal(links['link_id'].values.astype(str), base['link_id']) or
+            not np.allclose(links['capacity'].values.astype(float), base['capacity'] * link_available)):
+        logger.warning("Network links table {} does not match base network links table {}, building graph from {}".format(
+            network_file, base_network_file, network_file))
+        return build_car_graph(network_file, network_db, logger)
+
+    available = link_available > 0
+    if available.all():
+        logger.debug("building car graph of {} from base network graph, no links removed".format(network_file))
+        graph = copy.deepcopy(base['graph'])
+        # graph rows are link directions, look up the link_available of the link of each row
+        link_index = pd.Index(base['network']['link_id'].values)
+        row_available = link_available[link_index.get_indexer(graph.graph['link_id'].values)]
+        graph.graph['capacity'] = graph.graph['capacity'].values * row_available
+    else:
+        logger.debug("building car graph of {} from base network graph, {} links removed".format(network_file,
+                                                                                                 (~available).sum()))
+        network = base['network'].loc[available, :].copy()
+        network['capacity_ab'] = network['capacity_ab'].values * link_available[available]
+        graph = prepare_car_graph(network, network_db, logger)
+
+    return graph
+
+
+# ==============================================================================
+
+
+def get_base_graph(base_network_file, matrix_name, network_db, logger):
+    if not os.path.exists(base_network_file):
+        logger.error("BASE NETWORK CSV FILE ERROR: {} could not be found".format(base_network_file))
+        raise Exception("BASE NETWORK CSV FILE ERROR: {} could not be found".format(base_network_file))
+
+    cache_key = (os.path.abspath(base_network_file), os.path.getmtime(base_network_file), matrix_name)
+    if cache_key not in _base_graph_cache:
+        logger.debug("building base network car graph from {}".format(base_network_file))
+        links = get_network_links(base_network_file, logger)
+        # every link of the base network is available, so the graph link fields are in the order of the links table
+        network = get_graph_network(links)
+        if network.shape[0] != links.shape[0]:
+            logger.error("BASE NETWORK ERROR: {} has unavailable links".format(base_network_file))
+            raise Exception("BASE NETWORK ERROR: {} has unavailable links".format(base_network_file))
+        if len(_base_graph_cache) >= BASE_GRAPH_CACHE_SIZE:
+            _base_graph_cache.pop(next(iter(_base_graph_cache)))
+        _base_graph_cache[cache_key] = {'link_id': links['link_id'].values.astype(str),
+                                        'capacity': links['capacity'].values.astype(float),
+                                        'network': network,
+                                        'graph': prepare_car_graph(network.copy(), network_db, logger)}
+
+    return _base_graph_cache[cache_key]
+
+
+# ==============================================================================
+
+
+def prepare_car_graph(network, network_db, logger):
+    graph = Graph()
+    graph.mode = 'c'
+    graph.network = network
+    centroids = get_centroids(network_db)
+    if centroids is None:
+        logger.warning("No centroids found in {}".format(network_db))
+    graph.prepare_graph(centroids)
+    graph.set_blocked_centroid_flows(True)
+
+    return graph
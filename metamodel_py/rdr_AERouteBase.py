@@ -6,19 +6,34 @@
 # Inputs: demand, non-disrupted networks
 #
 # Outputs: shortest path skims (matrices\sp_base.omx), routing results (matrices\rt_base.omx)
+#
+# The shortest path skim (run_aeq_base_skim) and the traffic assignment (run_aeq_base_assignment) can be run
+# separately so an interrupted run can resume after the skim
 
 from os.path import join, exists
+import rdr_supporting
+import rdr_AESkimTree
 from aequilibrae import Parameters
 from aequilibrae.project import Project
-from aequilibrae.paths import NetworkSkimming
 from aequilibrae.matrix import AequilibraeMatrix
 # from aequilibrae import logger  # TODO: make decision on if to incorporate AequilibraE logger
 from aequilibrae.paths import TrafficAssignment, TrafficClass
 
 
 def run_aeq_base(run_params, run_folder, cfg, logger):
+    run_aeq_base_skim(run_params, run_folder, cfg, logger)
+    run_aeq_base_assignment(run_params, run_folder, cfg, logger)
+
+
+# ==============================================================================
+
+
+def open_project_graph(run_folder, network_file, cfg, logger, base_network_file=None, matrix_name=None):
+    # Opens the AequilibraE project in run_folder and returns the project and the car graph set up for skimming
+    # and assignment
+    # network_file is the network links table of the run, used to build the graph if aeq_graph_source = 'dataframe'
+    # for a disrupted network, the graph is then derived from the graph of base network links table base_network_file
     fldr = run_folder
-    mtx_fldr = 'matrices'
 
     project = Project()
     project.open(fldr)
@@ -40,18 +55,25 @@ def run_aeq_base(run_params, run_folder, cfg, logger):
     # logger.addHandler(stdout_handler)
 
     # project.load(join(fldr, proj_name))  # Not needed because we did a project.open  SBS 3/2/22
-    socio = run_params['socio']
-    projgroup = run_params['projgroup']
-    scenname = socio + projgroup
-    logger.debug("running shortest path skim for {}".format(scenname))
-
-    # We build all graphs
-    project.network.build_graphs()
-    # We get warnings that several fields in the project are filled with NaNs. Which is true, but we won't
-    # use those fields
 
-    # We grab the graph for cars
-    graph = project.network.graphs['c']
+    if cfg['aeq_graph_source'] == 'dataframe':
+        # We build the graph for cars directly from the network links table, the links table of the project
+        # database is not filled in this case (see prepare_base_network)
+        if base_network_file is None:
+            from rdr_AEGraph import build_car_graph
+            graph = build_car_graph(network_file, join(fldr, proj_name), logger)
+        else:
+            from rdr_AEGraph import build_disrupted_car_graph
+            graph = build_disrupted_car_graph(network_file, base_network_file, matrix_name, join(fldr, proj_name),
+                                              logger)
+    else:
+        # We build all graphs
+        project.network.build_graphs()
+        # We get warnings that several fields in the project are filled with NaNs. Which is true, but we won't
+        # use those fields
+
+        # We grab the graph for cars
+        graph = project.network.graphs['c']
 
     # Let's say we want to minimize travel time
     graph.set_graph('free_flow_time')
@@ -64,6 +86,24 @@ def run_aeq_base(run_params, run_folder, cfg, logger):
     logger.debug("blocked_centroid_flows parameter set to {}".format(cfg['blocked_centroid_flows']))
     graph.set_blocked_centroid_flows(cfg['blocked_centroid_flows'])
 
+    return project, graph
+
+
+# ==============================================================================
+
+
+def run_aeq_base_skim(run_params, run_folder, cfg, logger):
+    fldr = run_folder
+    mtx_fldr = 'matrices'
+
+    socio = run_params['socio']
+    projgroup = run_params['projgroup']
+    scenname = socio + projgroup
+    logger.debug("running shortest path skim for {}".format(scenname))
+
+    project, graph = open_project_graph(fldr, join(fldr, 'Group' + projgroup + '_baserun' + rdr_supporting.get_table_ext(cfg)),
+                                        cfg, logger)
+
     # look at the matrices - not essential to workflow
     proj_matrices = project.matrices
     proj_matrices.list()
@@ -71,21 +111,27 @@ def run_aeq_base(run_params, run_folder, cfg, logger):
     # SKIMMING
     # ----------------------------------------------------------------
 
-    # And run the skimming
-    skm = NetworkSkimming(graph)
-    skm.execute()
+    # Run the skimming as NetworkSkimming does, and export to OMX along with the shortest path tree of each origin
+    # The trees are used by run_aeq_disrupt_skim to only recompute the origins affected by a disruption
+    rdr_AESkimTree.run_base_skim(graph, join(fldr, mtx_fldr, 'sp_' + scenname + '.omx'), logger)  # changes for each run
+
+    project.close()
+
 
-    # The result is an AequilibraEMatrix object
-    skims = skm.results.skims
+# ==============================================================================
 
-    # Which we can manipulate directly from its temp file, if we wish
-    skims.matrices
 
-    # We can save it to the project if we want
-    # skm.save_to_project('base_skims')  # TODO: figure out how to save/overwrite to database
+def run_aeq_base_assignment(run_params, run_folder, cfg, logger):
+    fldr = run_folder
+    mtx_fldr = 'matrices'
+
+    socio = run_params['socio']
+    projgroup = run_params['projgroup']
+    scenname = socio + projgroup
+    logger.debug("running traffic assignment for {}".format(scenname))
 
-    # We can export to OMX
-    skims.export(join(fldr, mtx_fldr, 'sp_' + scenname + '.omx'))  # changes for each run
+    project, graph = open_project_graph(fldr, join(fldr, 'Group' + projgroup + '_baserun' + rdr_supporting.get_table_ext(cfg)),
+                                        cfg, logger)
 
     # TRAFFIC ASSIGNMENT WITH SKIMMING
     # ----------------------------------------------------------------
@@ -133,7 +179,7 @@ def run_aeq_base(run_params, run_folder, cfg, logger):
     # We do so for csv and AequilibraEData
     assig.save_results(join('link_flow', scenname))   # put results in the results database
     results_df = assig.results()  # also put results in a dataframe, then save to disk
-    results_df.to_csv(join(fldr, 'link_flow_' + scenname + '.csv'))
+    rdr_supporting.write_table(results_df, join(fldr, 'link_flow_' + scenname + rdr_supporting.get_table_ext(cfg)), index=True)
     # assigclass.results.save_to_disk(join(fldr, 'link_flow_' + scenname + '.csv'), output="loads")  # changes for each run. Per AequilibraE 1.1.4, this code is deprecated
 
     # The skims are easy to get
@@ -9,11 +9,13 @@
 #
 # Major steps
 # 1. Set up AequilibraE environment
-# 2. Obtain the shortest path skim from the disrupted network
+# 2. Obtain the shortest path skim from the disrupted network (run_aeq_disrupt_skim, shared by all elasticities)
 # 3. Adjust the demand based on the shortest path skims from disrupted and base networks
 # 4. Run routing on the new demand in the disrupted network
 # 5. (Mini-equilibrium) Re-adjust the demand based on the congested skims, and run routing again
 # 6. Generate summary statistics
+# Steps 4 and 5 are skipped if aeq_run_type = 'SP' (run_aeq_disrupt_sp_demand adjusts the demand without routing),
+# and only the shortest path rows of the summary statistics are written
 #
 # Filename conventions
 # - socio, e.g., 'base'
@@ -28,32 +30,57 @@
 # Scenario Name = basescenname + resil + elasname + hazard + recovery
 
 
+import os
 from os.path import join, exists
+import shutil
 import numpy as np
 import pandas as pd
 import openmatrix as omx
-from aequilibrae import Parameters
-from aequilibrae.project import Project
 from aequilibrae.paths import NetworkSkimming
 from aequilibrae.matrix import AequilibraeMatrix
 from aequilibrae.paths import TrafficAssignment, TrafficClass
+from rdr_AERouteBase import open_project_graph
+import rdr_supporting
+import rdr_LinkIndex
+import rdr_AESkimTree
+
 
 def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_folder, cfg, logger):
+    # Runs routing on the adjusted demand, the mini-equilibrium (if run_minieq = 1), and the summary statistics
+    # rdr_AESingleRun runs these steps separately so an interrupted run can resume after the last completed step
+    if cfg['aeq_run_type'] == 'SP':
+        run_aeq_disrupt_sp_demand(run_params, base_run_folder, disrupt_run_folder, cfg, logger)
+        write_netskim_summary(run_params, base_run_folder, disrupt_run_folder, cfg, logger)
+        return
+
+    assignment = run_aeq_disrupt_assignment(run_params, base_run_folder, disrupt_run_folder, cfg, logger, False)
+
+    # MINI-EQUILIBRIUM #
+    # ----------------------------------------------------------------
+
+    # Start of mini-equilibrium portion
+    if run_params['run_minieq'] == 1:
+        run_aeq_disrupt_assignment(run_params, base_run_folder, disrupt_run_folder, cfg, logger, True, assignment)
+
+    # Calculate summary statistics
+    write_netskim_summary(run_params, base_run_folder, disrupt_run_folder, cfg, logger)
+
+
+# ==============================================================================
+
+
+def run_aeq_disrupt_assignment(run_params, base_run_folder, disrupt_run_folder, cfg, logger, minieq, assignment=None):
+    # Adjusts demand and runs routing on the new demand in the disrupted network
+    # minieq = False for the first pass based on shortest path skims, True for the mini-equilibrium pass based on the
+    # routing skims of the first pass
+    # Link flows are saved by the last pass
+    # If the first pass is followed by a mini-equilibrium pass (run_minieq = 1), the project, graph, demand matrix, and
+    # traffic assignment are kept open and returned, to be passed as assignment to the mini-equilibrium pass so it
+    # does not rebuild them; the mini-equilibrium pass of a resumed run (assignment = None) opens them again
     fldr = disrupt_run_folder
     mtx_fldr = 'matrices'
     largeval = 99999  # constant used as an upper bound for travel times in disruption analysis
 
-    project = Project()
-    project.open(fldr)
-    proj_name = 'project_database.sqlite'  # the network comes from this sqlite database
-    if not exists(join(fldr, proj_name)):
-        logger.error("SQLITE DATABASE ERROR: {} could not be found".format(join(fldr, proj_name)))
-        raise Exception("SQLITE DATABASE ERROR: {} could not be found".format(join(fldr, proj_name)))
-
-    p = Parameters()
-    p.parameters['system']['logging_directory'] = fldr
-    p.write_back()
-
     socio = run_params['socio']
     projgroup = run_params['projgroup']
     resil = run_params['resil']
@@ -63,79 +90,295 @@ def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_fol
     recovery = run_params['recovery']
     basescenname = socio + projgroup
     scenname = basescenname + '_' + resil + '_' + elasname + '_' + hazard + '_' + recovery
-    logger.debug("running shortest path skim for {}".format(scenname))
+    logger.debug("running routing for {}".format(scenname))
+
+    table_ext = rdr_supporting.get_table_ext(cfg)
+    network_file = join(fldr, 'Group' + projgroup + '_' + resil + '_' + hazard + '_' + recovery + table_ext)
+    base_network_file = join(base_run_folder, 'Group' + projgroup + '_baserun' + table_ext)
+    if assignment is None:
+        project, graph = open_project_graph(fldr, network_file, cfg, logger, base_network_file,
+                                            run_params['matrix_name'])
+    else:
+        project = assignment['project']
+        graph = assignment['graph']
+
+    # The shortest path skim 'sp_disrupt_{scenname}.omx' is run once for all elasticities by run_aeq_disrupt_skim
+    # and copied to this folder
+
+    if not minieq:
+        # Adjust demand
+        #
+        # If new travel time is very large, then new_demand = 0.
+        #
+        # If there is little difference between travel times (< 0.5 minutes), then new_demand = old_demand
+        # (this also takes care of the case where both travel times are zero)
+        #
+        # Otherwise, the equation is new_demand = old_demand * (t_new / t_base) ^ elasticity,
+        # where t_new is the new shortest-path travel time,
+        # and t_base is the baseline (no disruption) shortest-path travel time
+        baseskimfile = join(base_run_folder, mtx_fldr, 'sp_' + basescenname + '.omx')
+        disruptskimfile = join(fldr, mtx_fldr, 'sp_disrupt_' + scenname + '.omx')
+        power_factor = elasticity
+    else:
+        # Re-adjust demand and rerun routing
+        #
+        # We now use the congested travel times from the routing run, and reduce the elasticity by 50%
+        # If new travel time is very large, then new_demand = 0
+        #
+        # If there is little difference between travel times (< 0.5 minutes), then new_demand = old_demand
+        # (this also takes care of the case where both travel times are zero)
+        #
+        # Otherwise, the equation is new_demand = old_demand * (t_new / t_base) ^ (0.5 elasticity),
+        # where t_new is the new routing (congested) travel time,
+        # and t_base is the baseline (no disruption) shortest-path travel time
+        #
+        # Note: we might want to compare to the baseline (no disruption) routing (congested) travel time
+        logger.debug("Starting mini-equilibrium portion of AequilibraE run")
+        baseskimfile = join(base_run_folder, mtx_fldr, 'rt_' + basescenname + '.omx')
+        disruptskimfile = join(fldr, mtx_fldr, 'rt_disrupt_' + scenname + '.omx')
+        power_factor = 0.5 * elasticity
+
+    # Input file
+    infile = join(fldr, mtx_fldr, socio + '_demand_summed.omx')
+
+    # Output file
+    outfile = join(fldr, mtx_fldr, 'new_demand_summed.omx')
+
+    taz_list, output_demand = adjust_demand(infile, run_params['matrix_name'], baseskimfile, disruptskimfile,
+                                            outfile, power_factor, largeval, logger)
+
+    # Run routing on the new demand
+
+    # TRAFFIC ASSIGNMENT WITH SKIMMING #
+    # ----------------------------------------------------------------
+
+    if assignment is None:
+        # The adjusted demand is assigned from memory rather than read back from 'new_demand_summed.omx'
+        # We will only assign one user class stored as 'matrix'
+        demand = AequilibraeMatrix()
+        demand.create_empty(zones=len(taz_list), matrix_names=['matrix'], index_names=['taz'], memory_only=True)
+        demand.index[:] = taz_list
+        demand.matrices[:, :, 0] = output_demand
+        demand.computational_view(['matrix'])
+
+        assig = TrafficAssignment()
 
-    # We build all graphs
-    project.network.build_graphs()
-    # Warnings that several fields in the project are filled with NaNs
-    # can be ignored, files are not used
+        # Creates the assignment class
+        # Currently restricted to 'car', can be made multimodal later
+        assigclass = TrafficClass(name='car', graph=graph, matrix=demand)
+
+        # The first thing to do is to add at list of traffic classes to be assigned
+        assig.set_classes([assigclass])
+
+        assig.set_vdf("BPR")  # This is not case-sensitive  # Then we set the volume delay function
+
+        assig.set_vdf_parameters({"alpha": "alpha", "beta": "beta"})  # Get parameters from link file
+
+        assig.set_capacity_field("capacity")  # The capacity and travel times as they exist in the graph
+
+        # config variable is in dollars per hour
+        cent_per_min = (100.0/60.0)*cfg['vot_per_hour']
+        assigclass.set_vot(cent_per_min)
+        assigclass.set_fixed_cost("toll", 1.0)
+    else:
+        # The mini-equilibrium pass reuses the demand matrix and traffic assignment of the first pass, only the demand
+        # changes; the first pass wrote its congested travel times to the graph's free flow time skim, so the skim
+        # fields are reloaded from the graph to skim the same fields as a newly built graph
+        demand = assignment['demand']
+        assig = assignment['assig']
+        assigclass = assignment['assigclass']
+        demand.matrices[:, :, 0] = output_demand
+        graph.set_skimming(list(graph.skim_fields))
+
+    # Setting the time field and the algorithm resets the congested times, link flows, and iteration state, so a
+    # reused assignment starts from the same all-or-nothing assignment as a new one
+    assig.set_time_field("free_flow_time")
+
+    # And the algorithm we want to use to assign
+    assig.set_algorithm('bfw')
+
+    # Set the convergence criteria
+    assig.max_iter = cfg['aeq_max_iter']  # default is 100
+    assig.rgap_target = cfg['aeq_rgap_target']  # default is 0.01
+
+    # Note: the assignment starts from an all-or-nothing assignment at free flow travel times, not from the link flows
+    # of the base run or another disrupt run. AequilibraE 1.4.2 has no way to start BFW from given link flows, and the
+    # link flows of another network or demand are not a feasible starting point. Starting the first all-or-nothing
+    # assignment from the congested travel times of a solved scenario instead did not reduce the number of iterations
+    # (tested on the RS6 sample network with demand scaled up to 20x). For the same reason the mini-equilibrium pass
+    # does not start from the link flows of the first pass, which are an equilibrium of a different demand.
+    assig.execute()  # We then execute the assignment
+    logger.debug("Traffic assignment for {} finished after {} iterations with relative gap {}".format(
+        scenname, assig.assignment.iter, assig.assignment.rgap))
+
+    # The blended skims are here
+    avg_skims = assigclass.results.skims
+
+    if minieq or run_params['run_minieq'] != 1:
+        # Save link flows
+        # The link flows are easy to export. This code is compatible with AequilibraE 1.4.2
+        # We do so for csv and AequilibraEData
+        assig.save_results(join('link_flow_adjdem_', scenname))  # put results in the results database
+        results_df = assig.results()  # also put results in a dataframe, then save to disk
+        rdr_supporting.write_table(results_df, join(fldr, 'link_flow_adjdem_' + scenname + table_ext), index=True)
+        # assigclass.results.save_to_disk(join(fldr, 'link_flow_adjdem_' + scenname + '.csv'), output="loads")  # changes for each run. Per AequilibraE 1.1.4, this code is deprecated
+
+    # Export to OMX
+    # The mini-equilibrium pass reads the skims of the first pass, so they are only replaced once the export is done
+    # and an interrupted mini-equilibrium pass can be re-run from them
+    avg_skims.export(join(fldr, mtx_fldr, 'rt_disrupt_' + scenname + '_tmp.omx'))
+    os.replace(join(fldr, mtx_fldr, 'rt_disrupt_' + scenname + '_tmp.omx'),
+               join(fldr, mtx_fldr, 'rt_disrupt_' + scenname + '.omx'))
 
-    # We grab the graph for cars
-    graph = project.network.graphs['c']
+    if not minieq and run_params['run_minieq'] == 1:
+        return {'project': project, 'graph': graph, 'demand': demand, 'assig': assig, 'assigclass': assigclass}
 
-    # Let's say we want to minimize travel time
-    graph.set_graph('free_flow_time')
+    demand.close()
+    project.close()
+    return None
 
-    # And will skim time and distance while we are at it
-    graph.set_skimming(['free_flow_time', 'distance'])
 
-    # And we will allow paths to be computed going through other centroids/centroid connectors as specified by user
-    # Should be set to False for the Sioux Falls Quick Start network, as all nodes are centroids
-    logger.debug("blocked_centroid_flows parameter set to {}".format(cfg['blocked_centroid_flows']))
-    graph.set_blocked_centroid_flows(cfg['blocked_centroid_flows'])
+# ==============================================================================
 
-    # look at the matrices - not essential to workflow
-    proj_matrices = project.matrices
-    proj_matrices.list()
+
+def run_aeq_disrupt_sp_demand(run_params, base_run_folder, disrupt_run_folder, cfg, logger):
+    # Adjusts demand based on the shortest path skims of the base and disrupted networks, as in the first pass of
+    # run_aeq_disrupt_assignment, without running routing on the new demand
+    # Used if aeq_run_type = 'SP', in which case the routing skims, link flows, and mini-equilibrium are not calculated
+    fldr = disrupt_run_folder
+    mtx_fldr = 'matrices'
+    largeval = 99999  # constant used as an upper bound for travel times in disruption analysis
+
+    socio = run_params['socio']
+    elasticity = run_params['elasticity']
+    elasname = str(int(10*-elasticity))
+    basescenname = socio + run_params['projgroup']
+    scenname = (basescenname + '_' + run_params['resil'] + '_' + elasname + '_' + run_params['hazard'] + '_' +
+                run_params['recovery'])
+    logger.debug("adjusting demand without routing for {}".format(scenname))
+
+    adjust_demand(join(fldr, mtx_fldr, socio + '_demand_summed.omx'), run_params['matrix_name'],
+                  join(base_run_folder, mtx_fldr, 'sp_' + basescenname + '.omx'),
+                  join(fldr, mtx_fldr, 'sp_disrupt_' + scenname + '.omx'),
+                  join(fldr, mtx_fldr, 'new_demand_summed.omx'), elasticity, largeval, logger)
+
+
+# ==============================================================================
+
+
+def run_aeq_disrupt_skim(run_params, base_run_folder, network_run_folder, cfg, logger):
+    # Shortest path skim of the disrupted network, which does not depend on elasticity
+    # Run once in the network run folder shared by the disrupt runs of all elasticities
+    fldr = network_run_folder
+    mtx_fldr = 'matrices'
+
+    basescenname = run_params['socio'] + run_params['projgroup']
+    networkscenname = basescenname + '_' + run_params['resil'] + '_' + run_params['hazard'] + '_' + run_params['recovery']
+    logger.debug("running shortest path skim for {}".format(networkscenname))
+
+    table_ext = rdr_supporting.get_table_ext(cfg)
+    network_file = join(fldr, 'Group' + run_params['projgroup'] + '_' + run_params['resil'] + '_' +
+                        run_params['hazard'] + '_' + run_params['recovery'] + table_ext)
+    base_network_file = join(base_run_folder, 'Group' + run_params['projgroup'] + '_baserun' + table_ext)
+    project, graph = open_project_graph(fldr, network_file, cfg, logger, base_network_file, run_params['matrix_name'])
 
     # SKIMMING
     # ----------------------------------------------------------------
 
-    # And run the skimming
-    skm = NetworkSkimming(graph)
-    skm.execute()
+    # Only the origins whose base network shortest path tree uses a removed link are skimmed, the other rows are
+    # copied from the base network skim
+    # All origins are skimmed if the base run has no shortest path trees (e.g., base runs of an earlier version)
+    skim_file = join(fldr, mtx_fldr, 'sp_disrupt_' + networkscenname + '.omx')
+    if not rdr_AESkimTree.run_disrupt_skim(graph, network_file, base_network_file, skim_file,
+                                           join(base_run_folder, mtx_fldr, 'sp_' + basescenname + '.omx'), logger):
+        # And run the skimming
+        skm = NetworkSkimming(graph)
+        skm.execute()
+
+        # The result is an AequilibraEMatrix object
+        skims = skm.results.skims
+
+        # We can export to OMX
+        skims.export(skim_file)
+
+    project.close()
 
-    # The result is an AequilibraEMatrix object
-    skims = skm.results.skims
 
-    # Which we can manipulate directly from its temp file, if we wish
-    skims.matrices
+# ==============================================================================
 
-    # We can export to OMX
-    skims.export(join(fldr, mtx_fldr, 'sp_disrupt_' + scenname + '.omx'))
 
-    # Adjust demand
-    #
-    # If new travel time is very large, then new_demand = 0.
-    #
-    # If there is little difference between travel times (< 0.5 minutes), then new_demand = old_demand
-    # (this also takes care of the case where both travel times are zero)
-    #
-    # Otherwise, the equation is new_demand = old_demand * (t_new / t_base) ^ elasticity,
-    # where t_new is the new shortest-path travel time,
-    # and t_base is the baseline (no disruption) shortest-path travel time
+def run_aeq_disrupt_no_disruption(run_params, base_run_folder, disrupt_run_folder, cfg, logger):
+    # Short circuit for a disrupted network with every link fully available (e.g., a hazard that does not reach the
+    # network or a recovery stage past all exposure), which is identical to the base network
+    # The shortest path and routing skims and link flows of the disrupt run are those of the base run, so they are
+    # copied rather than recomputed; demand adjustment and summary statistics are calculated as in a regular run
+    # If aeq_run_type = 'SP', the base run has no routing skims or link flows, so only the shortest path skim is copied
+    fldr = disrupt_run_folder
+    mtx_fldr = 'matrices'
+    largeval = 99999  # constant used as an upper bound for travel times in disruption analysis
 
-    # Input files
+    socio = run_params['socio']
+    projgroup = run_params['projgroup']
+    resil = run_params['resil']
+    elasticity = run_params['elasticity']
+    elasname = str(int(10*-elasticity))
+    hazard = run_params['hazard']
+    recovery = run_params['recovery']
+    basescenname = socio + projgroup
+    scenname = basescenname + '_' + resil + '_' + elasname + '_' + hazard + '_' + recovery
+    logger.debug("no links disrupted for {}, copying base run outputs".format(scenname))
+
+    # Skims and link flows of the base run
+    base_files = {join(mtx_fldr, 'sp_' + basescenname + '.omx'): join(mtx_fldr, 'sp_disrupt_' + scenname + '.omx')}
+    if cfg['aeq_run_type'] == 'RT':
+        base_files[join(mtx_fldr, 'rt_' + basescenname + '.omx')] = join(mtx_fldr, 'rt_disrupt_' + scenname + '.omx')
+        base_files['link_flow_' + basescenname + rdr_supporting.get_table_ext(cfg)] = \
+            'link_flow_adjdem_' + scenname + rdr_supporting.get_table_ext(cfg)
+    for base_file, disrupt_file in base_files.items():
+        if not exists(join(base_run_folder, base_file)):
+            logger.error("BASE RUN FILE ERROR: {} could not be found".format(join(base_run_folder, base_file)))
+            raise Exception("BASE RUN FILE ERROR: {} could not be found".format(join(base_run_folder, base_file)))
+        shutil.copyfile(join(base_run_folder, base_file), join(fldr, disrupt_file))
+
+    # Adjust demand based on the shortest path skims, then re-adjust based on the congested skims if mini-equilibrium
+    # is run, as in run_aeq_disrupt_miniequilibrium
+    # Base and disrupt skims are identical, so only trips between zones that cannot be reached are removed
     infile = join(fldr, mtx_fldr, socio + '_demand_summed.omx')
+    outfile = join(fldr, mtx_fldr, 'new_demand_summed.omx')
+    adjust_demand(infile, run_params['matrix_name'], join(base_run_folder, mtx_fldr, 'sp_' + basescenname + '.omx'),
+                  join(fldr, mtx_fldr, 'sp_disrupt_' + scenname + '.omx'), outfile, elasticity, largeval, logger)
+    if run_params['run_minieq'] == 1 and cfg['aeq_run_type'] == 'RT':
+        adjust_demand(infile, run_params['matrix_name'], join(base_run_folder, mtx_fldr, 'rt_' + basescenname + '.omx'),
+                      join(fldr, mtx_fldr, 'rt_disrupt_' + scenname + '.omx'), outfile, 0.5 * elasticity, largeval,
+                      logger)
+
+    # Calculate summary statistics
+    write_netskim_summary(run_params, base_run_folder, disrupt_run_folder, cfg, logger)
+
+
+# ==============================================================================
+
+
+def adjust_demand(infile, matrix_name, baseskimfile, disruptskimfile, outfile, power_factor, largeval, logger):
+    # Adjusts demand in table matrix_name of infile based on the base and disrupt skims, writing the adjusted demand
+    # to table 'matrix' of outfile (see get_output_demand)
+    # The number of circuitous trips removed is stored as attribute 'circuitous_trips_removed' of the adjusted demand
+    # table for the summary statistics
+    # Returns the TAZ ids and the adjusted demand array, in the order of the TAZ mapping of infile
     if not exists(infile):
         logger.error("DEMAND OMX FILE ERROR: {} could not be found".format(infile))
         raise Exception("DEMAND OMX FILE ERROR: {} could not be found".format(infile))
-    baseskimfile = join(base_run_folder, mtx_fldr, 'sp_' + basescenname + '.omx')
     if not exists(baseskimfile):
         logger.error("BASE SKIMS FILE ERROR: {} could not be found".format(baseskimfile))
         raise Exception("BASE SKIMS FILE ERROR: {} could not be found".format(baseskimfile))
-    disruptskimfile = join(fldr, mtx_fldr, 'sp_disrupt_' + scenname + '.omx')
     if not exists(disruptskimfile):
         logger.error("DISRUPT SKIMS FILE ERROR: {} could not be found".format(disruptskimfile))
         raise Exception("DISRUPT SKIMS FILE ERROR: {} could not be found".format(disruptskimfile))
 
-    # Output file
-    outfile = join(fldr, mtx_fldr, 'new_demand_summed.omx')
-
     # Read the input demand file
     f_input = omx.open_file(infile)
     # Either 'matrix' or 'nocar'
-    m1 = f_input[run_params['matrix_name']]
+    m1 = f_input[matrix_name]
     tazs = f_input.mapping('taz')
     logger.debug("Mappings: {}".format(f_input.list_mappings()))
     input_demand = np.array(m1)
@@ -144,7 +387,7 @@ def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_fol
     logger.debug("Number of tables: {}".format(len(f_input)))
     logger.debug("Table names: {}".format(f_input.list_matrices()))
     logger.debug("Attributes: {}".format(f_input.list_all_attributes()))
-    logger.debug("Sum of trips: {}".format(np.sum(m1)))
+    logger.debug("Sum of trips: {}".format(np.sum(input_demand)))
 
     matrix_size = matrix_shape[0]
     if matrix_shape[0] != matrix_shape[1]:
@@ -177,7 +420,7 @@ def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_fol
     output_trips_reduced = 0.0
     # the IF statement gets replaced with a series of transformations to the output_demand matrix
     output_demand_df, (trips_removed, trips_unchanged, trips_reduced, output_trips_reduced) = get_output_demand(
-        t_disrupt, t_base, input_demand, largeval, elasticity)
+        t_disrupt, t_base, input_demand, largeval, power_factor)
     output_demand = output_demand_df.to_numpy()
 
     logger.debug("removed: {};  unchanged: {};  reduced from {} to {}".format(trips_removed, trips_unchanged,
@@ -185,204 +428,39 @@ def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_fol
     circuitous_trips_removed = trips_reduced - output_trips_reduced
 
     f_output['matrix'] = output_demand
+    f_output['matrix'].attrs['circuitous_trips_removed'] = circuitous_trips_removed
     f_output.close()
     f_input.close()
     f_base.close()
     f_disrupt.close()
 
-    # Run routing on the new demand
-
-    # TRAFFIC ASSIGNMENT WITH SKIMMING #
-    # ----------------------------------------------------------------
-
-    demand = AequilibraeMatrix()
-    demand.load(join(fldr, mtx_fldr, 'new_demand_summed.omx'))
-    demand.computational_view(['matrix'])  # We will only assign one user class stored as 'matrix' inside the OMX file
-
-    assig = TrafficAssignment()
-
-    # Creates the assignment class
-    # Currently restricted to 'car', can be made multimodal later
-    assigclass = TrafficClass(name='car', graph=graph, matrix=demand)
-
-    # The first thing to do is to add at list of traffic classes to be assigned
-    assig.set_classes([assigclass])
-
-    assig.set_vdf("BPR")  # This is not case-sensitive  # Then we set the volume delay function
-
-    assig.set_vdf_parameters({"alpha": "alpha", "beta": "beta"})  # Get parameters from link file
-
-    assig.set_capacity_field("capacity")  # The capacity and travel times as they exist in the graph
-    assig.set_time_field("free_flow_time")
-
-    # And the algorithm we want to use to assign
-    assig.set_algorithm('bfw')
-
-    # config variable is in dollars per hour
-    cent_per_min = (100.0/60.0)*cfg['vot_per_hour']
-    assigclass.set_vot(cent_per_min)
-    assigclass.set_fixed_cost("toll", 1.0)
-
-    # Set the convergence criteria
-    assig.max_iter = cfg['aeq_max_iter']  # default is 100
-    assig.rgap_target = cfg['aeq_rgap_target']  # default is 0.01
-
-    assig.execute()  # We then execute the assignment
-
-    # The blended skims are here
-    avg_skims = assigclass.results.skims
-
-    # Export to OMX
-    avg_skims.export(join(fldr, mtx_fldr, 'rt_disrupt_' + scenname + '.omx'))
-    demand.close()
-
-    # MINI-EQUILIBRIUM #
-    # ----------------------------------------------------------------
-
-    # Start of mini-equilibrium portion
-    if run_params['run_minieq'] == 1:
-        # Re-adjust demand and rerun routing
-        #
-        # We now use the congested travel times from the routing run, and reduce the elasticity by 50%
-        # If new travel time is very large, then new_demand = 0
-        #
-        # If there is little difference between travel times (< 0.5 minutes), then new_demand = old_demand
-        # (this also takes care of the case where both travel times are zero)
-        #
-        # Otherwise, the equation is new_demand = old_demand * (t_new / t_base) ^ (0.5 elasticity),
-        # where t_new is the new routing (congested) travel time,
-        # and t_base is the baseline (no disruption) shortest-path travel time
-        #
-        # Note: we might want to compare to the baseline (no disruption) routing (congested) travel time
-        logger.debug("Starting mini-equilibrium portion of AequilibraE run")
-
-        # Input files
-        infile = join(fldr, mtx_fldr, socio + '_demand_summed.omx')
-        baseskimfile = join(base_run_folder, mtx_fldr, 'rt_' + basescenname + '.omx')
-        if not exists(baseskimfile):
-            logger.error("BASE SKIMS FILE ERROR: {} could not be found".format(baseskimfile))
-            raise Exception("BASE SKIMS FILE ERROR: {} could not be found".format(baseskimfile))
-        disruptskimfile = join(fldr, mtx_fldr, 'rt_disrupt_' + scenname + '.omx')
-        if not exists(disruptskimfile):
-            logger.error("DISRUPT SKIMS FILE ERROR: {} could not be found".format(disruptskimfile))
-            raise Exception("DISRUPT SKIMS FILE ERROR: {} could not be found".format(disruptskimfile))
-
-        # Output file
-        outfile = join(fldr, mtx_fldr, 'new_demand_summed.omx')
-
-        # Read the input demand file
-        f_input = omx.open_file(infile)
-        # Either 'matrix' or 'nocar'
-        m1 = f_input[run_params['matrix_name']]
-        tazs = f_input.mapping('taz')
-        logger.debug("Mappings: {}".format(f_input.list_mappings()))
-        input_demand = np.array(m1)
-        matrix_shape = f_input.shape()
-        logger.debug("Shape: {}".format(matrix_shape))
-        logger.debug("Number of tables: {}".format(len(f_input)))
-        logger.debug("Table names: {}".format(f_input.list_matrices()))
-        logger.debug("Attributes: {}".format(f_input.list_all_attributes()))
-        logger.debug("Sum of trips: {}".format(np.sum(m1)))
-
-        matrix_size = matrix_shape[0]
-        if matrix_shape[0] != matrix_shape[1]:
-            logger.warning("Warning - OMX demand file is not a square matrix")
-            raise Exception("AEQUILIBRAE RUN ERROR: input demand omx file is not a square matrix")
-
-        # Set up the output demand array
-        output_demand = np.zeros((matrix_size, matrix_size))
-        f_output = omx.open_file(outfile, 'w')
-        taz_list = list(tazs.keys())
-        f_output.create_mapping('taz', taz_list)
-
-        f_base = omx.open_file(baseskimfile)
-        f_disrupt = omx.open_file(disruptskimfile)
-        t_base = f_base['free_flow_time']
-        t_disrupt = f_disrupt['free_flow_time']
-        logger.debug("Base Skim Shape: {}".format(f_base.shape()))
-        logger.debug("Number of tables: {}".format(len(f_base)))
-        logger.debug("Table names: {}".format(f_base.list_matrices()))
-        logger.debug("Attributes: {}".format(f_base.list_all_attributes()))
-        logger.debug("New Skim Shape: {}".format(f_disrupt.shape()))
-        logger.debug("Number of tables: {}".format(len(f_disrupt)))
-        logger.debug("Table names: {}".format(f_disrupt.list_matrices()))
-        logger.debug("Attributes: {}".format(f_disrupt.list_all_attributes()))
-
-        trips_removed = 0.0
-        trips_unchanged = 0.0
-        trips_reduced = 0.0
-        output_trips_reduced = 0.0
-        output_demand_df, (trips_removed, trips_unchanged, trips_reduced, output_trips_reduced) = get_output_demand(
-            t_disrupt, t_base, input_demand, largeval, 0.5 * elasticity)
-        output_demand = output_demand_df.to_numpy()
-
-        logger.debug("removed: {};  unchanged: {};  reduced from {} to {}".format(trips_removed, trips_unchanged,
-                                                                                  trips_reduced, output_trips_reduced))
-        circuitous_trips_removed = trips_reduced - output_trips_reduced
-
-        f_output['matrix'] = output_demand
-        f_output.close()
-        f_input.close()
-        f_disrupt.close()
-        f_base.close()
-
-        # TRAFFIC ASSIGNMENT WITH SKIMMING #
-        # ----------------------------------------------------------------
-
-        demand = AequilibraeMatrix()
-        demand.load(join(fldr, mtx_fldr, 'new_demand_summed.omx'))
-        # We will only assign one user class stored as 'matrix' inside the OMX file
-        demand.computational_view(['matrix'])
-
-        assig = TrafficAssignment()
-
-        # Creates the assignment class
-        # Currently restricted to 'car', can be made multimodal later
-        assigclass = TrafficClass(name='car', graph=graph, matrix=demand)
-
-        # The first thing to do is to add at list of traffic classes to be assigned
-        assig.set_classes([assigclass])
-
-        assig.set_vdf("BPR")  # This is not case-sensitive  # Then we set the volume delay function
-
-        assig.set_vdf_parameters({"alpha": "alpha", "beta": "beta"})  # Get parameters from link file
-
-        assig.set_capacity_field("capacity")  # The capacity and travel times as they exist in the graph
-        assig.set_time_field("free_flow_time")
+    return taz_list, output_demand
 
-        # And the algorithm we want to use to assign
-        assig.set_algorithm('bfw')
 
-        # config variable is in dollars per hour
-        cent_per_min = (100.0/60.0)*cfg['vot_per_hour']
-        assigclass.set_vot(cent_per_min)
-        assigclass.set_fixed_cost("toll", 1.0)
-
-        # Set the convergence criteria
-        assig.max_iter = cfg['aeq_max_iter']  # default is 100
-        assig.rgap_target = cfg['aeq_rgap_target']  # default is 0.01
-
-        assig.execute()  # We then execute the assignment
-
-        # The blended skims are here
-        avg_skims = assigclass.results.skims
+# ==============================================================================
 
-        # The ones for the last iteration are here
-        last_skims = assigclass._aon_results.skims
 
-        # Export to OMX 
-        avg_skims.export(join(fldr, mtx_fldr, 'rt_disrupt_' + scenname + '.omx'))
-        demand.close()
+def write_netskim_summary(run_params, base_run_folder, disrupt_run_folder, cfg, logger):
+    # Calculates trips, miles, and hours for the base and disrupted networks and writes them to NetSkim.csv
+    # Requires demand and adjusted demand (new_demand_summed.omx), base and disrupt skims, and link flows
+    # If aeq_run_type = 'SP', only the shortest path (SP) rows are written, as there are no routing skims
+    fldr = disrupt_run_folder
+    mtx_fldr = 'matrices'
+    largeval = 99999  # constant used as an upper bound for travel times in disruption analysis
 
-    # Save link flows
-    # The link flows are easy to export. This code is compatible with AequilibraE 1.4.2
-    # We do so for csv and AequilibraEData
-    assig.save_results(join('link_flow_adjdem_', scenname))  # put results in the results database
-    results_df = assig.results()  # also put results in a dataframe, then save to disk
-    results_df.to_csv(join(fldr, 'link_flow_adjdem_' + scenname + '.csv'))
-    # assigclass.results.save_to_disk(join(fldr, 'link_flow_adjdem_' + scenname + '.csv'), output="loads")  # changes for each run. Per AequilibraE 1.1.4, this code is deprecated
+    socio = run_params['socio']
+    projgroup = run_params['projgroup']
+    resil = run_params['resil']
+    elasticity = run_params['elasticity']
+    elasname = str(int(10*-elasticity))
+    hazard = run_params['hazard']
+    recovery = run_params['recovery']
+    basescenname = socio + projgroup
+    scenname = basescenname + '_' + resil + '_' + elasname + '_' + hazard + '_' + recovery
+    run_routing = cfg['aeq_run_type'] == 'RT'
+    # transit metrics are calculated from the routing link flows, so they are not calculated if routing was not run
+    calc_transit_metrics = run_routing and cfg['calc_transit_metrics']
 
-	# Calculate summary statistics
     f = omx.open_file(join(fldr, mtx_fldr, socio + '_demand_summed.omx'), 'r')
     logger.debug("DEMAND FILE Shape: {}   Tables: {}   Mappings: {}".format(f.shape(), f.list_matrices(),
                                                                             f.list_mappings()))
@@ -393,6 +471,8 @@ def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_fol
     logger.debug("DEMAND FILE Shape: {}   Tables: {}   Mappings: {}".format(nf.shape(), nf.list_matrices(),
                                                                             nf.list_mappings()))
     newdem = nf['matrix']
+    # number of circuitous trips removed by the last demand adjustment (see adjust_demand)
+    circuitous_trips_removed = float(nf['matrix'].attrs['circuitous_trips_removed'])
 
     spbf = omx.open_file(join(base_run_folder, mtx_fldr, 'sp_' + basescenname + '.omx'), 'r')
     logger.debug("SP BASE SKIM FILE Shape: {}   Tables: {}   Mappings: {}".format(spbf.shape(), spbf.list_matrices(),
@@ -400,22 +480,25 @@ def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_fol
     spbt = spbf['free_flow_time']
     spbd = spbf['distance']
 
-    rtbf = omx.open_file(join(base_run_folder, mtx_fldr, 'rt_' + basescenname + '.omx'), 'r')
-    logger.debug("RT BASE SKIM FILE Shape: {}   Tables: {}   Mappings: {}".format(rtbf.shape(), rtbf.list_matrices(),
-                                                                                  rtbf.list_mappings()))
-    rtbt = rtbf['free_flow_time']
-    rtbd = rtbf['distance']
+    if run_routing:
+        rtbf = omx.open_file(join(base_run_folder, mtx_fldr, 'rt_' + basescenname + '.omx'), 'r')
+        logger.debug("RT BASE SKIM FILE Shape: {}   Tables: {}   Mappings: {}".format(rtbf.shape(),
+                                                                                      rtbf.list_matrices(),
+                                                                                      rtbf.list_mappings()))
+        rtbt = rtbf['free_flow_time']
+        rtbd = rtbf['distance']
 
     df_spbt = pd.DataFrame(data=spbt)
     df_spbd = pd.DataFrame(data=spbd)
-    df_rtbt = pd.DataFrame(data=rtbt)
-    df_rtbd = pd.DataFrame(data=rtbd)
+    if run_routing:
+        df_rtbt = pd.DataFrame(data=rtbt)
+        df_rtbd = pd.DataFrame(data=rtbd)
     df_dem = pd.DataFrame(data=dem)
     df_newdem = pd.DataFrame(data=newdem)
 
-    # Summary information on the input trip tables
-    logger.debug("Sum of demand trips: {:.9}".format(np.sum(dem)))
-    logger.debug("Sum of new demand trips: {:.9}".format(np.sum(newdem)))
+    # Summary information on the input trip tables, summed from the tables read above
+    logger.debug("Sum of demand trips: {:.9}".format(np.sum(df_dem.values)))
+    logger.debug("Sum of new demand trips: {:.9}".format(np.sum(df_newdem.values)))
 
     # Assemble totals for base shortest path and base routing
     # Note: to improve efficiency, this could be done in rdr_AERouteBase,
@@ -440,12 +523,14 @@ def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_fol
     rtb_cumdist = 0.0
 
     # Routing base times and distances
-    bool_rtbt = df_rtbt < largeval
-    rtb_cumtripcount = (df_dem.where(bool_rtbt, other=0)).sum().sum()
-    rtb_cumtime = ((df_dem.where(bool_rtbt, other=0))*df_rtbt).sum().sum()
-    rtb_cumdist = ((df_dem.where(bool_rtbt, other=0))*df_rtbd).sum().sum()
+    if run_routing:
+        bool_rtbt = df_rtbt < largeval
+        rtb_cumtripcount = (df_dem.where(bool_rtbt, other=0)).sum().sum()
+        rtb_cumtime = ((df_dem.where(bool_rtbt, other=0))*df_rtbt).sum().sum()
+        rtb_cumdist = ((df_dem.where(bool_rtbt, other=0))*df_rtbd).sum().sum()
 
-    logger.debug("Base,RT,{},{:.8},{:.8},{:.8}".format(basescenname, rtb_cumtripcount, rtb_cumdist, rtb_cumtime/60))
+        logger.debug("Base,RT,{},{:.8},{:.8},{:.8}".format(basescenname, rtb_cumtripcount, rtb_cumdist,
+                                                           rtb_cumtime/60))
 
     # Open disruption skim files and assemble the totals
     spdf = omx.open_file(join(fldr, mtx_fldr, 'sp_disrupt_' + scenname + '.omx'), 'r')
@@ -455,17 +540,19 @@ def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_fol
     spdt = spdf['free_flow_time']
     spdd = spdf['distance']
 
-    rtdf = omx.open_file(join(fldr, mtx_fldr, 'rt_disrupt_' + scenname + '.omx'), 'r')
-    logger.debug("RT DISRUPT SKIM FILE Shape: {}   Tables: {}   Mappings: {}".format(rtdf.shape(),
-                                                                                          rtdf.list_matrices(),
-                                                                                          rtdf.list_mappings()))
-    rtdt = rtdf['free_flow_time']
-    rtdd = rtdf['distance']
+    if run_routing:
+        rtdf = omx.open_file(join(fldr, mtx_fldr, 'rt_disrupt_' + scenname + '.omx'), 'r')
+        logger.debug("RT DISRUPT SKIM FILE Shape: {}   Tables: {}   Mappings: {}".format(rtdf.shape(),
+                                                                                              rtdf.list_matrices(),
+                                                                                              rtdf.list_mappings()))
+        rtdt = rtdf['free_flow_time']
+        rtdd = rtdf['distance']
 
     df_spdt = pd.DataFrame(data=spdt)
     df_spdd = pd.DataFrame(data=spdd)
-    df_rtdt = pd.DataFrame(data=rtdt)
-    df_rtdd = pd.DataFrame(data=rtdd)
+    if run_routing:
+        df_rtdt = pd.DataFrame(data=rtdt)
+        df_rtdd = pd.DataFrame(data=rtdd)
 
     spd_cumtripcount = 0.0
     spd_cumtime = 0.0
@@ -493,19 +580,20 @@ def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_fol
     rtd_cumdist = 0.0
 
     # Routing disrupt times and distances
-    spdt_and_rtdt_bool = (df_spdt < largeval) & (df_rtdt < largeval)
-    rtd_cumtripcount = (df_newdem.where(spdt_and_rtdt_bool, other=0)).sum().sum()
-    rtd_cumtime = ((df_newdem.where(spdt_and_rtdt_bool, other=0))*df_rtdt).sum().sum()
-    rtd_cumdist = ((df_newdem.where(spdt_and_rtdt_bool, other=0))*df_rtdd).sum().sum()
-    rtd_basecumtime = ((df_newdem.where(spdt_and_rtdt_bool, other=0))*df_rtbt).sum().sum()
-    rtd_basecumdist = ((df_newdem.where(spdt_and_rtdt_bool, other=0))*df_rtbd).sum().sum()
-
-    logger.debug("Disrupt,RT,{},{:.8},{:.8},{:.8},{:.8},{:.8}".format(scenname, rtd_cumtripcount, rtd_cumdist,
-                                                                      rtd_cumtime/60, rtd_basecumdist,
-                                                                      rtd_basecumtime/60))
+    if run_routing:
+        spdt_and_rtdt_bool = (df_spdt < largeval) & (df_rtdt < largeval)
+        rtd_cumtripcount = (df_newdem.where(spdt_and_rtdt_bool, other=0)).sum().sum()
+        rtd_cumtime = ((df_newdem.where(spdt_and_rtdt_bool, other=0))*df_rtdt).sum().sum()
+        rtd_cumdist = ((df_newdem.where(spdt_and_rtdt_bool, other=0))*df_rtdd).sum().sum()
+        rtd_basecumtime = ((df_newdem.where(spdt_and_rtdt_bool, other=0))*df_rtbt).sum().sum()
+        rtd_basecumdist = ((df_newdem.where(spdt_and_rtdt_bool, other=0))*df_rtbd).sum().sum()
+
+        logger.debug("Disrupt,RT,{},{:.8},{:.8},{:.8},{:.8},{:.8}".format(scenname, rtd_cumtripcount, rtd_cumdist,
+                                                                          rtd_cumtime/60, rtd_basecumdist,
+                                                                          rtd_basecumtime/60))
 
     # Calculate separate car and transit metrics
-    if cfg['calc_transit_metrics']:
+    if calc_transit_metrics:
         logger.info("Calculating transit-specific metrics for scenario {}".format(scenname))
         # Read in network attributes file
         network_file = join(cfg['input_dir'], 'Networks', basescenname + '.csv')
@@ -514,34 +602,38 @@ def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_fol
             raise Exception("NETWORK FILE ERROR: {} could not be found".format(network_file))
 
         if run_params['matrix_name'] == 'matrix':
-            network = pd.read_csv(network_file, usecols=['link_id', 'length', 'facility_type', 'toll', 'travel_time'],
-                                  converters={'link_id': str, 'length': float, 'facility_type': str, 'toll': float, 'travel_time': float})
+            network = rdr_supporting.read_static_table(network_file, 'link', logger,
+                                                       usecols=['link_id', 'length', 'facility_type', 'toll', 'travel_time'])
         elif run_params['matrix_name'] == 'nocar':
-            network = pd.read_csv(network_file, usecols=['link_id', 'length', 'facility_type', 'toll_nocar', 'travel_time_nocar'],
-                                  converters={'link_id': str, 'length': float, 'facility_type': str, 'toll_nocar': float, 'travel_time_nocar': float})
+            network = rdr_supporting.read_static_table(network_file, 'link', logger,
+                                                       usecols=['link_id', 'length', 'facility_type', 'toll_nocar', 'travel_time_nocar'])
             network.rename({'toll_nocar': 'toll', 'travel_time_nocar': 'travel_time'}, axis='columns', inplace=True)
         else:
             logger.error("AEquilibraE disrupt run requires 'matrix' or 'nocar' for matrix_name variable in run_params.")
             raise Exception("Invalid option for variable matrix_name in run_params in AEquilibraE disrupt run.")
 
         # Read in link flows file
-        link_flow_file = join(fldr, 'link_flow_adjdem_' + scenname + '.csv')
+        link_flow_file = join(fldr, 'link_flow_adjdem_' + scenname + rdr_supporting.get_table_ext(cfg))
         if not exists(link_flow_file):
             logger.error("LINK FLOW FILE ERROR: {} could not be found".format(link_flow_file))
             raise Exception("LINK FLOW FILE ERROR: {} could not be found".format(link_flow_file))
 
-        link_flows = pd.read_csv(link_flow_file, usecols=['link_id', 'matrix_tot'],
-                                 converters={'link_id': str, 'matrix_tot': float})
+        link_flows = rdr_supporting.read_table(link_flow_file, usecols=['link_id', 'matrix_tot'],
+                                               converters={'link_id': str, 'matrix_tot': float})
 
-        transit_calcs = pd.merge(network, link_flows, how='left', left_on='link_id', right_on='link_id', indicator=True)
+        # link flows aligned to the links of the network file by the network link index
+        transit_calcs = network
+        transit_calcs['matrix_tot'], found = rdr_LinkIndex.scatter_link_values(rdr_LinkIndex.get_link_index(network_file, logger),
+                                                                               link_flows['link_id'].values,
+                                                                               link_flows['matrix_tot'].values)
         logger.debug(("Number of links not found in link flows " +
-                      "table: {}".format(sum(transit_calcs['_merge'] == 'left_only'))))
-        if sum(transit_calcs['_merge'] == 'left_only') == transit_calcs.shape[0]:
+                      "table: {}".format(sum(~found))))
+        if sum(~found) == transit_calcs.shape[0]:
             logger.error(("TABLE JOIN ERROR: Join of network links file with link flows table " +
                          "failed to produce any matches for scenario {}. Check the corresponding table columns.".format(scenname)))
             raise Exception(("TABLE JOIN ERROR: Join of network links file with link flows table " +
                              "failed to produce any matches for scenario {}. Check the corresponding table columns.".format(scenname)))
-        transit_calcs.drop(labels=['link_id', '_merge'], axis=1, inplace=True)
+        transit_calcs.drop(labels=['link_id'], axis=1, inplace=True)
         transit_calcs['matrix_tot'] = np.where(transit_calcs['matrix_tot'].isna(), 0, transit_calcs['matrix_tot'])
         transit_calcs = transit_calcs.assign(miles_tot=transit_calcs['matrix_tot'] * transit_calcs['length'],
                                              hours_tot=transit_calcs['matrix_tot'] * transit_calcs['travel_time'] / 60)
@@ -576,7 +668,7 @@ def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_fol
     # Write outputs to csv file
     outfile = open(join(disrupt_run_folder, "NetSkim.csv"), "w")
     # Create extra column headers if calc_transit_metrics (and print extra empty data values)
-    if cfg['calc_transit_metrics']:
+    if calc_transit_metrics:
         print("Type,SP/RT,socio,projgroup,resil,elasticity,hazard,recovery,Scenario,trips,miles,hours," +
               "lost_trips,extra_miles,extra_hours,circuitous_trips_removed,lr_trips,hr_trips,bus_trips," +
               "car_trips,lr_miles,hr_miles,bus_miles,car_miles,lr_hours_wait,hr_hours_wait,bus_hours_wait," +
@@ -595,14 +687,16 @@ def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_fol
           '{:.8},{:.8},{:.8},{:.8},{:.8},{:.8},{:.8}'.format(spd_cumtripcount, spd_cumdist, spd_cumtime/60, lost_trips,
                                                              extra_mi, extra_hr, circuitous_trips_removed),
           file=outfile)
-    print("Base,RT," + socio + ',' + projgroup + ',' + resil + ',' + str(elasticity) + ',' + hazard + ',' + recovery +
-          ',' + basescenname + ',' + '{:.8},{:.8},{:.8}'.format(rtb_cumtripcount, rtb_cumdist, rtb_cumtime/60),
-          file=outfile)
-    lost_trips = rtb_cumtripcount - rtd_cumtripcount
-    extra_mi = rtd_cumdist - rtd_basecumdist
-    extra_hr = (rtd_cumtime - rtd_basecumtime)/60
+    # Routing rows are not written if routing was not run (aeq_run_type = 'SP')
+    if run_routing:
+        print("Base,RT," + socio + ',' + projgroup + ',' + resil + ',' + str(elasticity) + ',' + hazard + ',' +
+              recovery + ',' + basescenname + ',' +
+              '{:.8},{:.8},{:.8}'.format(rtb_cumtripcount, rtb_cumdist, rtb_cumtime/60), file=outfile)
+        lost_trips = rtb_cumtripcount - rtd_cumtripcount
+        extra_mi = rtd_cumdist - rtd_basecumdist
+        extra_hr = (rtd_cumtime - rtd_basecumtime)/60
     # Add extra calculated values if calc_transit_metrics is True
-    if cfg['calc_transit_metrics']:
+    if calc_transit_metrics:
         # circuitous_trips_removed is set as 0.0 for a placeholder
         print("Disrupt,RT," + socio + ',' + projgroup + ',' + resil + ',' +
               str(elasticity) + ',' + hazard + ',' + recovery + ',' + scenname + ',' +
@@ -613,7 +707,7 @@ def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_fol
               '{:.8},{:.8},{:.8},{:.8},{:.8},{:.8},{:.8}'.format(rtd_lrphtwait, rtd_hrphtwait, rtd_busphtwait,
                                                                  rtd_lrphtenroute, rtd_hrphtenroute, rtd_busphtenroute,
                                                                  rtd_carpht), file=outfile)
-    else:
+    elif run_routing:
         print("Disrupt,RT," + socio + ',' + projgroup + ',' + resil + ',' +
               str(elasticity) + ',' + hazard + ',' + recovery + ',' + scenname + ',' +
               '{:.8},{:.8},{:.8},{:.8},{:.8},{:.8}'.format(rtd_cumtripcount, rtd_cumdist, rtd_cumtime/60, lost_trips,
@@ -623,26 +717,29 @@ def run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_fol
     logger.debug("total pht: {}  average per trip: {}".format(spb_cumtime/60, spb_cumtime/60/df_dem.sum().sum()))
     logger.debug("total pmt: {}  average per trip: {}".format(spb_cumdist, spb_cumdist/df_dem.sum().sum()))
 
-    logger.debug("total pht: {}  average per trip: {}".format(rtb_cumtime/60, rtb_cumtime/60/df_dem.sum().sum()))
-    logger.debug("total pmt: {}  average per trip: {}".format(rtb_cumdist, rtb_cumdist/df_dem.sum().sum()))
+    if run_routing:
+        logger.debug("total pht: {}  average per trip: {}".format(rtb_cumtime/60, rtb_cumtime/60/df_dem.sum().sum()))
+        logger.debug("total pmt: {}  average per trip: {}".format(rtb_cumdist, rtb_cumdist/df_dem.sum().sum()))
 
     logger.debug("total disrupt_pht: {}  average per trip: {}".format(spd_cumtime/60,
                                                                       spd_cumtime/60/df_newdem.sum().sum()))
     logger.debug("total disrupt_pmt: {}  average per trip: {}".format(spd_cumdist, spd_cumdist/df_newdem.sum().sum()))
 
-    logger.debug("total disrupt_pht: {}  average per trip: {}".format(rtd_cumtime/60,
-                                                                      rtd_cumtime/60/df_newdem.sum().sum()))
-    logger.debug("total disrupt_pmt: {}  average per trip: {}".format(rtd_cumdist, rtd_cumdist/df_newdem.sum().sum()))
+    if run_routing:
+        logger.debug("total disrupt_pht: {}  average per trip: {}".format(rtd_cumtime/60,
+                                                                          rtd_cumtime/60/df_newdem.sum().sum()))
+        logger.debug("total disrupt_pmt: {}  average per trip: {}".format(rtd_cumdist,
+                                                                          rtd_cumdist/df_newdem.sum().sum()))
 
     # Close the files
     spdf.close()
-    rtdf.close()
     f.close()
     nf.close()
     spbf.close()
-    rtbf.close()
+    if run_routing:
+        rtdf.close()
+        rtbf.close()
     outfile.close()
-    project.close()
 
 
 # ==============================================================================
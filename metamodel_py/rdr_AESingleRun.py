@@ -9,20 +9,44 @@ import geopandas as gpd
 import openmatrix as omx
 import sqlite3
 import shutil
+import json
+import itertools
+import datetime
 from scipy import stats
-from shapely import wkt
+import rdr_supporting
+import rdr_RunLedger
+import rdr_BinLookup
+import rdr_LinkIndex
+import rdr_DemandCatalog
+
+
+# record of files provided to a run folder by 'link' provisioning, see setup_run_folder
+PROVISIONING_FILE = 'provisioning.json'
+
+# link availability of the disrupted networks of the LHS design, built by the aeq_run task before the runs start
+LINK_AVAILABILITY_FILE = 'link_availability_{}.npz'
+
+# link availability table loaded in this process, keyed by (file path, modification time)
+_link_availability_cache = {}
+
+# number of rows of a demand CSV file read at a time by create_matrix
+DEMAND_CSV_CHUNK_SIZE = 1000000
+
+# folder of aeq_runs with the GIS files shared by runs, see create_gis_output
+GIS_FOLDER = 'gis'
+
+# link geometry of the networks parsed in this process, keyed by (network file path, modification time,
+# TrueShape.csv modification time, crs), oldest entry dropped when full
+_link_geometry_cache = {}
+LINK_GEOMETRY_CACHE_SIZE = 4
+
+# source files and settings of the shared GIS files written or checked by this process, keyed by file path
+_gis_file_cache = {}
 
 
 def run_AESingleRun(run_params, input_folder, output_folder, cfg, logger):
     logger.info("Start: AequilibraE single run module")
-    mtx_fldr = 'matrices'
-
-    # TrueShape.csv path, later used to check for existence of TrueShape.csv
-    true_shape_file = os.path.join(input_folder, 'LookupTables', 'TrueShape.csv')
 
-    # Coordinate reference system
-    crs = cfg['crs']
-    
     # run_params is a dictionary containing the parameters defining a single AequilibraE run
     # run_params['socio'] = 'base'  # string, e.g., 'base', 'urban', 'suburban', 'water'
     # run_params['projgroup'] = '04'  # string, e.g., '04', '30'
@@ -42,6 +66,187 @@ def run_AESingleRun(run_params, input_folder, output_folder, cfg, logger):
     logger.config("running AequilibraE with run parameter: run_minieq = {}".format(run_params['run_minieq']))
     logger.config("running AequilibraE with run parameter: matrix_name = {}".format(run_params['matrix_name']))
 
+    basescenname, base_run_folder, disruptscenname, disrupt_run_folder = get_run_folders(run_params, output_folder,
+                                                                                         cfg)
+    ledger_file = rdr_RunLedger.get_ledger_file(output_folder)
+
+    # create OMX file if CSV (or CSVs) are provided instead of OMX
+    check_demand_omx(run_params['socio'], input_folder, cfg, logger)
+
+    if run_params['socio'] != 'baseline_run':
+        # check if AequilibraE run has already been done successfully for this run ID with the same inputs
+        base_fingerprint = get_run_fingerprint('base', run_params, input_folder, ledger_file, cfg, logger)
+        fingerprint = get_run_fingerprint('disrupt', run_params, input_folder, ledger_file, cfg, logger, base_fingerprint)
+        if check_run_complete(ledger_file, output_folder, disrupt_run_folder, os.path.join(disrupt_run_folder, 'NetSkim.csv'),
+                              'disrupt', run_params, cfg, fingerprint, logger):
+            logger.info("AequilibraE run for {} already done for this run ID, skipping run".format(disrupt_run_folder))
+            return
+
+    # BASE NETWORK RUN #
+    # ----------------------------------------------------------------
+
+    # build base network run if not already done for this set of run parameters
+    build_base_run(run_params, input_folder, output_folder, base_run_folder, cfg, logger)
+
+    if run_params['socio'] != 'baseline_run':
+        # DISRUPTED NETWORK AND SHORTEST PATH SKIM #
+        # ----------------------------------------------------------------
+
+        # build disrupted network and shortest path skim if not already done for another elasticity
+        network_run_folder = get_network_run_folder(run_params, output_folder, cfg)
+        build_network_run(run_params, input_folder, output_folder, base_run_folder, network_run_folder, cfg, logger)
+
+        # DISRUPTED NETWORK RUN #
+        # ----------------------------------------------------------------
+
+        run_key = rdr_RunLedger.get_run_key(output_folder, disrupt_run_folder)
+        rdr_RunLedger.start_run(ledger_file, run_key, 'disrupt', run_params, cfg, fingerprint)
+        try:
+            run_disrupt_network(run_params, input_folder, output_folder, base_run_folder, network_run_folder,
+                                disrupt_run_folder, cfg, logger, ledger_file, run_key, base_fingerprint)
+        except Exception as e:
+            rdr_RunLedger.fail_run(ledger_file, run_key, e)
+            raise
+        rdr_RunLedger.complete_run(ledger_file, run_key, os.path.join(disrupt_run_folder, 'NetSkim.csv'))
+
+    logger.info("Finished: AequilibraE single run module")
+
+
+# ==============================================================================
+
+
+def run_AEBaseRun(run_params, input_folder, output_folder, cfg, logger):
+    # Runs only the base network portion of run_AESingleRun for a set of run parameters
+    # Used to build shared base runs before the dependent disrupt runs are dispatched
+    logger.info("Start: AequilibraE base run module")
+
+    basescenname, base_run_folder, disruptscenname, disrupt_run_folder = get_run_folders(run_params, output_folder,
+                                                                                         cfg)
+
+    check_demand_omx(run_params['socio'], input_folder, cfg, logger)
+
+    if not build_base_run(run_params, input_folder, output_folder, base_run_folder, cfg, logger):
+        logger.info("AequilibraE base run for {} already done for this run ID, skipping run".format(base_run_folder))
+
+    logger.info("Finished: AequilibraE base run module")
+
+
+# ==============================================================================
+
+
+def run_AENetworkRun(run_params, input_folder, output_folder, cfg, logger):
+    # Runs only the disrupted network and shortest path skim portion of run_AESingleRun for a set of run parameters
+    # Used to build shared network runs before the dependent disrupt runs are dispatched
+    logger.info("Start: AequilibraE network run module")
+
+    basescenname, base_run_folder, disruptscenname, disrupt_run_folder = get_run_folders(run_params, output_folder,
+                                                                                         cfg)
+    network_run_folder = get_network_run_folder(run_params, output_folder, cfg)
+
+    if not build_network_run(run_params, input_folder, output_folder, base_run_folder, network_run_folder, cfg,
+                             logger):
+        logger.info("AequilibraE network run for {} already done for this run ID, skipping run".format(
+            network_run_folder))
+
+    logger.info("Finished: AequilibraE network run module")
+
+
+# ==============================================================================
+
+
+def build_base_run(run_params, input_folder, output_folder, base_run_folder, cfg, logger):
+    # Builds the base network run for a set of run parameters if it has not been done yet
+    # A base run is shared by all disrupt runs of the same socio, projgroup, and matrix_name, so it is built under a
+    # file lock; a process that finds the lock held waits and then reuses the completed base run
+    # Returns True if the base run was built by this call
+    mtx_fldr = 'matrices'
+    basescenname = run_params['socio'] + run_params['projgroup']
+    ledger_file = rdr_RunLedger.get_ledger_file(output_folder)
+    run_key = rdr_RunLedger.get_run_key(output_folder, base_run_folder)
+
+    fingerprint = get_run_fingerprint('base', run_params, input_folder, ledger_file, cfg, logger)
+
+    lock = rdr_supporting.acquire_file_lock(base_run_folder + '.lock', logger)
+    try:
+        if check_run_complete(ledger_file, output_folder, base_run_folder,
+                              os.path.join(base_run_folder, mtx_fldr, 'sp_' + basescenname + '.omx'), 'base', run_params, cfg,
+                              fingerprint, logger):
+            return False
+        rdr_RunLedger.start_run(ledger_file, run_key, 'base', run_params, cfg, fingerprint)
+        try:
+            run_base_network(run_params, input_folder, base_run_folder, cfg, logger, ledger_file, run_key)
+        except Exception as e:
+            rdr_RunLedger.fail_run(ledger_file, run_key, e)
+            raise
+        rdr_RunLedger.complete_run(ledger_file, run_key)
+    finally:
+        rdr_supporting.release_file_lock(lock)
+
+    return True
+
+
+# ==============================================================================
+
+
+def build_network_run(run_params, input_folder, output_folder, base_run_folder, network_run_folder, cfg, logger):
+    # Builds the disrupted network and its shortest path skim for a set of run parameters if not done yet
+    # Neither depends on elasticity, so they are shared by all disrupt runs of the same socio, projgroup, resil, hazard,
+    # recovery, and matrix_name and built under a file lock, as for base runs
+    # Returns True if the disrupted network was built by this call
+    ledger_file = rdr_RunLedger.get_ledger_file(output_folder)
+    run_key = rdr_RunLedger.get_run_key(output_folder, network_run_folder)
+
+    fingerprint = get_run_fingerprint('network', run_params, input_folder, ledger_file, cfg, logger)
+
+    lock = rdr_supporting.acquire_file_lock(network_run_folder + '.lock', logger)
+    try:
+        if check_run_complete(ledger_file, output_folder, network_run_folder,
+                              os.path.join(network_run_folder, get_network_file(run_params, cfg)), 'network', run_params,
+                              cfg, fingerprint, logger):
+            return False
+        rdr_RunLedger.start_run(ledger_file, run_key, 'network', run_params, cfg, fingerprint)
+        try:
+            run_network_skim(run_params, input_folder, base_run_folder, network_run_folder, cfg, logger, ledger_file,
+                             run_key)
+        except Exception as e:
+            rdr_RunLedger.fail_run(ledger_file, run_key, e)
+            raise
+        rdr_RunLedger.complete_run(ledger_file, run_key)
+    finally:
+        rdr_supporting.release_file_lock(lock)
+
+    return True
+
+
+# ==============================================================================
+
+
+def check_run_complete(ledger_file, output_folder, run_folder, output_file, run_type, run_params, cfg, fingerprint,
+                       logger):
+    # A run is complete if marked complete in the run ledger with the same input fingerprint
+    # Runs not found in the ledger (e.g., done before the ledger was introduced) are complete if output_file exists
+    # (NetSkim.csv for disrupt runs, sp_{basescenname}.omx for base runs) and are then added to the ledger
+    # NOTE: network runs are always in the ledger, as they were introduced after it
+    run_key = rdr_RunLedger.get_run_key(output_folder, run_folder)
+    status, run_fingerprint = rdr_RunLedger.get_run_status(ledger_file, run_key)
+    if status is not None:
+        if status == 'complete' and run_fingerprint is not None and run_fingerprint != fingerprint:
+            logger.info("Inputs of AequilibraE run {} have changed since it was completed, re-running".format(run_folder))
+            return False
+        return status == 'complete'
+    if os.path.exists(output_file):
+        rdr_RunLedger.start_run(ledger_file, run_key, run_type, run_params, cfg, fingerprint)
+        rdr_RunLedger.complete_run(ledger_file, run_key, output_file if run_type == 'disrupt' else None)
+        return True
+    return False
+
+
+# ==============================================================================
+
+
+def get_run_folders(run_params, output_folder, cfg):
+    # Returns base and disrupt scenario names and AequilibraE run folders for a set of run parameters
+    # disruptscenname and disrupt_run_folder are None for 'baseline_run', which has no disrupt run
     elasname = str(int(10 * -run_params['elasticity']))
 
     # to avoid issues with a set of runs going past midnight, using cfg['run_id'] in folder name instead of date
@@ -56,6 +261,8 @@ def run_AESingleRun(run_params, input_folder, output_folder, cfg, logger):
         base_run_folder = os.path.join(output_folder, 'aeq_runs', 'base',
                                        str(cfg['run_id']), basescenname, run_params['matrix_name'])
 
+    disruptscenname = None
+    disrupt_run_folder = None
     if run_params['socio'] != 'baseline_run':
         disruptscenname = (basescenname + '_' + run_params['resil'] + '_' + elasname + '_' + run_params['hazard'] +
                            '_' + run_params['recovery'])
@@ -66,134 +273,414 @@ def run_AESingleRun(run_params, input_folder, output_folder, cfg, logger):
             disrupt_run_folder = os.path.join(output_folder, 'aeq_runs', 'disrupt',
                                               str(cfg['run_id']), disruptscenname, run_params['matrix_name'])
 
-        # check if AequilibraE run has already been done successfully (look for NetSkim.csv output) for this run ID
-        if os.path.exists(os.path.join(disrupt_run_folder, 'NetSkim.csv')):
-            logger.info("AequilibraE run for {} already done for this run ID, skipping run".format(disrupt_run_folder))
-            return
+    return basescenname, base_run_folder, disruptscenname, disrupt_run_folder
+
+
+# ==============================================================================
+
 
+def get_network_run_folder(run_params, output_folder, cfg):
+    # Returns folder of the disrupted network and shortest path skim shared by the disrupt runs of all elasticities
+    networkscenname = (run_params['socio'] + run_params['projgroup'] + '_' + run_params['resil'] + '_' +
+                       run_params['hazard'] + '_' + run_params['recovery'])
+    if run_params['socio'] == 'baseyear':
+        runs_folder = 'aeq_runs_base_year'
+    else:
+        runs_folder = 'aeq_runs'
+    return os.path.join(output_folder, runs_folder, 'disrupt_networks', str(cfg['run_id']), networkscenname,
+                        run_params['matrix_name'])
+
+
+# ==============================================================================
+
+
+def get_network_file(run_params, cfg):
+    # Returns file name of the disrupted network links table created by create_network_link_csv
+    return ('Group' + run_params['projgroup'] + '_' + run_params['resil'] + '_' + run_params['hazard'] + '_' +
+            run_params['recovery'] + rdr_supporting.get_table_ext(cfg))
+
+
+# ==============================================================================
+
+
+def check_demand_omx(socio, input_folder, cfg, logger):
     # create OMX file if CSV (or CSVs) are provided instead of OMX
+    mtx_fldr = 'matrices'
     demand_folder = os.path.join(input_folder, 'AEMaster', mtx_fldr)
-    demand_file = os.path.join(demand_folder, run_params['socio'] + '_demand_summed.omx')
+    demand_file = os.path.join(demand_folder, socio + '_demand_summed.omx')
     if not os.path.exists(demand_file):
-        logger.info("No OMX file detected for demand scenario {}. Reading from CSV to create OMX matrix.".format(run_params['socio']))
-        demand_csv_file = os.path.join(demand_folder, run_params['socio'] + '_demand_summed.csv')
-        nocar_demand_csv_file = os.path.join(demand_folder, run_params['socio'] + '_demand_summed_nocar.csv')
+        logger.info("No OMX file detected for demand scenario {}. Reading from CSV to create OMX matrix.".format(socio))
+        demand_csv_file = os.path.join(demand_folder, socio + '_demand_summed.csv')
+        nocar_demand_csv_file = os.path.join(demand_folder, socio + '_demand_summed_nocar.csv')
         if not os.path.exists(demand_csv_file):
             logger.error("DEMAND CSV FILE ERROR: {} could not be found".format(demand_csv_file))
             raise Exception("DEMAND CSV FILE ERROR: {} could not be found".format(demand_csv_file))
-        demand_csv_to_omx(demand_folder, run_params['socio'], demand_csv_file, nocar_demand_csv_file, cfg, logger)
+        demand_csv_to_omx(demand_folder, socio, demand_csv_file, nocar_demand_csv_file, cfg, logger)
 
-    # BASE NETWORK RUN #
-    # ----------------------------------------------------------------
+    return demand_file
 
-    # check if base network run was unsuccessful (look for sp_{basescenname}.omx output) for this set of run parameters
-    if not os.path.exists(os.path.join(base_run_folder, mtx_fldr, 'sp_' + basescenname + '.omx')):
-        # set up directory structure for AequilibraE run
-        network_db = setup_run_folder(run_params, input_folder, base_run_folder, logger)
-
-        # create base network csv file
-        create_network_link_csv('base', run_params, input_folder, base_run_folder, cfg, logger)
-
-        # open output_network_fullfile as pandas data frame, strip whitespace from headers
-        output_network_table = 'Group' + run_params['projgroup'] + '_baserun'
-        output_network_fullfile = os.path.join(base_run_folder, output_network_table + '.csv')
-        if not os.path.exists(output_network_fullfile):
-            logger.error("BASE NETWORK CSV FILE ERROR: {} could not be found".format(output_network_fullfile))
-            raise Exception("BASE NETWORK CSV FILE ERROR: {} could not be found".format(output_network_fullfile))
-        logger.info("GMNS_link table to be filled from {}".format(output_network_fullfile))
-        base_network = pd.read_csv(output_network_fullfile)
-        base_network.columns = base_network.columns.str.strip()
-
-        # SQLite code to create base network link table
-        with sqlite3.connect(network_db) as db_con:
-            # use to_sql to import base_network as table named output_network_table
-            # NOTE for to_sql: "Legacy support is provided for sqlite3.Connection objects."
-            base_network.to_sql('GMNS_link', db_con, if_exists='replace', index=False)
-            db_cur = db_con.cursor()
 
-            # create links table
-            sql1 = "delete from links;"
-            db_cur.execute(sql1)
-            sql2 = """insert into links(ogc_fid, link_id, a_node, b_node, direction, distance, modes,
-                    link_type, capacity_ab, speed_ab, free_flow_time, toll, alpha, beta)
-                    select link_id, link_id, from_node_id, to_node_id, directed, length, allowed_uses,
-                    facility_type, capacity, free_speed, travel_time, toll, alpha, beta
-                    from GMNS_link
-                    where GMNS_link.link_available > 0
-                    ;"""
-            db_cur.execute(sql2)
-            sql3 = "update links set capacity_ba = 0, speed_ba = 0"
-            db_cur.execute(sql3)
-
-        from rdr_AERouteBase import run_aeq_base
-        run_aeq_base(run_params, base_run_folder, cfg, logger)
-
-        link_flow_file = os.path.join(base_run_folder, 'link_flow_' + basescenname + '.csv')
-        link_flows = merge_network_outputs(run_params, base_run_folder, output_network_fullfile, link_flow_file, logger)
-        if os.path.exists(true_shape_file):
-            create_gis_output(run_params, input_folder, base_run_folder, link_flows, logger, crs)
+# ==============================================================================
 
-    if run_params['socio'] != 'baseline_run':
-        # DISRUPTED NETWORK RUN #
-        # ----------------------------------------------------------------
 
-        # set up directory structure for AequilibraE run
-        network_db = setup_run_folder(run_params, input_folder, disrupt_run_folder, logger)
-
-        # copy over base network run outputs, 'sp_{basescenname}.omx' and 'rt_{basescenname}.omx'
-        base_run_skims = os.path.join(base_run_folder, mtx_fldr, 'sp_' + basescenname + '.omx')
-        base_run_assignment = os.path.join(base_run_folder, mtx_fldr, 'rt_' + basescenname + '.omx')
-        if not os.path.exists(base_run_skims):
-            logger.error("BASE SKIMS FILE ERROR: {} could not be found".format(base_run_skims))
-            raise Exception("BASE SKIMS FILE ERROR: {} could not be found".format(base_run_skims))
-        if not os.path.exists(base_run_assignment):
-            logger.error("BASE ASSIGNMENT FILE ERROR: {} could not be found".format(base_run_assignment))
-            raise Exception("BASE ASSIGNMENT FILE ERROR: {} could not be found".format(base_run_assignment))
-
-        # calculate link availability for the disrupted network
-        calc_link_availability(run_params, input_folder, disrupt_run_folder, cfg, logger)
-
-        # create disrupted network csv file
-        create_network_link_csv('disrupt', run_params, input_folder, disrupt_run_folder, cfg, logger)
-
-        # open output_network_fullfile as pandas data frame, strip whitespace from headers
-        output_network_table = ('Group' + run_params['projgroup'] + '_' + run_params['resil'] +
-                                '_' + run_params['hazard'] + '_' + run_params['recovery'])
-        output_network_fullfile = os.path.join(disrupt_run_folder, output_network_table + '.csv')
-        if not os.path.exists(output_network_fullfile):
-            logger.error("DISRUPT NETWORK CSV FILE ERROR: {} could not be found".format(output_network_fullfile))
-            raise Exception("DISRUPT NETWORK CSV FILE ERROR: {} could not be found".format(output_network_fullfile))
-        disrupt_network = pd.read_csv(output_network_fullfile)
-        disrupt_network.columns = disrupt_network.columns.str.strip()
-
-        # SQLite code to create disrupted network link table
-        with sqlite3.connect(network_db) as db_con:
-            # use to_sql to import disrupt_network as table named output_network_table
-            # NOTE for to_sql: "Legacy support is provided for sqlite3.Connection objects."
-            disrupt_network.to_sql('GMNS_link', db_con, if_exists='replace', index=False)
-            db_cur = db_con.cursor()
+def run_base_network(run_params, input_folder, base_run_folder, cfg, logger, ledger_file, run_key):
+    basescenname = run_params['socio'] + run_params['projgroup']
+    true_shape_file = os.path.join(input_folder, 'LookupTables', 'TrueShape.csv')
+    output_network_table = 'Group' + run_params['projgroup'] + '_baserun'
+    output_network_fullfile = os.path.join(base_run_folder, output_network_table + rdr_supporting.get_table_ext(cfg))
+
+    # phases completed by a previous attempt of this run are not repeated
+    completed_phases = get_resume_phases(ledger_file, run_key, base_run_folder, logger)
+
+    if 'network_prepared' not in completed_phases:
+        phase_start = datetime.datetime.now()
+        prepare_base_network(run_params, input_folder, base_run_folder, output_network_fullfile, cfg, logger)
+        rdr_RunLedger.record_phase(ledger_file, run_key, 'network_prepared', phase_start)
+
+    if 'sp_skim' not in completed_phases:
+        phase_start = datetime.datetime.now()
+        from rdr_AERouteBase import run_aeq_base_skim
+        run_aeq_base_skim(run_params, base_run_folder, cfg, logger)
+        rdr_RunLedger.record_phase(ledger_file, run_key, 'sp_skim', phase_start)
+
+    # traffic assignment and the outputs derived from its link flows are skipped for shortest path only runs
+    if cfg['aeq_run_type'] == 'SP':
+        logger.debug("aeq_run_type is 'SP', skipping traffic assignment for base network {}".format(basescenname))
+        return
+
+    if 'assignment' not in completed_phases:
+        phase_start = datetime.datetime.now()
+        from rdr_AERouteBase import run_aeq_base_assignment
+        run_aeq_base_assignment(run_params, base_run_folder, cfg, logger)
+        rdr_RunLedger.record_phase(ledger_file, run_key, 'assignment', phase_start)
+
+    phase_start = datetime.datetime.now()
+    link_flow_file = os.path.join(base_run_folder, 'link_flow_' + basescenname + rdr_supporting.get_table_ext(cfg))
+    link_flows = merge_network_outputs(run_params, base_run_folder, output_network_fullfile, link_flow_file, logger)
+    if os.path.exists(true_shape_file):
+        create_gis_output(run_params, input_folder, base_run_folder, link_flows, cfg, logger)
+    rdr_RunLedger.record_phase(ledger_file, run_key, 'outputs', phase_start)
+
 
-            # create links table
-            sql1 = "delete from links;"
-            db_cur.execute(sql1)
-            sql2 = """insert into links(ogc_fid, link_id, a_node, b_node, direction, distance, modes, link_type,
-                    capacity_ab, speed_ab, free_flow_time, toll, alpha, beta)
-                    select link_id, link_id, from_node_id, to_node_id, directed, length, allowed_uses,
-                    facility_type, capacity, free_speed, travel_time, toll, alpha, beta
-                    from GMNS_link where GMNS_link.link_available > 0;"""
-            db_cur.execute(sql2)
-            sql3 = "update links set capacity_ba = 0, speed_ba = 0"
-            db_cur.execute(sql3)
-
-        from rdr_AERouteDisruptMiniEquilibrium import run_aeq_disrupt_miniequilibrium
-        run_aeq_disrupt_miniequilibrium(run_params, base_run_folder, disrupt_run_folder, cfg, logger)
-
-        link_flow_file = os.path.join(disrupt_run_folder, 'link_flow_adjdem_' + disruptscenname + '.csv')
-        link_flows = merge_network_outputs(run_params, disrupt_run_folder, output_network_fullfile, link_flow_file, logger)
+# ==============================================================================
+
+
+def prepare_base_network(run_params, input_folder, base_run_folder, output_network_fullfile, cfg, logger):
+    # set up directory structure for AequilibraE run
+    # AequilibraE opens the demand OMX file of the base assignment for writing, so it is always copied
+    network_db = setup_run_folder(run_params, input_folder, base_run_folder, cfg, logger, link_demand=False)
+
+    # create base network csv file
+    create_network_link_csv('base', run_params, input_folder, base_run_folder, cfg, logger)
+
+    # open output_network_fullfile as pandas data frame, strip whitespace from headers
+    if not os.path.exists(output_network_fullfile):
+        logger.error("BASE NETWORK CSV FILE ERROR: {} could not be found".format(output_network_fullfile))
+        raise Exception("BASE NETWORK CSV FILE ERROR: {} could not be found".format(output_network_fullfile))
+
+    # with aeq_graph_source = 'dataframe' the graph is built from the network csv file (see rdr_AEGraph),
+    # so the links table of project_database.sqlite is not filled
+    if cfg['aeq_graph_source'] == 'dataframe':
+        return
+
+    logger.info("GMNS_link table to be filled from {}".format(output_network_fullfile))
+    base_network = rdr_supporting.read_table(output_network_fullfile)
+    base_network.columns = base_network.columns.str.strip()
+
+    # SQLite code to create base network link table
+    with sqlite3.connect(network_db) as db_con:
+        # use to_sql to import base_network as table named output_network_table
+        # NOTE for to_sql: "Legacy support is provided for sqlite3.Connection objects."
+        base_network.to_sql('GMNS_link', db_con, if_exists='replace', index=False)
+        db_cur = db_con.cursor()
+
+        # create links table
+        sql1 = "delete from links;"
+        db_cur.execute(sql1)
+        sql2 = """insert into links(ogc_fid, link_id, a_node, b_node, direction, distance, modes,
+                link_type, capacity_ab, speed_ab, free_flow_time, toll, alpha, beta)
+                select link_id, link_id, from_node_id, to_node_id, directed, length, allowed_uses,
+                facility_type, capacity, free_speed, travel_time, toll, alpha, beta
+                from GMNS_link
+                where GMNS_link.link_available > 0
+                ;"""
+        db_cur.execute(sql2)
+        sql3 = "update links set capacity_ba = 0, speed_ba = 0"
+        db_cur.execute(sql3)
+
+
+# ==============================================================================
+
+
+def run_network_skim(run_params, input_folder, base_run_folder, network_run_folder, cfg, logger, ledger_file, run_key):
+    # Creates the disrupted network and runs the shortest path skim in network_run_folder
+    # The skim is not run if no links are disrupted, as disrupt runs then use the base run skims
+    # network run folder is named {networkscenname}/{matrix_name}
+    networkscenname = os.path.basename(os.path.dirname(network_run_folder))
+    output_network_fullfile = os.path.join(network_run_folder, get_network_file(run_params, cfg))
+
+    # phases completed by a previous attempt of this run are not repeated
+    completed_phases = get_resume_phases(ledger_file, run_key, network_run_folder, logger)
+
+    if 'network_prepared' not in completed_phases:
+        phase_start = datetime.datetime.now()
+        prepare_disrupt_network(run_params, input_folder, network_run_folder, output_network_fullfile, cfg, logger)
+        rdr_RunLedger.record_phase(ledger_file, run_key, 'network_prepared', phase_start)
+
+    disrupt_network = rdr_supporting.read_table(output_network_fullfile, usecols=['link_available'])
+    if (disrupt_network['link_available'] == 1).all():
+        logger.debug("All links available in disrupted network {}, shortest path skim not run".format(networkscenname))
+        return
+
+    if 'sp_skim' not in completed_phases:
+        phase_start = datetime.datetime.now()
+        from rdr_AERouteDisruptMiniEquilibrium import run_aeq_disrupt_skim
+        run_aeq_disrupt_skim(run_params, base_run_folder, network_run_folder, cfg, logger)
+        rdr_RunLedger.record_phase(ledger_file, run_key, 'sp_skim', phase_start)
+
+
+# ==============================================================================
+
+
+def prepare_disrupt_network(run_params, input_folder, network_run_folder, output_network_fullfile, cfg, logger):
+    # set up directory structure for AequilibraE run
+    network_db = setup_run_folder(run_params, input_folder, network_run_folder, cfg, logger)
+
+    # calculate link availability for the disrupted network
+    calc_link_availability(run_params, input_folder, network_run_folder, cfg, logger)
+
+    # create disrupted network csv file
+    create_network_link_csv('disrupt', run_params, input_folder, network_run_folder, cfg, logger)
+
+    # open output_network_fullfile as pandas data frame, strip whitespace from headers
+    if not os.path.exists(output_network_fullfile):
+        logger.error("DISRUPT NETWORK CSV FILE ERROR: {} could not be found".format(output_network_fullfile))
+        raise Exception("DISRUPT NETWORK CSV FILE ERROR: {} could not be found".format(output_network_fullfile))
+
+    # with aeq_graph_source = 'dataframe' the graph is built from the network csv file (see rdr_AEGraph),
+    # so the links table of project_database.sqlite is not filled
+    if cfg['aeq_graph_source'] == 'dataframe':
+        return
+
+    disrupt_network = rdr_supporting.read_table(output_network_fullfile)
+    disrupt_network.columns = disrupt_network.columns.str.strip()
+
+    # SQLite code to create disrupted network link table
+    with sqlite3.connect(network_db) as db_con:
+        # use to_sql to import disrupt_network as table named output_network_table
+        # NOTE for to_sql: "Legacy support is provided for sqlite3.Connection objects."
+        disrupt_network.to_sql('GMNS_link', db_con, if_exists='replace', index=False)
+        db_cur = db_con.cursor()
+
+        # create links table
+        sql1 = "delete from links;"
+        db_cur.execute(sql1)
+        sql2 = """insert into links(ogc_fid, link_id, a_node, b_node, direction, distance, modes, link_type,
+                capacity_ab, speed_ab, free_flow_time, toll, alpha, beta)
+                select link_id, link_id, from_node_id, to_node_id, directed, length, allowed_uses,
+                facility_type, capacity, free_speed, travel_time, toll, alpha, beta
+                from GMNS_link where GMNS_link.link_available > 0;"""
+        db_cur.execute(sql2)
+        sql3 = "update links set capacity_ba = 0, speed_ba = 0"
+        db_cur.execute(sql3)
+
+
+# ==============================================================================
+
+
+def run_disrupt_network(run_params, input_folder, output_folder, base_run_folder, network_run_folder,
+                        disrupt_run_folder, cfg, logger, ledger_file, run_key, base_fingerprint):
+    # disrupt run folder is named {disruptscenname}/{matrix_name}
+    disruptscenname = os.path.basename(os.path.dirname(disrupt_run_folder))
+    true_shape_file = os.path.join(input_folder, 'LookupTables', 'TrueShape.csv')
+    output_network_table = os.path.splitext(get_network_file(run_params, cfg))[0]
+    output_network_fullfile = os.path.join(disrupt_run_folder, get_network_file(run_params, cfg))
+
+    # phases completed by a previous attempt of this run are not repeated
+    completed_phases = get_resume_phases(ledger_file, run_key, disrupt_run_folder, logger)
+
+    if 'network_prepared' not in completed_phases:
+        phase_start = datetime.datetime.now()
+        prepare_disrupt_run_folder(run_params, input_folder, base_run_folder, network_run_folder, disrupt_run_folder,
+                                   cfg, logger)
+        rdr_RunLedger.record_phase(ledger_file, run_key, 'network_prepared', phase_start)
+
+    # runs with an identical disrupted network, base run, demand, and elasticity settings have identical outputs,
+    # so reuse the outputs of a completed run (from this or a previous run ID) if one exists
+    network_hash = get_network_hash(run_params, output_network_fullfile, ledger_file, cfg, base_fingerprint)
+    rdr_RunLedger.set_network_hash(ledger_file, run_key, network_hash)
+    for match_key in rdr_RunLedger.find_network_match(ledger_file, network_hash, run_key):
+        match_run_folder = os.path.join(output_folder, *match_key.split('/'))
+        phase_start = datetime.datetime.now()
+        if alias_disrupt_run(run_params, match_run_folder, disrupt_run_folder, cfg, logger):
+            rdr_RunLedger.record_phase(ledger_file, run_key, 'aliased', phase_start)
+            return
+
+    disrupt_network = rdr_supporting.read_table(output_network_fullfile, usecols=['link_available'])
+
+    # a disrupted network with every link fully available is identical to the base network,
+    # so skims and link flows are taken from the base run rather than recomputed
+    if (disrupt_network['link_available'] == 1).all():
+        logger.debug("All links available in disrupted network {}, using base run skims and link flows".format(
+            output_network_table))
+        phase_start = datetime.datetime.now()
+        from rdr_AERouteDisruptMiniEquilibrium import run_aeq_disrupt_no_disruption
+        run_aeq_disrupt_no_disruption(run_params, base_run_folder, disrupt_run_folder, cfg, logger)
+        rdr_RunLedger.record_phase(ledger_file, run_key, 'no_disruption', phase_start)
+        if cfg['aeq_run_type'] == 'SP':
+            return
+
+        phase_start = datetime.datetime.now()
+        link_flow_file = os.path.join(disrupt_run_folder, 'link_flow_adjdem_' + disruptscenname +
+                                      rdr_supporting.get_table_ext(cfg))
+        link_flows = merge_network_outputs(run_params, disrupt_run_folder, output_network_fullfile, link_flow_file,
+                                           logger)
         if os.path.exists(true_shape_file):
-            create_gis_output(run_params, input_folder, disrupt_run_folder, link_flows, logger, crs)
+            create_gis_output(run_params, input_folder, disrupt_run_folder, link_flows, cfg, logger)
+        rdr_RunLedger.record_phase(ledger_file, run_key, 'outputs', phase_start)
+        return
+
+    from rdr_AERouteDisruptMiniEquilibrium import run_aeq_disrupt_assignment, write_netskim_summary
+    # shortest path only runs adjust the demand without traffic assignment, and have no link flow outputs
+    if cfg['aeq_run_type'] == 'SP':
+        if 'demand_adjusted' not in completed_phases:
+            phase_start = datetime.datetime.now()
+            from rdr_AERouteDisruptMiniEquilibrium import run_aeq_disrupt_sp_demand
+            run_aeq_disrupt_sp_demand(run_params, base_run_folder, disrupt_run_folder, cfg, logger)
+            rdr_RunLedger.record_phase(ledger_file, run_key, 'demand_adjusted', phase_start)
+
+        phase_start = datetime.datetime.now()
+        write_netskim_summary(run_params, base_run_folder, disrupt_run_folder, cfg, logger)
+        rdr_RunLedger.record_phase(ledger_file, run_key, 'summary', phase_start)
+        return
+
+    # the mini-equilibrium pass reuses the graph and traffic assignment of the first pass if both are run here
+    assignment = None
+    if 'assignment' not in completed_phases:
+        phase_start = datetime.datetime.now()
+        assignment = run_aeq_disrupt_assignment(run_params, base_run_folder, disrupt_run_folder, cfg, logger, False)
+        rdr_RunLedger.record_phase(ledger_file, run_key, 'assignment', phase_start)
+
+    if run_params['run_minieq'] == 1 and 'minieq' not in completed_phases:
+        phase_start = datetime.datetime.now()
+        run_aeq_disrupt_assignment(run_params, base_run_folder, disrupt_run_folder, cfg, logger, True, assignment)
+        rdr_RunLedger.record_phase(ledger_file, run_key, 'minieq', phase_start)
+
+    if 'summary' not in completed_phases:
+        phase_start = datetime.datetime.now()
+        write_netskim_summary(run_params, base_run_folder, disrupt_run_folder, cfg, logger)
+        rdr_RunLedger.record_phase(ledger_file, run_key, 'summary', phase_start)
+
+    phase_start = datetime.datetime.now()
+    link_flow_file = os.path.join(disrupt_run_folder, 'link_flow_adjdem_' + disruptscenname +
+                                  rdr_supporting.get_table_ext(cfg))
+    link_flows = merge_network_outputs(run_params, disrupt_run_folder, output_network_fullfile, link_flow_file, logger)
+    if os.path.exists(true_shape_file):
+        create_gis_output(run_params, input_folder, disrupt_run_folder, link_flows, cfg, logger)
+    rdr_RunLedger.record_phase(ledger_file, run_key, 'outputs', phase_start)
 
-    logger.info("Finished: AequilibraE single run module")
+
+# ==============================================================================
+
+
+def prepare_disrupt_run_folder(run_params, input_folder, base_run_folder, network_run_folder, disrupt_run_folder,
+                               cfg, logger):
+    mtx_fldr = 'matrices'
+    basescenname = run_params['socio'] + run_params['projgroup']
+    # run folders are named {disruptscenname}/{matrix_name} and {networkscenname}/{matrix_name}
+    disruptscenname = os.path.basename(os.path.dirname(disrupt_run_folder))
+    networkscenname = os.path.basename(os.path.dirname(network_run_folder))
+
+    # set up directory structure for AequilibraE run, starting from the SQLite database of the disrupted network
+    setup_run_folder(run_params, input_folder, disrupt_run_folder, cfg, logger,
+                     source_db=os.path.join(network_run_folder, 'project_database.sqlite'))
+
+    # copy over base network run outputs, 'sp_{basescenname}.omx' and 'rt_{basescenname}.omx'
+    # ('rt_{basescenname}.omx' is not written by shortest path only runs, aeq_run_type = 'SP')
+    base_run_skims = os.path.join(base_run_folder, mtx_fldr, 'sp_' + basescenname + '.omx')
+    base_run_assignment = os.path.join(base_run_folder, mtx_fldr, 'rt_' + basescenname + '.omx')
+    if not os.path.exists(base_run_skims):
+        logger.error("BASE SKIMS FILE ERROR: {} could not be found".format(base_run_skims))
+        raise Exception("BASE SKIMS FILE ERROR: {} could not be found".format(base_run_skims))
+    if cfg['aeq_run_type'] == 'RT' and not os.path.exists(base_run_assignment):
+        logger.error("BASE ASSIGNMENT FILE ERROR: {} could not be found".format(base_run_assignment))
+        raise Exception("BASE ASSIGNMENT FILE ERROR: {} could not be found".format(base_run_assignment))
+
+    # copy over disrupted network shared by all elasticities: link availability and network csv files,
+    # SQLite database with the disrupted network link table, and shortest path skim (not run if no links are disrupted)
+    # (the SQLite database was already provided by setup_run_folder)
+    # these files are only read by the disrupt run, so they are linked rather than copied with 'link' provisioning
+    link_avail_file = ('NP_Disrupt_' + run_params['resil'] + '_' + run_params['hazard'] + '_' + run_params['recovery'] +
+                       rdr_supporting.get_table_ext(cfg))
+    network_files = {link_avail_file: link_avail_file,
+                     get_network_file(run_params, cfg): get_network_file(run_params, cfg)}
+    for network_file, run_file in network_files.items():
+        if not os.path.exists(os.path.join(network_run_folder, network_file)):
+            logger.error("DISRUPT NETWORK FILE ERROR: {} could not be found".format(os.path.join(network_run_folder,
+                                                                                                  network_file)))
+            raise Exception("DISRUPT NETWORK FILE ERROR: {} could not be found".format(os.path.join(network_run_folder,
+                                                                                                     network_file)))
+        provide_run_file(os.path.join(network_run_folder, network_file), disrupt_run_folder, run_file, cfg, logger)
+    network_skims = os.path.join(network_run_folder, mtx_fldr, 'sp_disrupt_' + networkscenname + '.omx')
+    if os.path.exists(network_skims):
+        provide_run_file(network_skims, disrupt_run_folder, os.path.join(mtx_fldr, 'sp_disrupt_' + disruptscenname + '.omx'),
+                         cfg, logger)
+
+
+# ==============================================================================
+
+
+def alias_disrupt_run(run_params, match_run_folder, disrupt_run_folder, cfg, logger):
+    # Copies the outputs of a completed disrupt run with an identical disrupted network into disrupt_run_folder,
+    # renaming files and relabeling NetSkim.csv rows with the run parameters of this run
+    # Returns False if any output of the matching run is missing, in which case the run is done normally
+    mtx_fldr = 'matrices'
+    basescenname = run_params['socio'] + run_params['projgroup']
+    # run folders are named {disruptscenname}/{matrix_name}
+    match_scenname = os.path.basename(os.path.dirname(match_run_folder))
+    disruptscenname = os.path.basename(os.path.dirname(disrupt_run_folder))
+    table_ext = rdr_supporting.get_table_ext(cfg)
+
+    output_files = {os.path.join(mtx_fldr, 'sp_disrupt_' + match_scenname + '.omx'): os.path.join(mtx_fldr, 'sp_disrupt_' + disruptscenname + '.omx'),
+                    os.path.join(mtx_fldr, 'new_demand_summed.omx'): os.path.join(mtx_fldr, 'new_demand_summed.omx'),
+                    'NetSkim.csv': 'NetSkim.csv'}
+    # routing skims and link flows are only written if traffic assignment is run (aeq_run_type = 'RT')
+    if cfg['aeq_run_type'] == 'RT':
+        output_files[os.path.join(mtx_fldr, 'rt_disrupt_' + match_scenname + '.omx')] = os.path.join(mtx_fldr, 'rt_disrupt_' + disruptscenname + '.omx')
+        output_files['link_flow_adjdem_' + match_scenname + table_ext] = 'link_flow_adjdem_' + disruptscenname + table_ext
+        output_files['link_flow_full' + table_ext] = 'link_flow_full' + table_ext
+    optional_files = {'link_flow_full.json': 'link_flow_full.json',
+                      'node.json': 'node.json'}
+    for match_file in output_files:
+        if not os.path.exists(os.path.join(match_run_folder, match_file)):
+            logger.debug("Output {} of matching run {} not found, not reusing outputs".format(match_file, match_run_folder))
+            return False
+
+    logger.info("Disrupted network of {} is identical to completed run {}, reusing its outputs".format(
+        disrupt_run_folder, match_run_folder))
+    for match_file, run_file in list(output_files.items()) + list(optional_files.items()):
+        if match_file == 'NetSkim.csv' or not os.path.exists(os.path.join(match_run_folder, match_file)):
+            continue
+        # remove any file linked by 'link' provisioning first so the copy does not write through to the linked file
+        if os.path.lexists(os.path.join(disrupt_run_folder, run_file)):
+            os.remove(os.path.join(disrupt_run_folder, run_file))
+        shutil.copy2(os.path.join(match_run_folder, match_file), os.path.join(disrupt_run_folder, run_file))
+
+    # rewrite the scenario columns of NetSkim.csv, leaving the metrics as written by the matching run
+    # scenario columns are read as in rdr_CompileAE, so the rows compile the same as those of a run done normally
+    netskim = pd.read_csv(os.path.join(match_run_folder, 'NetSkim.csv'),
+                          converters={'Type': str, 'SP/RT': str, 'socio': str, 'projgroup': str, 'resil': str,
+                                      'elasticity': float, 'hazard': str, 'recovery': str, 'Scenario': str})
+    netskim['socio'] = run_params['socio']
+    netskim['projgroup'] = run_params['projgroup']
+    netskim['resil'] = run_params['resil']
+    netskim['elasticity'] = float(run_params['elasticity'])
+    netskim['hazard'] = run_params['hazard']
+    netskim['recovery'] = run_params['recovery']
+    netskim['Scenario'] = np.where(netskim['Type'] == 'Base', basescenname, disruptscenname)
+    netskim.to_csv(os.path.join(disrupt_run_folder, 'NetSkim.csv'), index=False)
+
+    return True
 
 
 # ==============================================================================
@@ -202,14 +689,21 @@ def run_AESingleRun(run_params, input_folder, output_folder, cfg, logger):
 def merge_network_outputs(run_params, output_folder, network_file, flow_file, logger):
     logger.info("Start: merge core model outputs")
 
-    links = pd.read_csv(network_file, converters={'link_id': str, 'from_node_id': str, 'to_node_id': str, 'wkt': str})
-    flows = pd.read_csv(flow_file, usecols=['link_id', 'matrix_ab', 'matrix_ba', 'matrix_tot'],
-                        converters={'link_id': str, 'matrix_ab': float, 'matrix_ba': float, 'matrix_tot': float})
-    links = pd.merge(links, flows, how="left", left_on="link_id", right_on="link_id")
+    links = rdr_supporting.read_table(network_file, converters={'link_id': str, 'from_node_id': str, 'to_node_id': str,
+                                                                'wkt': str})
+    flows = rdr_supporting.read_table(flow_file, usecols=['link_id', 'matrix_ab', 'matrix_ba', 'matrix_tot'],
+                                      converters={'link_id': str, 'matrix_ab': float, 'matrix_ba': float,
+                                                  'matrix_tot': float})
+    # left join of the link flows on link_id
+    positions = rdr_LinkIndex.get_link_positions(rdr_LinkIndex.make_link_index(flows['link_id'].values),
+                                                 links['link_id'].values)
+    for column in ['matrix_ab', 'matrix_ba', 'matrix_tot']:
+        links[column] = rdr_LinkIndex.take_link_values(flows[column].values, positions)
     links = links.assign(vcr = lambda x: np.where(x['capacity'] == 0, 99999, x['matrix_ab'] / x['capacity']))
     links = links.rename(columns={'matrix_ab': 'link_flow_ab', 'matrix_ba': 'link_flow_ba', 'matrix_tot': 'link_flow_total'})
-    combined_file = os.path.join(output_folder, 'link_flow_full.csv')
-    links.to_csv(combined_file, index=False)
+    # link_flow_full is written in the same format as the network links table
+    combined_file = os.path.join(output_folder, 'link_flow_full' + os.path.splitext(network_file)[1])
+    rdr_supporting.write_table(links, combined_file)
 
     logger.info("Finished: merge core model outputs")
 
@@ -219,35 +713,130 @@ def merge_network_outputs(run_params, output_folder, network_file, flow_file, lo
 # ==============================================================================
 
 
-def create_gis_output(run_params, input_folder, output_folder, link_flows, logger, crs):
-    # This function converts a specified link_flows_full CSV to a GIS-compatible GeoJSON object
+def create_gis_output(run_params, input_folder, output_folder, link_flows, cfg, logger):
+    # This function writes the GIS outputs of an AequilibraE run, depending on cfg['gis_output']:
+    # 'per_run' writes link_flow_full.json, a GeoJSON of the network links with link flows, and node.json in the run folder
+    # 'shared' writes the link geometry of each network and the nodes once, in the gis folder of aeq_runs; the link flows
+    # of the run are joined on link_id from its link_flow_full table when viewed
     # Inputs:
     # input_folder = input data directory (e.g., 'C:\GitHub\RDR\scenarios\qs1_sioux_falls\Data\inputs')
     # output_folder = AequilibraE run directory (e.g., 'C:\GitHub\RDR\scenarios\qs1_sioux_falls\Data\generated_files\aeq_runs\base\QS1\base02\matrix')
     # link_flows = DataFrame of joined network link attributes and link flows
+    if cfg['gis_output'] == 'shared':
+        get_shared_link_geometry_file(run_params, input_folder, link_flows, cfg, logger)
+        get_shared_node_file(input_folder, 'node.fgb', cfg, logger)
+        return
 
     # Links
-    # Set geometry column from wkt column
-    link_flows['geometry'] = link_flows['wkt'].apply(wkt.loads)
-
-    # Create GeoDataFrame
-    gdf = gpd.GeoDataFrame(link_flows, crs=crs)
-    gdf = gdf.to_crs('epsg:4326')
+    # geometry in EPSG:4326 is parsed from the wkt column once per network
+    gdf = gpd.GeoDataFrame(link_flows, geometry=get_link_geometry(run_params, input_folder, link_flows, cfg, logger).values,
+                           crs='epsg:4326')
 
     # Export to GeoJSON
     gdf.to_file(os.path.join(output_folder, 'link_flow_full.json'), driver="GeoJSON")
 
     # Nodes
+    # the same for every run, written once and provided to the run folder
+    node_file = get_shared_node_file(input_folder, 'node.json', cfg, logger)
+    if os.path.lexists(os.path.join(output_folder, 'node.json')):
+        os.remove(os.path.join(output_folder, 'node.json'))
+    provide_run_file(node_file, output_folder, 'node.json', cfg, logger)
+
+
+# ==============================================================================
+
+
+def get_link_geometry(run_params, input_folder, link_flows, cfg, logger):
+    # Returns the geometry of the network links of link_flows in EPSG:4326, parsed from its wkt column (from
+    # TrueShape.csv) and projected from cfg['crs'] once per network in this process
+    network_file = os.path.join(input_folder, 'Networks', run_params['socio'] + run_params['projgroup'] + '.csv')
+    true_shape_file = os.path.join(input_folder, 'LookupTables', 'TrueShape.csv')
+    cache_key = (os.path.abspath(network_file), os.path.getmtime(network_file), os.path.getmtime(true_shape_file),
+                 cfg['crs'])
+    link_ids = link_flows['link_id'].values
+    if cache_key in _link_geometry_cache and np.array_equal(_link_geometry_cache[cache_key][0], link_ids):
+        return _link_geometry_cache[cache_key][1]
+
+    logger.debug("parsing link geometry of network {}".format(network_file))
+    geometry = gpd.GeoSeries.from_wkt(link_flows['wkt'].values, crs=cfg['crs']).to_crs('epsg:4326')
+    if len(_link_geometry_cache) >= LINK_GEOMETRY_CACHE_SIZE:
+        _link_geometry_cache.pop(next(iter(_link_geometry_cache)))
+    _link_geometry_cache[cache_key] = (link_ids.copy(), geometry)
+    return geometry
+
+
+# ==============================================================================
+
+
+def get_shared_link_geometry_file(run_params, input_folder, link_flows, cfg, logger):
+    # Returns the FlatGeobuf file of link_id and geometry (EPSG:4326) of the network links of the socio and projgroup
+    # of run_params in the gis folder of aeq_runs, written by the first run of the network
+    network_file = os.path.join(input_folder, 'Networks', run_params['socio'] + run_params['projgroup'] + '.csv')
+    true_shape_file = os.path.join(input_folder, 'LookupTables', 'TrueShape.csv')
+    gis_file = os.path.join(cfg['output_dir'], 'aeq_runs', GIS_FOLDER,
+                            run_params['socio'] + run_params['projgroup'] + '_links.fgb')
+
+    def make_gdf():
+        return gpd.GeoDataFrame({'link_id': link_flows['link_id'].values},
+                                geometry=get_link_geometry(run_params, input_folder, link_flows, cfg, logger).values,
+                                crs='epsg:4326')
+
+    return write_shared_gis_file(gis_file, [network_file, true_shape_file], {'crs': cfg['crs']}, make_gdf, logger)
+
+
+# ==============================================================================
+
+
+def get_shared_node_file(input_folder, file_name, cfg, logger):
+    # Returns the GIS file of the network nodes (node.json as GeoJSON, node.fgb as FlatGeobuf) in the gis folder of
+    # aeq_runs, written once from node.csv
     nodes_csv = os.path.join(input_folder, 'Networks', 'node.csv')
-    node_data = pd.read_csv(nodes_csv, usecols=['node_id', 'x_coord', 'y_coord', 'node_type'],
-                            converters={'node_id': str, 'x_coord': float, 'y_coord': float, 'node_type': str})
-    node_data['geometry'] = gpd.points_from_xy(node_data.x_coord, node_data.y_coord, crs='epsg:4326')
+    gis_file = os.path.join(cfg['output_dir'], 'aeq_runs', GIS_FOLDER, file_name)
 
-    # Create GeoDataFrame
-    gdf = gpd.GeoDataFrame(node_data, crs='epsg:4326')
+    def make_gdf():
+        node_data = rdr_supporting.read_static_table(nodes_csv, 'node', logger,
+                                                     usecols=['node_id', 'x_coord', 'y_coord', 'node_type'])
+        node_data['geometry'] = gpd.points_from_xy(node_data.x_coord, node_data.y_coord, crs='epsg:4326')
+        return gpd.GeoDataFrame(node_data, crs='epsg:4326')
 
-    # Export to GeoJSON
-    gdf.to_file(os.path.join(output_folder, 'node.json'), driver="GeoJSON")
+    return write_shared_gis_file(gis_file, [nodes_csv], {}, make_gdf, logger)
+
+
+# ==============================================================================
+
+
+def write_shared_gis_file(gis_file, source_files, settings, make_gdf, logger):
+    # Writes GeoDataFrame make_gdf() to gis_file (GeoJSON or FlatGeobuf, by file extension) unless it was already
+    # written from the same source files and settings, recorded in a .source.json file next to it
+    source = {'files': [[os.path.abspath(f), os.path.getsize(f), os.path.getmtime(f)] for f in source_files],
+              'settings': settings}
+    if _gis_file_cache.get(gis_file) == source:
+        return gis_file
+
+    source_file = gis_file + '.source.json'
+    # parallel workers wait for the first one to write the file
+    lock = rdr_supporting.acquire_file_lock(gis_file + '.lock', logger)
+    try:
+        up_to_date = False
+        if os.path.exists(gis_file) and os.path.exists(source_file):
+            with open(source_file, 'r') as rf:
+                up_to_date = json.load(rf) == source
+
+        if not up_to_date:
+            logger.debug("writing shared GIS file {}".format(gis_file))
+            driver = 'FlatGeobuf' if gis_file.endswith('.fgb') else 'GeoJSON'
+            tmp_file = gis_file + '.tmp'
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            make_gdf().to_file(tmp_file, driver=driver)
+            os.replace(tmp_file, gis_file)
+            with open(source_file, 'w') as wf:
+                json.dump(source, wf)
+    finally:
+        rdr_supporting.release_file_lock(lock)
+
+    _gis_file_cache[gis_file] = source
+    return gis_file
 
 
 # ==============================================================================
@@ -258,31 +847,102 @@ def calc_link_availability(run_params, input_folder, output_folder, cfg, logger)
                   "recovery = {}, resil = {}, socio = {}, projgroup = {}".format(run_params['recovery'], run_params['resil'],
                                                                                  run_params['socio'], run_params['projgroup'])))
 
+    output_disrupt_file = os.path.join(output_folder, ('NP_Disrupt_' + run_params['resil'] + '_' +
+                                                       run_params['hazard'] + '_' + run_params['recovery'] +
+                                                       rdr_supporting.get_table_ext(cfg)))
+
+    # link availability of the disrupted networks of the LHS design is calculated up front by the aeq_run task
+    # (see build_link_availability_table)
+    # the link availability table is only link_id and link_available (float32) whether it comes from the link
+    # availability table of the aeq_run task or is calculated here, as create_network_link_csv reads only these
+    availabilities = get_batch_link_availability(run_params, input_folder, cfg, logger)
+    if availabilities is not None:
+        rdr_supporting.write_table(availabilities, output_disrupt_file)
+        logger.result("Link availability table for disrupted network written to {}".format(output_disrupt_file))
+        return
+
+    # table mapping resilience project to network links
+    projects = get_project_links(input_folder, cfg, logger)
+
+    # exposure levels for a particular hazard event, with facility type and zone connector flag of each link
+    np_disrupt = get_exposed_links(run_params, input_folder, cfg, logger)
+    num_rows = np_disrupt.shape[0]
+
+    recovery_depth = int(run_params['recovery'])
+
+    # convert any string in 'Project ID' column to 1 and NaN to 0 in new 'VulProject' column
+    # project links of a resilience project are unique (see get_project_links)
+    resil_links = projects.loc[projects['Project ID'] == run_params['resil'], :]
+    positions = rdr_LinkIndex.get_link_positions(rdr_LinkIndex.make_link_index(resil_links['link_id'].values),
+                                                 np_disrupt['link_id'].values)
+    np_disrupt['Project ID'] = rdr_LinkIndex.take_link_values(resil_links['Project ID'].values, positions)
+    np_disrupt['Exposure Reduction'] = rdr_LinkIndex.take_link_values(resil_links['Exposure Reduction'].values,
+                                                                      positions)
+    # links not associated with resilience project do not have Exposure Reduction
+    np_disrupt['Exposure Reduction'] = np.where(np_disrupt['Project ID'].isna(), 0, np_disrupt['Exposure Reduction'])
+    np_disrupt['VulProject'] = np.where(np_disrupt['Project ID'].isna(), 0, 1)
+    logger.debug("Number of links designated zone connectors: {}".format(sum(np_disrupt['ZoneConn'] == 1)))
+    logger.debug("Number of links associated with resilience project {}: {}".format(run_params['resil'],
+                                                                                    sum(np_disrupt['VulProject'] == 1)))
+
+    # (1) calculate exposure level with recovery_depth
+    logger.debug("calculating link availability")
+    np_disrupt['recov_value'] = np_disrupt[cfg['exposure_field']] - recovery_depth
+    np_disrupt.loc[np_disrupt['recov_value'] < 0, ['recov_value']] = 0
+
+    # (2) update exposure values for network links associated with the resilience project
+    logger.debug("applying resilience project exposure reduction")
+    np_disrupt['recov_value'] = np_disrupt['recov_value'] - np_disrupt['Exposure Reduction']
+    np_disrupt.loc[np_disrupt['recov_value'] < 0, ['recov_value']] = 0
+
+    # (3) calculate 'link_available' column based on recov_value and link_availability_approach
+    logger.config("{} link availability approach to be used".format(cfg['link_availability_approach']))
+    np_disrupt['link_available'] = calc_availability_function(np_disrupt['recov_value'].values,
+                                                              np_disrupt['facility_type'].values, cfg, logger)
+
+    # (4) ensure 'link_available' values equal 1 for network links associated with the resilience project in binary case
+    # or network links given value 99999 for Exposure Reduction in manual case
+    if cfg['resil_mitigation_approach'] == 'binary':
+        # Use binary case where if link is associated with resilience project then 'link_available' = 1
+        np_disrupt['link_available'] = np.where(np_disrupt['VulProject'] == 1, 1, np_disrupt['link_available'])
+    elif cfg['resil_mitigation_approach'] == 'manual':
+        # For manual case if link is assigned 99999 by user then 'link_available' = 1
+        np_disrupt['link_available'] = np.where(np_disrupt['Exposure Reduction'] == 99999.0, 1,
+                                                np_disrupt['link_available'])
+
+    # (5) after calculating generic link availability, update 'link_available' values for zone connector network links
+    # zone connector network links are not disrupted by hazard events
+    np_disrupt['link_available'] = np.where(np_disrupt['ZoneConn'] == 1, 1, np_disrupt['link_available'])
+
+    logger.debug(("Number of 'link_available' values " +
+                  "missing: {}".format(np_disrupt[np_disrupt['link_available'].isnull()].shape[0])))
+    logger.debug("Size of np_disrupt table: {}".format(np_disrupt.shape))
+
+    if np_disrupt.shape[0] != num_rows:
+        logger.warning(("Table joins to calculate link availability not unique for " +
+                        "hazard = {}, recovery = {}, resil = {}".format(run_params['hazard'], run_params['recovery'],
+                                                                        run_params['resil'])))
+
+    rdr_supporting.write_table(pd.DataFrame({'link_id': np_disrupt['link_id'].values,
+                                             'link_available': np_disrupt['link_available'].values.astype(np.float32)}),
+                               output_disrupt_file)
+    logger.result("Link availability table for disrupted network written to {}".format(output_disrupt_file))
+
+    logger.debug(("finished: calculate link availability for " +
+                  "hazard = {}, recovery = {}, resil = {}".format(run_params['hazard'], run_params['recovery'],
+                                                                  run_params['resil'])))
+
+
+# ==============================================================================
+
+
+def get_project_links(input_folder, cfg, logger):
+    # Returns table of resilience project network links with the 'Exposure Reduction' of each link
     project_table = os.path.join(input_folder, 'LookupTables', 'project_table.csv')
     if not os.path.exists(project_table):
         logger.error("PROJECT TABLE FILE ERROR: {} could not be found".format(project_table))
         raise Exception("PROJECT TABLE FILE ERROR: {} could not be found".format(project_table))
 
-    model_params_file = os.path.join(input_folder, 'Model_Parameters.xlsx')
-    if not os.path.exists(model_params_file):
-        logger.error("MODEL PARAMETERS FILE ERROR: {} could not be found".format(model_params_file))
-        raise Exception("MODEL PARAMETERS FILE ERROR: {} could not be found".format(model_params_file))
-
-    hazard_events = pd.read_excel(model_params_file, sheet_name='Hazards', usecols=['Hazard Event', 'Filename'],
-                                  converters={'Hazard Event': str, 'Filename': str})
-    # look up corresponding filename for exposure input file from hazards list
-    filename = hazard_events.loc[hazard_events['Hazard Event'] == run_params['hazard'], 'Filename'].dropna().tolist()[0]
-    exposure_table = os.path.join(input_folder, 'Hazards', str(filename) + '.csv')
-    if not os.path.exists(exposure_table):
-        logger.error("EXPOSURE TABLE FILE ERROR: {} could not be found".format(exposure_table))
-        raise Exception("EXPOSURE TABLE FILE ERROR: {} could not be found".format(exposure_table))
-
-    network_table = os.path.join(input_folder, 'Networks', run_params['socio'] + run_params['projgroup'] + '.csv')
-    if not os.path.exists(network_table):
-        logger.error("NETWORK TABLE FILE ERROR: {} could not be found".format(network_table))
-        raise Exception("NETWORK TABLE FILE ERROR: {} could not be found".format(network_table))
-
-    # table mapping resilience project to network links
     # link availability for resilience project network links depends on mitigation impact
     # options are 'binary' (default), 'manual'
     # if resil mitigation approach is manual, read in Exposure Reduction field as well
@@ -290,13 +950,13 @@ def calc_link_availability(run_params, input_folder, output_folder, cfg, logger)
     resil_mitigation_approach = cfg['resil_mitigation_approach']
     logger.config("{} resilience project mitigation approach to be used".format(resil_mitigation_approach))
     if resil_mitigation_approach == 'binary':
-        projects = pd.read_csv(project_table, usecols=['Project ID', 'link_id'],
-                               converters={'Project ID': str, 'link_id': str})
+        projects = rdr_supporting.read_static_table(project_table, 'project_table', logger,
+                                                    usecols=['Project ID', 'link_id'])
         # NOTE: use 99999 to denote complete mitigation
         projects['Exposure Reduction'] = 99999.0
     elif resil_mitigation_approach == 'manual':
-        projects = pd.read_csv(project_table, usecols=['Project ID', 'link_id', 'Exposure Reduction'],
-                               converters={'Project ID': str, 'link_id': str, 'Exposure Reduction': float})
+        projects = rdr_supporting.read_static_table(project_table, 'project_table', logger,
+                                                    usecols=['Project ID', 'link_id', 'Exposure Reduction'])
     else:
         logger.error("Invalid option selected for resilience mitigation approach.")
         raise Exception("Variable resil_mitigation_approach must be set to 'binary' or 'manual'.")
@@ -304,70 +964,71 @@ def calc_link_availability(run_params, input_folder, output_folder, cfg, logger)
     # catch any empty values in Exposure Reduction field and set to 0 reduction
     projects['Exposure Reduction'] = projects['Exposure Reduction'].fillna(0)
     projects.drop_duplicates(subset=['Project ID', 'link_id'], inplace=True, ignore_index=True)
+    logger.debug("Size of project table: {}".format(projects.shape))
+
+    return projects
+
+
+# ==============================================================================
+
+
+def get_exposed_links(run_params, input_folder, cfg, logger):
+    # Returns exposure table of the hazard event of run_params with the facility type (from the network of the socio
+    # and projgroup of run_params) and zone connector flag of each link
+    exposure_table = get_exposure_file(run_params, input_folder, logger)
+    if not os.path.exists(exposure_table):
+        logger.error("EXPOSURE TABLE FILE ERROR: {} could not be found".format(exposure_table))
+        raise Exception("EXPOSURE TABLE FILE ERROR: {} could not be found".format(exposure_table))
+
+    network_table = os.path.join(input_folder, 'Networks', run_params['socio'] + run_params['projgroup'] + '.csv')
+    if not os.path.exists(network_table):
+        logger.error("NETWORK TABLE FILE ERROR: {} could not be found".format(network_table))
+        raise Exception("NETWORK TABLE FILE ERROR: {} could not be found".format(network_table))
 
     # table with exposure levels for a particular hazard event
-    exposures = pd.read_csv(exposure_table, usecols=['link_id', 'from_node_id', 'to_node_id', cfg['exposure_field']],
-                            converters={'link_id': str, 'from_node_id': str, 'to_node_id': str, cfg['exposure_field']: float})
+    # node ids are read as integers to find zone connectors
+    exposures = rdr_supporting.read_static_table(exposure_table, 'exposure', logger,
+                                                 usecols=['link_id', 'from_node_id', 'to_node_id', cfg['exposure_field']],
+                                                 dtypes={'from_node_id': 'int', 'to_node_id': 'int',
+                                                         cfg['exposure_field']: 'float'})
     exposures.drop_duplicates(subset=['link_id'], inplace=True, ignore_index=True)
     # catch any empty values in exposure field and set to 0 exposure
     exposures[cfg['exposure_field']] = exposures[cfg['exposure_field']].fillna(0)
 
-    # table with facility types for each network link
-    network_links = pd.read_csv(network_table, usecols=['link_id', 'facility_type'],
-                                converters={'link_id': str, 'facility_type': str})
+    # table with facility types for each network link, in the order of the network link index
+    network_links = rdr_supporting.read_static_table(network_table, 'link', logger,
+                                                     usecols=['link_id', 'facility_type'])
+    network_index = rdr_LinkIndex.get_link_index(network_table, logger)
 
-    logger.debug("Size of project table: {}".format(projects.shape))
     logger.debug("Size of exposure table: {}".format(exposures.shape))
     logger.debug("Size of network link table: {}".format(network_links.shape))
 
-    recovery_depth = int(run_params['recovery'])
-
     np_disrupt = exposures.copy(deep=True)
-    num_rows = np_disrupt.shape[0]
 
-    # merge in facility_type from network link table
-    np_disrupt = pd.merge(np_disrupt, network_links, how='left', on=['link_id'], indicator=True)
-    logger.debug(("Number of network links not found in network table: {}".format(sum(np_disrupt['_merge'] == 'left_only'))))
-    if np_disrupt.shape[0] != num_rows:
-        logger.error(("TABLE JOIN ERROR: Join of exposure table with network link table " +
-                      "resulted in duplicate rows. Check that link_id in network link table is unique."))
-        raise Exception(("TABLE JOIN ERROR: Join of exposure table with network link table " +
-                         "resulted in duplicate rows. Check that link_id in network link table is unique."))
-    np_disrupt.drop(labels=['_merge'], axis=1, inplace=True)
+    # look up facility_type of each link in network link table (link_id in network link table is unique)
+    positions = rdr_LinkIndex.get_link_positions(network_index, np_disrupt['link_id'].values)
+    logger.debug(("Number of network links not found in network table: {}".format(sum(positions < 0))))
+    np_disrupt['facility_type'] = rdr_LinkIndex.take_link_values(network_links['facility_type'].values, positions)
 
     # zone connector network links defined as having at least one centroid node
-    np_disrupt['ZoneConn'] = np.where((np_disrupt['from_node_id'].astype(int) < cfg['zone_conn']) | (np_disrupt['to_node_id'].astype(int) < cfg['zone_conn']), 1, 0)
+    np_disrupt['ZoneConn'] = np.where((np_disrupt['from_node_id'].values < cfg['zone_conn']) | (np_disrupt['to_node_id'].values < cfg['zone_conn']), 1, 0)
 
-    # convert any string in 'Project ID' column to 1 and NaN to 0 in new 'VulProject' column
-    np_disrupt = pd.merge(np_disrupt, projects.loc[projects['Project ID'] == run_params['resil'],
-                                                   ['Project ID', 'link_id', 'Exposure Reduction']],
-                          how='left', on=['link_id'])
-    # links not associated with resilience project do not have Exposure Reduction
-    np_disrupt['Exposure Reduction'] = np.where(np_disrupt['Project ID'].isna(), 0, np_disrupt['Exposure Reduction'])
-    np_disrupt['VulProject'] = np.where(np_disrupt['Project ID'].isna(), 0, 1)
-    logger.debug("Number of links designated zone connectors: {}".format(sum(np_disrupt['ZoneConn'] == 1)))
-    logger.debug("Number of links associated with resilience project {}: {}".format(run_params['resil'],
-                                                                                    sum(np_disrupt['VulProject'] == 1)))
+    return np_disrupt
 
-    # (1) calculate exposure level with recovery_depth
-    logger.debug("calculating link availability")
-    np_disrupt['recov_value'] = np_disrupt[cfg['exposure_field']] - recovery_depth
-    np_disrupt.loc[np_disrupt['recov_value'] < 0, ['recov_value']] = 0
 
-    # (2) update exposure values for network links associated with the resilience project
-    logger.debug("applying resilience project exposure reduction")
-    np_disrupt['recov_value'] = np_disrupt['recov_value'] - np_disrupt['Exposure Reduction']
-    np_disrupt.loc[np_disrupt['recov_value'] < 0, ['recov_value']] = 0
+# ==============================================================================
 
-    # (3) calculate 'link_available' column based on recov_value and link_availability_approach
+
+def calc_availability_function(recov_value, facility_type, cfg, logger):
+    # Returns link availability for exposure levels recov_value (after recovery and resilience project exposure
+    # reduction), an array of links or of links x scenarios, of links with facility types facility_type
     # exposure level to link availability functionality taken from exposure_grid_overlay.py helper tool
     # potential options are 'binary', 'default_flood_exposure_function', 'manual', 'beta_distribution_function'
     link_availability_approach = cfg['link_availability_approach']
-    logger.config("{} link availability approach to be used".format(link_availability_approach))
 
     if link_availability_approach == 'binary':
         # Use binary case where if 'recov_value' > 0 then 'link_available' = 0, else 'link_available' = 1
-        np_disrupt['link_available'] = np.where(np_disrupt['recov_value'] > 0, 0, 1)
+        link_available = np.where(recov_value > 0, 0, 1)
 
     if link_availability_approach == 'default_flood_exposure_function':
         exposure_unit = cfg['exposure_unit']
@@ -377,68 +1038,40 @@ def calc_link_availability(run_params, input_folder, output_folder, cfg, logger)
 
         # Convert exposure units to millimeters
         if exposure_unit.lower() in ['feet', 'ft', 'foot']:
-            np_disrupt['link_available'] = 1 - (np_disrupt['recov_value'] * 304.8 / 300)
+            link_available = 1 - (recov_value * 304.8 / 300)
         if exposure_unit.lower() in ['yards', 'yard']:
-            np_disrupt['link_available'] = 1 - (np_disrupt['recov_value'] * 914.4 / 300)
+            link_available = 1 - (recov_value * 914.4 / 300)
         if exposure_unit.lower() in ['meters', 'm']:
-            np_disrupt['link_available'] = 1 - (np_disrupt['recov_value'] * 1000 / 300)
+            link_available = 1 - (recov_value * 1000 / 300)
 
-        np_disrupt.loc[np_disrupt['link_available'] < 0, ['link_available']] = 0
+        link_available[link_available < 0] = 0
 
-    if link_availability_approach == 'manual':
+    if link_availability_approach in ['manual', 'facility_type_manual']:
         link_availability_csv = cfg['link_availability_csv']
         if not os.path.exists(link_availability_csv):
             logger.error("LINK AVAILABILITY FILE ERROR: {} could not be found".format(link_availability_csv))
             raise Exception("LINK AVAILABILITY FILE ERROR: {} could not be found".format(link_availability_csv))
-        # Set up default link availability to avoid key error
-        np_disrupt['link_available'] = None
+
+    if link_availability_approach == 'manual':
         # Use manual approach where a user-defined CSV lists the range of values and the link availability associated
         # with each range
         # Minimum (inclusive) and maximum (exclusive) value must be defined for each range
-        # Read through the CSV
-        # for line in CSV
-        with open(link_availability_csv, 'r') as rf:
-            line_num = 1
-            for line in rf:
-                if line_num > 1:
-                    csv_row = line.rstrip('\n').split(',')
-                    min = float(csv_row[0])
-                    max = float(csv_row[1])
-                    np_disrupt['link_available'] = np.where((np_disrupt['recov_value'] >= min) &
-                                                            (np_disrupt['recov_value'] < max),
-                                                            csv_row[2], np_disrupt['link_available'])
-                line_num += 1
+        bin_lookup = rdr_BinLookup.read_bin_lookup(link_availability_csv)
         # Set to fully available if the value is not in the table
-        np_disrupt['link_available'] = np_disrupt['link_available'].fillna(1)
+        link_available = rdr_BinLookup.lookup_bin_values(bin_lookup, recov_value.ravel(),
+                                                         default=1).reshape(recov_value.shape)
 
     if link_availability_approach == 'facility_type_manual':
-        link_availability_csv = cfg['link_availability_csv']
-        if not os.path.exists(link_availability_csv):
-            logger.error("LINK AVAILABILITY FILE ERROR: {} could not be found".format(link_availability_csv))
-            raise Exception("LINK AVAILABILITY FILE ERROR: {} could not be found".format(link_availability_csv))
-        # Set up default link availability to avoid key error
-        np_disrupt['link_available'] = None
         # Use manual approach where a user-defined CSV lists the range of values and the link availability associated
         # with each range for every facility type
         # Minimum (inclusive) and maximum (exclusive) value must be defined for each range
-        # Read through the CSV
-        # for line in CSV
-        with open(link_availability_csv, 'r') as rf:
-            line_num = 1
-            for line in rf:
-                if line_num > 1:
-                    csv_row = line.rstrip('\n').split(',')
-                    # fac_type should be str
-                    fac_type = csv_row[0]
-                    min = float(csv_row[1])
-                    max = float(csv_row[2])
-                    np_disrupt['link_available'] = np.where((np_disrupt['facility_type'] == fac_type) &
-                                                            (np_disrupt['recov_value'] >= min) &
-                                                            (np_disrupt['recov_value'] < max),
-                                                            csv_row[3], np_disrupt['link_available'])
-                line_num += 1
+        # facility types are compared as str
+        bin_lookup = rdr_BinLookup.read_bin_lookup(link_availability_csv, keyed=True)
+        if recov_value.ndim > 1:
+            facility_type = np.repeat(facility_type, recov_value.shape[1])
         # Set to fully available if the value is not in the table
-        np_disrupt['link_available'] = np_disrupt['link_available'].fillna(1)
+        link_available = rdr_BinLookup.lookup_bin_values(bin_lookup, recov_value.ravel(), keys=facility_type,
+                                                         default=1).reshape(recov_value.shape)
 
     if link_availability_approach == 'beta_distribution_function':
         alpha = cfg['alpha']
@@ -448,51 +1081,254 @@ def calc_link_availability(run_params, input_folder, output_folder, cfg, logger)
         beta_method = cfg['beta_method']
         # Use beta distribution function
         if beta_method == 'lower cumulative':
-            np_disrupt['link_available'] = np.where(np_disrupt['recov_value'] < lower_bound, 0,
-                                                    np.where(np_disrupt['recov_value'] > upper_bound, 1,
-                                                             (stats.beta.cdf(np_disrupt['recov_value'], alpha, beta,
-                                                                             loc=lower_bound,
-                                                                             scale=upper_bound - lower_bound))))
+            link_available = np.where(recov_value < lower_bound, 0,
+                                      np.where(recov_value > upper_bound, 1,
+                                               (stats.beta.cdf(recov_value, alpha, beta, loc=lower_bound,
+                                                               scale=upper_bound - lower_bound))))
         elif beta_method == 'upper cumulative':
-            np_disrupt['link_available'] = np.where(np_disrupt['recov_value'] < lower_bound, 1,
-                                                    np.where(np_disrupt['recov_value'] > upper_bound, 0,
-                                                             (1 - (stats.beta.cdf(np_disrupt['recov_value'], alpha,
-                                                                                  beta, loc=lower_bound,
-                                                                                  scale=upper_bound - lower_bound)))))
+            link_available = np.where(recov_value < lower_bound, 1,
+                                      np.where(recov_value > upper_bound, 0,
+                                               (1 - (stats.beta.cdf(recov_value, alpha, beta, loc=lower_bound,
+                                                                    scale=upper_bound - lower_bound)))))
 
-    # (4) ensure 'link_available' values equal 1 for network links associated with the resilience project in binary case
-    # or network links given value 99999 for Exposure Reduction in manual case
-    if resil_mitigation_approach == 'binary':
-        # Use binary case where if link is associated with resilience project then 'link_available' = 1
-        np_disrupt['link_available'] = np.where(np_disrupt['VulProject'] == 1, 1, np_disrupt['link_available'])
-    elif resil_mitigation_approach == 'manual':
-        # For manual case if link is assigned 99999 by user then 'link_available' = 1
-        np_disrupt['link_available'] = np.where(np_disrupt['Exposure Reduction'] == 99999.0, 1,
-                                                np_disrupt['link_available'])
+    return link_available
 
-    # (5) after calculating generic link availability, update 'link_available' values for zone connector network links
-    # zone connector network links are not disrupted by hazard events
-    np_disrupt['link_available'] = np.where(np_disrupt['ZoneConn'] == 1, 1, np_disrupt['link_available'])
 
-    logger.debug(("Number of 'link_available' values " +
-                  "missing: {}".format(np_disrupt[np_disrupt['link_available'].isnull()].shape[0])))
-    logger.debug("Size of np_disrupt table: {}".format(np_disrupt.shape))
+# ==============================================================================
 
-    if np_disrupt.shape[0] != num_rows:
-        logger.warning(("Table joins to calculate link availability not unique for " +
-                        "hazard = {}, recovery = {}, resil = {}".format(run_params['hazard'], run_params['recovery'],
-                                                                        run_params['resil'])))
 
-    output_disrupt_file = os.path.join(output_folder, ('NP_Disrupt_' + run_params['resil'] + '_' +
-                                                       run_params['hazard'] + '_' + run_params['recovery'] + '.csv'))
+def get_link_availability_file(cfg):
+    # Returns file of link availability of the disrupted networks of the LHS design built by the aeq_run task
+    return os.path.join(cfg['output_dir'], 'aeq_runs', LINK_AVAILABILITY_FILE.format(cfg['run_id']))
 
-    with open(output_disrupt_file, "w", newline='') as f:
-        np_disrupt.to_csv(f, index=False)
-        logger.result("Link availability table for disrupted network written to {}".format(output_disrupt_file))
 
-    logger.debug(("finished: calculate link availability for " +
-                  "hazard = {}, recovery = {}, resil = {}".format(run_params['hazard'], run_params['recovery'],
-                                                                  run_params['resil'])))
+# ==============================================================================
+
+
+def get_link_availability_inputs(run_params, input_folder, cfg, logger):
+    # Returns the inputs and settings the link availability of the disrupted network of run_params depends on,
+    # with the size and modification time of each input file, to check a link availability table is up to date
+    input_files = [get_exposure_file(run_params, input_folder, logger),
+                   os.path.join(input_folder, 'LookupTables', 'project_table.csv'),
+                   os.path.join(input_folder, 'Networks', run_params['socio'] + run_params['projgroup'] + '.csv')]
+    if cfg['link_availability_approach'] in ['manual', 'facility_type_manual']:
+        input_files.append(cfg['link_availability_csv'])
+    inputs = {'files': [[os.path.abspath(f), os.path.getsize(f), os.path.getmtime(f)] if os.path.exists(f) else [f]
+                        for f in input_files]}
+    for key in ['link_availability_approach', 'exposure_field', 'exposure_unit', 'alpha', 'beta', 'lower_bound',
+                'upper_bound', 'beta_method', 'resil_mitigation_approach', 'zone_conn']:
+        # some settings are only defined for particular link availability approaches
+        inputs[key] = cfg.get(key)
+    return json.dumps(inputs, sort_keys=True)
+
+
+# ==============================================================================
+
+
+def build_link_availability_table(aeq_runs, input_folder, cfg, logger):
+    # Calculates link availability of the disrupted network of every (socio, projgroup, hazard, recovery, resil)
+    # combination of aeq_runs, saved to get_link_availability_file as a links x scenarios float32 array
+    # All scenarios of a socio, projgroup, and hazard share the exposure table, so their link availability is
+    # calculated in one operation on a links x (recovery, resil) array of exposure levels
+    # Links not in the exposure table of a scenario are NaN
+    # Scenarios with a missing exposure table are left out, so their runs fall back to calc_link_availability
+    # The table is not rebuilt if it has every scenario and the inputs of each scenario are unchanged
+    scenario_keys = ['socio', 'projgroup', 'hazard', 'recovery', 'resil']
+    scenarios = []
+    for run_params in aeq_runs:
+        if run_params['socio'] == 'baseline_run':
+            continue
+        scenario = tuple(run_params[key] for key in scenario_keys)
+        if scenario in scenarios:
+            continue
+        exposure_file = get_exposure_file(dict(zip(scenario_keys, scenario)), input_folder, logger)
+        if not os.path.exists(exposure_file):
+            logger.warning("Exposure table {} could not be found, link availability of {} not calculated up front".format(
+                exposure_file, scenario))
+            continue
+        scenarios.append(scenario)
+    scenario_inputs = [get_link_availability_inputs(dict(zip(scenario_keys, scenario)), input_folder, cfg, logger)
+                       for scenario in scenarios]
+
+    link_availability_file = get_link_availability_file(cfg)
+    if os.path.exists(link_availability_file):
+        with np.load(link_availability_file) as f:
+            table_inputs = dict(zip([tuple(scenario) for scenario in f['scenarios'].tolist()], f['inputs'].tolist()))
+        if all(table_inputs.get(scenario) == inputs for scenario, inputs in zip(scenarios, scenario_inputs)):
+            logger.info("link availability of disrupted networks in {} is up to date".format(link_availability_file))
+            return
+
+    logger.info("calculating link availability of disrupted networks")
+    projects = get_project_links(input_folder, cfg, logger)
+
+    columns = {}
+    for (socio, projgroup, hazard), group in itertools.groupby(sorted(scenarios, key=lambda x: x[:3]),
+                                                               key=lambda x: x[:3]):
+        group = list(group)
+        np_disrupt = get_exposed_links(dict(zip(scenario_keys, group[0])), input_folder, cfg, logger)
+        exposure = np_disrupt[cfg['exposure_field']].values
+        recovery_depth = np.array([int(scenario[3]) for scenario in group])
+
+        # exposure reduction and resilience project flag of each link for each scenario
+        exposure_reduction = np.zeros((np_disrupt.shape[0], len(group)))
+        vul_project = np.zeros((np_disrupt.shape[0], len(group)), dtype=bool)
+        for resil in set([scenario[4] for scenario in group]):
+            resil_links = projects.loc[projects['Project ID'] == resil, :]
+            positions = rdr_LinkIndex.get_link_positions(rdr_LinkIndex.make_link_index(resil_links['link_id'].values),
+                                                         np_disrupt['link_id'].values)
+            in_resil = np.array([scenario[4] == resil for scenario in group])
+            exposure_reduction[:, in_resil] = rdr_LinkIndex.take_link_values(resil_links['Exposure Reduction'].values,
+                                                                             positions, fill_value=0)[:, None]
+            vul_project[:, in_resil] = (positions >= 0)[:, None]
+
+        # (1) exposure level with recovery_depth, (2) resilience project exposure reduction
+        recov_value = np.maximum(exposure[:, None] - recovery_depth[None, :], 0)
+        recov_value = np.maximum(recov_value - exposure_reduction, 0)
+
+        # (3) link availability based on recov_value and link_availability_approach
+        link_available = calc_availability_function(recov_value, np_disrupt['facility_type'].values, cfg,
+                                                    logger).astype(float)
+
+        # (4) resilience project links, (5) zone connector links, as in calc_link_availability
+        if cfg['resil_mitigation_approach'] == 'binary':
+            link_available[vul_project] = 1
+        elif cfg['resil_mitigation_approach'] == 'manual':
+            link_available[vul_project & (exposure_reduction == 99999.0)] = 1
+        link_available[np_disrupt['ZoneConn'].values == 1, :] = 1
+
+        for i, scenario in enumerate(group):
+            columns[scenario] = (np_disrupt['link_id'].values, link_available[:, i])
+
+    # rows of the table are the links of all exposure tables, in order of first appearance
+    link_index = rdr_LinkIndex.make_link_index(*[link_ids for link_ids, values in columns.values()])
+    table = np.full((len(link_index), len(scenarios)), np.nan, dtype=np.float32)
+    for j, scenario in enumerate(scenarios):
+        link_ids, values = columns[scenario]
+        table[rdr_LinkIndex.get_link_positions(link_index, link_ids), j] = values
+
+    if not os.path.exists(os.path.dirname(link_availability_file)):
+        os.makedirs(os.path.dirname(link_availability_file))
+    np.savez_compressed(link_availability_file,
+                        link_id=np.array(link_index.values, dtype=str),
+                        scenarios=np.array(scenarios, dtype=str).reshape(len(scenarios), len(scenario_keys)),
+                        inputs=np.array(scenario_inputs, dtype=str),
+                        link_available=table)
+    logger.result("Link availability of {} disrupted networks written to {}".format(len(scenarios),
+                                                                                  link_availability_file))
+
+
+# ==============================================================================
+
+
+def get_batch_link_availability(run_params, input_folder, cfg, logger):
+    # Returns link_id and link_available of the disrupted network of run_params from the link availability table
+    # built by build_link_availability_table, or None if the table does not have the scenario or is out of date
+    link_availability_file = get_link_availability_file(cfg)
+    if not os.path.exists(link_availability_file):
+        return None
+
+    cache_key = (link_availability_file, os.path.getmtime(link_availability_file))
+    if cache_key not in _link_availability_cache:
+        _link_availability_cache.clear()
+        with np.load(link_availability_file) as f:
+            _link_availability_cache[cache_key] = {
+                'link_id': f['link_id'],
+                'scenarios': {tuple(scenario): j for j, scenario in enumerate(f['scenarios'].tolist())},
+                'inputs': f['inputs'],
+                'link_available': f['link_available']}
+    table = _link_availability_cache[cache_key]
+
+    scenario = (run_params['socio'], run_params['projgroup'], run_params['hazard'], run_params['recovery'],
+                run_params['resil'])
+    if scenario not in table['scenarios']:
+        return None
+    j = table['scenarios'][scenario]
+    if table['inputs'][j] != get_link_availability_inputs(run_params, input_folder, cfg, logger):
+        logger.debug("Link availability table {} is out of date for {}, calculating link availability".format(
+            link_availability_file, scenario))
+        return None
+
+    logger.debug("using link availability of {} from link availability table {}".format(scenario,
+                                                                                        link_availability_file))
+    link_available = table['link_available'][:, j]
+    in_scenario = ~np.isnan(link_available)
+    return pd.DataFrame({'link_id': table['link_id'][in_scenario], 'link_available': link_available[in_scenario]})
+
+
+# ==============================================================================
+
+
+def get_exposure_file(run_params, input_folder, logger):
+    # look up corresponding filename for exposure input file from hazards list in Model_Parameters.xlsx
+    model_params_file = os.path.join(input_folder, 'Model_Parameters.xlsx')
+    if not os.path.exists(model_params_file):
+        logger.error("MODEL PARAMETERS FILE ERROR: {} could not be found".format(model_params_file))
+        raise Exception("MODEL PARAMETERS FILE ERROR: {} could not be found".format(model_params_file))
+
+    hazard_events = rdr_supporting.read_model_params(model_params_file, 'Hazards', logger,
+                                                     usecols=['Hazard Event', 'Filename'])
+    filename = hazard_events.loc[hazard_events['Hazard Event'] == run_params['hazard'], 'Filename'].dropna().tolist()[0]
+    return os.path.join(input_folder, 'Hazards', str(filename) + '.csv')
+
+
+# ==============================================================================
+
+
+def get_run_fingerprint(run_type, run_params, input_folder, ledger_file, cfg, logger, base_fingerprint=None):
+    # Fingerprint of the input files and config settings used by a base or disrupt run
+    # A completed run is re-run by the aeq_run task if its fingerprint changes
+    # Network runs (the disrupted network and shortest path skim shared by all elasticities) depend on the disruption
+    # settings; disrupt runs also include the elasticity settings and the fingerprint of their base run
+    # NOTE: project_database.sqlite in AEMaster is rewritten from node.csv by every aeq_run task, so node.csv is used
+    input_files = {'network': os.path.join(input_folder, 'Networks', run_params['socio'] + run_params['projgroup'] + '.csv'),
+                   'node': os.path.join(input_folder, 'Networks', 'node.csv'),
+                   'true_shape': os.path.join(input_folder, 'LookupTables', 'TrueShape.csv'),
+                   'link_types': os.path.join(input_folder, 'LookupTables', 'link_types_table.csv'),
+                   'demand': os.path.join(input_folder, 'AEMaster', 'matrices', run_params['socio'] + '_demand_summed.omx')}
+    settings = {'matrix_name': run_params['matrix_name']}
+    for key in ['vot_per_hour', 'aeq_max_iter', 'aeq_rgap_target', 'blocked_centroid_flows', 'crs']:
+        settings[key] = cfg[key]
+    # intermediate tables are read by dependent runs, so runs are re-run if their format changes
+    # only included if not the default 'csv' so fingerprints of existing runs are unchanged
+    if cfg['intermediate_format'] != 'csv':
+        settings['intermediate_format'] = cfg['intermediate_format']
+    # shortest path only base and disrupt runs have no routing outputs, so they are not reused by routing runs
+    # only included if 'SP' so fingerprints of existing runs are unchanged
+    if run_type in ['base', 'disrupt'] and cfg['aeq_run_type'] == 'SP':
+        settings['aeq_run_type'] = cfg['aeq_run_type']
+
+    if run_type in ['network', 'disrupt']:
+        input_files['exposure'] = get_exposure_file(run_params, input_folder, logger)
+        input_files['project_table'] = os.path.join(input_folder, 'LookupTables', 'project_table.csv')
+        if cfg['link_availability_approach'] in ['manual', 'facility_type_manual']:
+            input_files['link_availability'] = cfg['link_availability_csv']
+        for key in ['resil', 'hazard', 'recovery']:
+            settings[key] = run_params[key]
+        for key in ['link_availability_approach', 'exposure_field', 'exposure_unit', 'alpha', 'beta', 'lower_bound',
+                    'upper_bound', 'beta_method', 'resil_mitigation_approach', 'zone_conn']:
+            # some settings are only defined for particular link availability approaches
+            settings[key] = cfg.get(key)
+
+    if run_type == 'disrupt':
+        for key in ['elasticity', 'run_minieq']:
+            settings[key] = run_params[key]
+        settings['calc_transit_metrics'] = cfg['calc_transit_metrics']
+        settings['base_fingerprint'] = base_fingerprint
+
+    return rdr_RunLedger.get_fingerprint(ledger_file, input_files, settings)
+
+
+# ==============================================================================
+
+
+def get_network_hash(run_params, network_file, ledger_file, cfg, base_fingerprint):
+    # Hash of the disrupted network links table network_file of a disrupt run and everything else determining its
+    # outputs (base run, demand, and elasticity settings); disrupt runs with the same hash have identical outputs
+    return rdr_RunLedger.get_fingerprint(ledger_file, {'network': network_file},
+                                         {'base_fingerprint': base_fingerprint,
+                                          'elasticity': run_params['elasticity'],
+                                          'run_minieq': run_params['run_minieq'],
+                                          'calc_transit_metrics': cfg['calc_transit_metrics']})
 
 
 # ==============================================================================
@@ -514,16 +1350,15 @@ def create_network_link_csv(run_type, run_params, input_folder, output_folder, c
     if run_type == 'disrupt':
         link_avail_table = os.path.join(output_folder, ('NP_Disrupt_' + run_params['resil'] +
                                                         '_' + run_params['hazard'] +
-                                                        '_' + run_params['recovery'] + '.csv'))
+                                                        '_' + run_params['recovery'] + rdr_supporting.get_table_ext(cfg)))
         if not os.path.exists(link_avail_table):
             logger.error("LINK AVAILABILITY FILE ERROR: {} could not be found".format(link_avail_table))
             raise Exception("LINK AVAILABILITY FILE ERROR: {} could not be found".format(link_avail_table))
 
     if run_type == 'base':
-        output_network_file = 'Group' + run_params['projgroup'] + '_baserun.csv'
+        output_network_file = 'Group' + run_params['projgroup'] + '_baserun' + rdr_supporting.get_table_ext(cfg)
     elif run_type == 'disrupt':
-        output_network_file = ('Group' + run_params['projgroup'] + '_' + run_params['resil'] + '_' +
-                               run_params['hazard'] + '_' + run_params['recovery'] + '.csv')
+        output_network_file = get_network_file(run_params, cfg)
     else:
         logger.error("create_network_link_csv method requires 'base' or 'disrupt' for run_type variable.")
         raise Exception("Invalid option for variable run_type in create_network_link_csv method.")
@@ -532,19 +1367,13 @@ def create_network_link_csv(run_type, run_params, input_folder, output_folder, c
     logger.debug("loading input files and look-up tables")
 
     if run_params['matrix_name'] == 'matrix':
-        network = pd.read_csv(projgroup_network_table,
-                              usecols=['link_id', 'from_node_id', 'to_node_id', 'directed', 'length', 'facility_type',
-                                       'capacity', 'free_speed', 'lanes', 'allowed_uses', 'toll', 'travel_time'],
-                              converters={'link_id': str, 'from_node_id': str, 'to_node_id': str, 'directed': int,
-                                          'length': float, 'facility_type': str, 'capacity': float, 'free_speed': float,
-                                          'lanes': int, 'allowed_uses': str, 'toll': float, 'travel_time': float})
+        network = rdr_supporting.read_static_table(projgroup_network_table, 'link', logger,
+                                                   usecols=['link_id', 'from_node_id', 'to_node_id', 'directed', 'length', 'facility_type',
+                                                            'capacity', 'free_speed', 'lanes', 'allowed_uses', 'toll', 'travel_time'])
     elif run_params['matrix_name'] == 'nocar':
-        network = pd.read_csv(projgroup_network_table,
-                              usecols=['link_id', 'from_node_id', 'to_node_id', 'directed', 'length', 'facility_type',
-                                       'capacity', 'free_speed', 'lanes', 'allowed_uses', 'toll_nocar', 'travel_time_nocar'],
-                              converters={'link_id': str, 'from_node_id': str, 'to_node_id': str, 'directed': int,
-                                          'length': float, 'facility_type': str, 'capacity': float, 'free_speed': float,
-                                          'lanes': int, 'allowed_uses': str, 'toll_nocar': float, 'travel_time_nocar': float})
+        network = rdr_supporting.read_static_table(projgroup_network_table, 'link', logger,
+                                                   usecols=['link_id', 'from_node_id', 'to_node_id', 'directed', 'length', 'facility_type',
+                                                            'capacity', 'free_speed', 'lanes', 'allowed_uses', 'toll_nocar', 'travel_time_nocar'])
         network.rename({'toll_nocar': 'toll', 'travel_time_nocar': 'travel_time'}, axis='columns', inplace=True)
     else:
         logger.error("create_network_link_csv method requires 'matrix' or 'nocar' for matrix_name variable in run_params.")
@@ -552,8 +1381,8 @@ def create_network_link_csv(run_type, run_params, input_folder, output_folder, c
     logger.debug("Size of input project group network table: {}".format(network.shape))
 
     if run_type == 'disrupt':
-        availabilities = pd.read_csv(link_avail_table, usecols=['link_id', 'link_available'],
-                                     converters={'link_id': str, 'link_available': float})
+        availabilities = rdr_supporting.read_table(link_avail_table, usecols=['link_id', 'link_available'],
+                                                   converters={'link_id': str, 'link_available': float})
         # catch any empty fields and set to 0 link availability
         availabilities['link_available'] = availabilities['link_available'].fillna(0)
         logger.debug("Size of input link availability table: {}".format(availabilities.shape))
@@ -563,8 +1392,8 @@ def create_network_link_csv(run_type, run_params, input_folder, output_folder, c
         logger.warning("TRUE SHAPE FILE WARNING: {} could not be found (optional). Process will continue without this file."
                        .format(true_shape_file))
     else:
-        true_shape_table = pd.read_csv(true_shape_file, usecols=['link_id', 'WKT'],
-                                       converters={'link_id': str, 'WKT': str})
+        true_shape_table = rdr_supporting.read_static_table(true_shape_file, 'true_shape', logger,
+                                                            usecols=['link_id', 'WKT'])
         true_shape_table.drop_duplicates(inplace=True, ignore_index=True)
         logger.debug("Size of look-up table for wkt: {}".format(true_shape_table.shape))
 
@@ -572,18 +1401,21 @@ def create_network_link_csv(run_type, run_params, input_folder, output_folder, c
     logger.debug("creating {} network links input file for AequilibraE run".format(run_type))
     output_links = network.copy(deep=True)
     num_rows = output_links.shape[0]
+    # link-keyed look-ups are aligned to the links of the network file by the network link index
+    network_index = rdr_LinkIndex.get_link_index(projgroup_network_table, logger)
 
     # wkt = look up in true_shape_table if it exists
     # NOTE: not inserted into final links table, but found in output csv file and initial SQL table
     if not os.path.exists(true_shape_file):
         output_links['WKT'] = ""
     else:
-        output_links = pd.merge(output_links, true_shape_table, how='left', on=['link_id'], indicator=True)
+        # NOTE: if a link has more than one shape in the true shape table, the last one is used
+        output_links['WKT'], found = rdr_LinkIndex.scatter_link_values(network_index, true_shape_table['link_id'].values,
+                                                                       true_shape_table['WKT'].values)
         logger.debug(("Number of links not found in true shape " +
-                      "look-up table: {}".format(sum(output_links['_merge'] == 'left_only'))))
-        if sum(output_links['_merge'] == 'left_only') == output_links.shape[0]:
+                      "look-up table: {}".format(sum(~found))))
+        if sum(~found) == output_links.shape[0]:
             logger.warning("TABLE JOIN WARNING: Join of AequilibraE links input file with true shape table failed to produce any matches.")
-        output_links.drop(labels=['_merge'], axis=1, inplace=True)
 
     # link_available = look up 'link_available' in availabilities table if run_type = 'disrupt',
     # set to 1 if run_type = 'base'
@@ -595,15 +1427,16 @@ def create_network_link_csv(run_type, run_params, input_folder, output_folder, c
     if run_type == 'base':
         output_links['link_available'] = 1
     elif run_type == 'disrupt':
-        output_links = pd.merge(output_links, availabilities, how='left', on=['link_id'], indicator=True)
+        output_links['link_available'], found = rdr_LinkIndex.scatter_link_values(network_index,
+                                                                                  availabilities['link_id'].values,
+                                                                                  availabilities['link_available'].values)
         logger.debug(("Number of links not found in link availability " +
-                      "table: {}".format(sum(output_links['_merge'] == 'left_only'))))
-        if sum(output_links['_merge'] == 'left_only') == output_links.shape[0]:
+                      "table: {}".format(sum(~found))))
+        if sum(~found) == output_links.shape[0]:
             logger.error(("TABLE JOIN ERROR: Join of AequilibraE links input file with link availability table " +
                          "failed to produce any matches. Check the corresponding table columns."))
             raise Exception(("TABLE JOIN ERROR: Join of AequilibraE links input file with link availability table " +
                              "failed to produce any matches. Check the corresponding table columns."))
-        output_links.drop(labels=['_merge'], axis=1, inplace=True)
         output_links['link_available'] = np.where(output_links['link_available'].isna(), link_unavailable_default,
                                                   output_links['link_available'])
 
@@ -625,8 +1458,8 @@ def create_network_link_csv(run_type, run_params, input_folder, output_folder, c
         output_links['beta'] = 4
     else:
         # NOTE: link types table has required fields 'facility_type', 'alpha', 'beta'
-        link_types_table = pd.read_csv(link_types_file, usecols=['facility_type', 'alpha', 'beta'],
-                                       converters={'facility_type': str, 'alpha': float, 'beta': float})
+        link_types_table = rdr_supporting.read_static_table(link_types_file, 'link_types', logger,
+                                                            usecols=['facility_type', 'alpha', 'beta'])
         logger.debug("Size of link types look-up table: {}".format(link_types_table.shape))
         output_links = pd.merge(output_links, link_types_table, how='left', on=['facility_type'], indicator=True)
         logger.debug("Number of links found in link types table: {}".format(sum(output_links['_merge'] == 'both')))
@@ -646,12 +1479,16 @@ def create_network_link_csv(run_type, run_params, input_folder, output_folder, c
                                                                           run_params['socio']) +
                         "projgroup = {}, resil = {}".format(run_params['projgroup'], run_params['resil'])))
 
-    with open(output_network_fullfile, "w", newline='') as f:
-        output_links.to_csv(f, index=False, columns=['link_id', 'from_node_id', 'to_node_id', 'directed', 'length',
-                                                     'facility_type', 'capacity', 'free_speed', 'lanes', 'allowed_uses',
-                                                     'travel_time', 'toll', 'alpha', 'beta', 'link_available',
-                                                     'wkt'])
-        logger.result("AequilibraE network links table written to {}".format(output_network_fullfile))
+    rdr_supporting.write_table(output_links, output_network_fullfile,
+                               columns=['link_id', 'from_node_id', 'to_node_id', 'directed', 'length', 'facility_type',
+                                        'capacity', 'free_speed', 'lanes', 'allowed_uses', 'travel_time', 'toll',
+                                        'alpha', 'beta', 'link_available', 'wkt'])
+    logger.result("AequilibraE network links table written to {}".format(output_network_fullfile))
+
+    if cfg['aeq_graph_source'] == 'dataframe':
+        # keep the table in memory for the graph of this run, see rdr_AEGraph
+        from rdr_AEGraph import cache_network_links
+        cache_network_links(output_network_fullfile, output_links)
 
     logger.debug(("finished: create {} network csv file for ".format(run_type) +
                   "hazard = {}, recovery = {}, socio = {}, ".format(run_params['hazard'], run_params['recovery'], run_params['socio']) +
@@ -661,13 +1498,35 @@ def create_network_link_csv(run_type, run_params, input_folder, output_folder, c
 # ==============================================================================
 
 
+def get_resume_phases(ledger_file, run_key, run_folder, logger):
+    # Returns list of phases of a run completed by a previous attempt that was interrupted or failed
+    # (see rdr_RunLedger.start_run), which are skipped when the run is resumed
+    # Phases are only reused if the run folder holding their outputs still exists
+    completed_phases = rdr_RunLedger.get_completed_phases(ledger_file, run_key)
+    if len(completed_phases) == 0 or not os.path.exists(run_folder):
+        return []
+    logger.info("Resuming AequilibraE run {} after completed phases: {}".format(run_folder,
+                                                                            ', '.join(completed_phases)))
+    return completed_phases
+
+
+# ==============================================================================
+
+
 # create a directory for the AequilibraE run with the correct file structure, a copy of project_database.sqlite,
 # and a demand table (omx file)
-def setup_run_folder(run_params, input_folder, run_folder, logger):
+def setup_run_folder(run_params, input_folder, run_folder, cfg, logger, source_db=None, link_demand=True):
+    # Sets up run_folder from the AEMaster folder using the method set by cfg['run_folder_provisioning']
+    # 'copy' copies the whole AEMaster folder (except OMX files and the demand catalog, see rdr_DemandCatalog) and the
+    # demand OMX file for the 'socio' of the run
+    # 'link' clones the project_database.sqlite database (from source_db if given, otherwise from a template of
+    # AEMaster's database with an empty links table) and links the demand OMX file if link_demand is True;
+    # what was cloned or linked is recorded in PROVISIONING_FILE in run_folder
     logger.debug("start: set up AequilibraE run directory")
     mtx_fldr = 'matrices'
 
     # check if run_folder exists (in case of a previously aborted run) and if so then delete run_folder directory tree
+    # NOTE: not called for a run resumed after the 'network_prepared' phase (see get_resume_phases)
     if os.path.exists(run_folder):
         logger.warning(("Directory {} already exists (e.g., due to prior incomplete run), removing existing files and re-running".format(run_folder)))
         shutil.rmtree(run_folder)
@@ -678,17 +1537,42 @@ def setup_run_folder(run_params, input_folder, run_folder, logger):
         logger.error("AEQ DIRECTORY ERROR: AEMaster folder {} could not be found".format(master_folder))
         raise Exception("AEQ DIRECTORY ERROR: AEMaster folder {} could not be found".format(master_folder))
 
-    shutil.copytree(master_folder, run_folder, ignore=shutil.ignore_patterns('*.omx'))
-
-    # copy over demand omx file for correct 'socio'
+    # demand omx file for correct 'socio'
     demand_file = os.path.join(master_folder, mtx_fldr, run_params['socio'] + '_demand_summed.omx')
     if not os.path.exists(demand_file):
         logger.error("DEMAND OMX FILE ERROR: {} could not be found".format(demand_file))
         raise Exception("DEMAND OMX FILE ERROR: {} could not be found".format(demand_file))
-    shutil.copy2(demand_file, os.path.join(run_folder, mtx_fldr))
 
     network_db = os.path.join(run_folder, 'project_database.sqlite')
 
+    if cfg['run_folder_provisioning'] == 'copy':
+        # the demand catalog and its lock and temporary files are state of the input folder, not of the run
+        shutil.copytree(master_folder, run_folder,
+                        ignore=shutil.ignore_patterns('*.omx', rdr_DemandCatalog.DEMAND_CATALOG_FILE + '*'))
+        shutil.copy2(demand_file, os.path.join(run_folder, mtx_fldr))
+    else:
+        # copy the remaining small files of AEMaster (e.g., parameters.yml), skipping the database and the trip tables
+        def ignore_master_files(folder, names):
+            if os.path.normpath(folder) == os.path.normpath(master_folder):
+                return [name for name in names if name in ['project_database.sqlite', mtx_fldr]]
+            return [name for name in names if name.endswith('.omx')]
+        shutil.copytree(master_folder, run_folder, ignore=ignore_master_files)
+        os.makedirs(os.path.join(run_folder, mtx_fldr), exist_ok=True)
+
+        if source_db is None:
+            source_db = get_template_db(master_folder, cfg, logger)
+        if not os.path.exists(source_db):
+            logger.error("AEQ DATABASE ERROR: {} could not be found".format(source_db))
+            raise Exception("AEQ DATABASE ERROR: {} could not be found".format(source_db))
+        clone_database(source_db, network_db)
+        record_provisioning(run_folder, 'project_database.sqlite', source_db, 'clone')
+
+        if link_demand:
+            provide_run_file(demand_file, run_folder, os.path.join(mtx_fldr, os.path.basename(demand_file)), cfg, logger)
+        else:
+            shutil.copy2(demand_file, os.path.join(run_folder, mtx_fldr))
+            record_provisioning(run_folder, os.path.join(mtx_fldr, os.path.basename(demand_file)), demand_file, 'copy')
+
     logger.debug("finished: set up AequilibraE run directory, returned path to project_database.sqlite database")
     return network_db
 
@@ -696,32 +1580,169 @@ def setup_run_folder(run_params, input_folder, run_folder, logger):
 # ==============================================================================
 
 
-def create_matrix(output_folder, socio, trip_csv_file, output_matrixname, f_output, matrix_size, logger):
+def provide_run_file(source_file, run_folder, run_file, cfg, logger):
+    # Provides source_file as run_file (relative to run_folder) for a file the run only reads
+    # 'copy' provisioning copies the file; 'link' provisioning hardlinks it, falling back to a symbolic link
+    # (e.g., source on another drive) and then to a copy (e.g., symbolic links not permitted on Windows)
+    target_file = os.path.join(run_folder, run_file)
+    if cfg['run_folder_provisioning'] == 'copy':
+        shutil.copy2(source_file, target_file)
+        return
+
+    try:
+        os.link(source_file, target_file)
+        method = 'hardlink'
+    except OSError:
+        try:
+            os.symlink(os.path.abspath(source_file), target_file)
+            method = 'symlink'
+        except OSError:
+            logger.debug("could not link {}, copying it to {}".format(source_file, target_file))
+            shutil.copy2(source_file, target_file)
+            method = 'copy'
+    record_provisioning(run_folder, run_file, source_file, method)
+
+
+# ==============================================================================
+
+
+def record_provisioning(run_folder, run_file, source_file, method):
+    # Adds run_file to the record of files in run_folder that were cloned, linked, or copied from another folder
+    # by 'link' provisioning; a linked file must never be written to, as the write would also change source_file
+    record_file = os.path.join(run_folder, PROVISIONING_FILE)
+    record = {}
+    if os.path.exists(record_file):
+        with open(record_file, 'r') as rf:
+            record = json.load(rf)
+    record[run_file.replace(os.sep, '/')] = {'source': os.path.abspath(source_file), 'method': method}
+    with open(record_file, 'w') as wf:
+        json.dump(record, wf, indent=2, sort_keys=True)
+
+
+# ==============================================================================
+
+
+def clone_database(source_db, target_db):
+    # Copies SQLite database source_db to target_db with the SQLite backup API, which is consistent even if
+    # another process is reading source_db
+    with sqlite3.connect(source_db) as src_con, sqlite3.connect(target_db) as dst_con:
+        src_con.backup(dst_con)
+    src_con.close()
+    dst_con.close()
+
+
+# ==============================================================================
+
+
+def get_template_db(master_folder, cfg, logger):
+    # Returns the template database cloned into run folders by 'link' provisioning
+    # The template is AEMaster's project_database.sqlite with the links table emptied and any GMNS_link table
+    # dropped, as every run replaces both; it is rebuilt if AEMaster's database has changed since it was made
+    master_db = os.path.join(master_folder, 'project_database.sqlite')
+    if not os.path.exists(master_db):
+        logger.error("AEQ DATABASE ERROR: {} could not be found".format(master_db))
+        raise Exception("AEQ DATABASE ERROR: {} could not be found".format(master_db))
+    template_folder = os.path.join(cfg['output_dir'], 'aeq_runs', 'AEMaster_template')
+    template_db = os.path.join(template_folder, 'project_database.sqlite')
+    source_file = os.path.join(template_folder, 'template_source.json')
+    source = {'source': os.path.abspath(master_db), 'size': os.path.getsize(master_db),
+              'mtime': os.path.getmtime(master_db)}
+
+    # parallel workers wait for the first one to build the template
+    lock = rdr_supporting.acquire_file_lock(template_folder + '.lock', logger)
+    try:
+        if os.path.exists(template_db) and os.path.exists(source_file):
+            with open(source_file, 'r') as rf:
+                if json.load(rf) == source:
+                    return template_db
+
+        logger.debug("creating template database {} from {}".format(template_db, master_db))
+        os.makedirs(template_folder, exist_ok=True)
+        tmp_db = template_db + '.tmp'
+        if os.path.exists(tmp_db):
+            os.remove(tmp_db)
+        clone_database(master_db, tmp_db)
+        with sqlite3.connect(tmp_db) as db_con:
+            db_cur = db_con.cursor()
+            db_cur.execute("delete from links;")
+            db_cur.execute("drop table if exists GMNS_link;")
+        db_con.execute("vacuum;")
+        db_con.close()
+        os.replace(tmp_db, template_db)
+        with open(source_file, 'w') as wf:
+            json.dump(source, wf)
+    finally:
+        rdr_supporting.release_file_lock(lock)
+
+    return template_db
+
+
+# ==============================================================================
+
+
+# returns True if orig_node and dest_node of demand CSV file trip_csv_file are zero-based matrix positions (e.g., as
+# in the sample demand of rs6_public_data) rather than centroid node ids of taz_index, i.e., if any value in the whole
+# file is not a centroid; only the two columns are read, in chunks of rows
+def is_demand_by_position(trip_csv_file, taz_index):
+    for df_nodes in pd.read_csv(trip_csv_file, header=0, usecols=['orig_node', 'dest_node'],
+                                chunksize=DEMAND_CSV_CHUNK_SIZE):
+        if (taz_index.get_indexer(df_nodes['orig_node'].values) < 0).any() or \
+                (taz_index.get_indexer(df_nodes['dest_node'].values) < 0).any():
+            return True
+    return False
+
+
+# ==============================================================================
+
+
+def create_matrix(output_folder, socio, trip_csv_file, output_matrixname, f_output, taz_list, cfg, logger):
     if output_matrixname == 'matrix':
         debug_filename = os.path.join(output_folder, socio + '_debug_demand.csv')
     elif output_matrixname == 'nocar':
         debug_filename = os.path.join(output_folder, socio + '_debug_demand_nocar.csv')
 
-    # Read a flat file trip table into pandas dataframe
+    # Rows and columns of the matrix are the centroids of the TAZ mapping, including centroids with no trips
+    matrix_size = len(taz_list)
+    taz_index = pd.Index(taz_list)
+    matrix = np.zeros((matrix_size, matrix_size))
+
+    # Read a flat file trip table in chunks of rows, adding the trips of each chunk to the matrix
     # Presuming we have a long-format CSV file
-    df_trip = pd.read_csv(trip_csv_file, header=0)
-    df_trip.astype({'trips': 'float'}).dtypes
-    logger.debug(df_trip.head())
-    logger.debug("The trip table file {} has size {} by {}".format(trip_csv_file, str(df_trip.shape[0]), str(df_trip.shape[1])))
-    logger.debug("Total number of trips: {}".format(str(df_trip['trips'].sum())))
-
-    # Sanity check: Number of rows in df_trip can be at most matrix_size * matrix_size
-    matrix_size_squared = matrix_size * matrix_size
-    logger.debug("Rows in trip_csv_file: {}. Matrix size square: {}.".format(str(df_trip.shape[0]), str(matrix_size_squared)))
-    if (df_trip.shape[0] > matrix_size_squared):
-        logger.error("Error: Number of rows in the CSV file exceeds matrix size squared!")
-        raise Exception("Error: Number of rows in the CSV file exceeds matrix size squared!")
-    # Assuming we have an O-D format trip type
-    pivot = df_trip.pivot(index='orig_node', columns='dest_node', values='trips')
-    pivotnp = pivot.to_numpy()
-    pivotnp = np.nan_to_num(pivotnp, nan=0)
-    f_output[output_matrixname] = pivotnp  # Put the filled-in matrix into the OMX file
-    pivot.to_csv(debug_filename, index=True)
+    # orig_node and dest_node are centroid node ids, or zero-based matrix positions if the file has a value that is not
+    # a centroid; trips of duplicate O-D pairs are summed
+    by_position = is_demand_by_position(trip_csv_file, taz_index)
+    logger.debug("orig_node and dest_node of {} are {}".format(
+        trip_csv_file, "matrix positions" if by_position else "centroid node ids"))
+    node_index = pd.RangeIndex(matrix_size) if by_position else taz_index
+    num_rows = 0
+    for df_trip in pd.read_csv(trip_csv_file, header=0, usecols=['orig_node', 'dest_node', 'trips'],
+                               dtype={'trips': float}, chunksize=DEMAND_CSV_CHUNK_SIZE):
+        num_rows = num_rows + df_trip.shape[0]
+        # Sanity check: Number of rows in df_trip can be at most matrix_size * matrix_size
+        if num_rows > matrix_size * matrix_size:
+            logger.error("Error: Number of rows in the CSV file exceeds matrix size squared!")
+            raise Exception("Error: Number of rows in the CSV file exceeds matrix size squared!")
+
+        orig_index = node_index.get_indexer(df_trip['orig_node'].values)
+        dest_index = node_index.get_indexer(df_trip['dest_node'].values)
+        outside = (orig_index < 0) | (dest_index < 0)
+        if outside.any():
+            logger.error(("DEMAND FILE ERROR: {} has {} rows with an orig_node or dest_node that is not a centroid " +
+                          "of node.csv or a matrix position from 0 to {}").format(trip_csv_file, outside.sum(),
+                                                                                 matrix_size - 1))
+            raise Exception(("DEMAND FILE ERROR: {} has {} rows with an orig_node or dest_node that is not a centroid " +
+                             "of node.csv or a matrix position from 0 to {}").format(trip_csv_file, outside.sum(),
+                                                                                    matrix_size - 1))
+        np.add.at(matrix, (orig_index, dest_index), np.nan_to_num(df_trip['trips'].values, nan=0))
+    logger.debug("The trip table file {} has {} rows".format(trip_csv_file, str(num_rows)))
+    logger.debug("Total number of trips: {}".format(str(matrix.sum())))
+    logger.debug("Rows in trip_csv_file: {}. Matrix size square: {}.".format(str(num_rows), str(matrix_size * matrix_size)))
+
+    f_output[output_matrixname] = matrix  # Put the filled-in matrix into the OMX file
+    if cfg['save_debug_demand']:
+        labels = np.arange(matrix_size) if by_position else taz_list
+        pd.DataFrame(matrix, index=pd.Index(labels, name='orig_node'),
+                     columns=pd.Index(labels, name='dest_node')).to_csv(debug_filename, index=True)
 
     return
 
@@ -737,31 +1758,31 @@ def demand_csv_to_omx(demand_folder, socio, trip_csv_file, no_car_csv_file, cfg,
     df_node = pd.read_csv(node_csv_file, header=0)
     logger.debug(df_node.head())
 
-    # Set up the dictionary of centroids
+    # Set up the TAZ mapping of centroids
     # Assumption: node_type = 'centroid' for centroid nodes in nodes file
     # Centroid nodes are the lowest numbered nodes, provided at the beginning of the list of nodes, but node numbers need not be consecutive
-    tazdictrow = {}
-    centroid_index = 0
-    for index in df_node.index:
-        if df_node['node_type'][index] == 'centroid':
-            tazdictrow[df_node['node_id'][index]] = centroid_index
-            centroid_index = centroid_index + 1
-    taz_list = list(tazdictrow.keys())  # This is the taz mapping that will be used when building the OMX matrix file
-    matrix_size = len(tazdictrow)  # Should match the number of nodes flagged as centroids
+    taz_list = df_node.loc[df_node['node_type'] == 'centroid', 'node_id'].tolist()  # This is the taz mapping that will be used when building the OMX matrix file
+    matrix_size = len(taz_list)  # Should match the number of nodes flagged as centroids
     logger.debug("Total number of centroids: {}".format(str(matrix_size)))
-    highest_centroid_node_number = max(tazdictrow, key=tazdictrow.get)
+    highest_centroid_node_number = taz_list[-1]
     logger.debug("Highest centroid node is {}".format(str(highest_centroid_node_number)))
 
     # Set up the OMX output
     f_output = omx.open_file(outfile, 'w')
     f_output.create_mapping('taz', taz_list)  # Set up the TAZ mapping
-    # Write the dataframe to an OMX file
-    # This makes use of tazdictrow and matrix_size that was established earlier
-    # The rows are also written to a file that is used for debugging
-
-    create_matrix(cfg['output_dir'], socio, trip_csv_file, "matrix", f_output, matrix_size, logger)
-
-    if os.path.exists(no_car_csv_file):
-        create_matrix(cfg['output_dir'], socio, no_car_csv_file, "nocar", f_output, matrix_size, logger)
+    # Write the trip table to an OMX file
+    # This makes use of the TAZ mapping and matrix_size that was established earlier
+    # The matrix is also written to a file that is used for debugging if save_debug_demand is set
+
+    try:
+        create_matrix(cfg['output_dir'], socio, trip_csv_file, "matrix", f_output, taz_list, cfg, logger)
+
+        if os.path.exists(no_car_csv_file):
+            create_matrix(cfg['output_dir'], socio, no_car_csv_file, "nocar", f_output, taz_list, cfg, logger)
+    except Exception:
+        # remove the incomplete OMX file so it is not taken as the demand of the socio by later runs
+        f_output.close()
+        os.remove(outfile)
+        raise
 
     f_output.close()  # Close the OMX file
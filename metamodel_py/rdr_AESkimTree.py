@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+
+# ---------------------------------------------------------------------------------------------------
+# Name: rdr_AESkimTree
+#
+# Runs the shortest path skims of AequilibraE NetworkSkimming one origin (centroid) at a time, so that the base
+# network skim can record the links of the shortest path tree of each origin in a tree file next to the skim, and the
+# disrupted network skim only recomputes the origins whose base network tree uses a removed link.
+# A disrupted network differs from its base network only in capacity and in the links removed (see rdr_AEGraph), and
+# the shortest path skims (cost free_flow_time, skims free_flow_time and distance) do not depend on capacity, so the
+# tree of an origin that uses no removed link is still a shortest path tree of the disrupted network; the rows of
+# these origins are copied from the base network skim.
+# If an origin has more than one shortest path to a destination (paths of equal cost), the path kept may differ from
+# the one a full skim of the disrupted network would find, so the distance skim of such a pair may differ from a full
+# skim; the free_flow_time skim (the cost) is the same.
+# Uses the single origin skimming routine and thread pool of NetworkSkimming in aequilibrae 1.4.2.
+#
+# ---------------------------------------------------------------------------------------------------
+import os
+import threading
+import multiprocessing as mp
+from multiprocessing.dummy import Pool as ThreadPool
+import numpy as np
+import pandas as pd
+import openmatrix as omx
+from aequilibrae.paths.AoN import skimming_single_origin
+from aequilibrae.paths.multi_threaded_skimming import MultiThreadedNetworkSkimming
+from aequilibrae.paths.results import SkimResults
+import rdr_AEGraph
+
+
+# ==============================================================================
+
+
+# returns the tree file of shortest path skim file skim_file, e.g. 'sp_tree_base01.npz' for 'sp_base01.omx'
+def get_tree_file(skim_file):
+    skim_folder, skim_name = os.path.split(skim_file)
+    return os.path.join(skim_folder, 'sp_tree_' + os.path.splitext(skim_name)[0][len('sp_'):] + '.npz')
+
+
+# ==============================================================================
+
+
+# runs the shortest path skim of all centroids of graph, writes the skims to skim_file and the shortest path tree of
+# each centroid to the tree file of skim_file
+def run_base_skim(graph, skim_file, logger):
+    results = SkimResults()
+    results.prepare(graph)
+
+    # bit j of row i is set if compact graph link j is in the shortest path tree of centroid i of graph.centroids
+    tree_bits = np.zeros((graph.num_zones, (graph.compact_num_links + 7) // 8), dtype=np.uint8)
+    skim_origins(graph, results, graph.centroids, logger, tree_bits)
+
+    results.skims.export(skim_file)
+    # compact graph link of each link direction of the graph, to look up the tree bits of removed links
+    np.savez_compressed(get_tree_file(skim_file), centroids=graph.centroids, tree_bits=tree_bits,
+                        link_id=graph.graph['link_id'].values, compact_id=graph.graph['__compressed_id__'].values,
+                        blocked_centroid_flows=graph.block_centroid_flows)
+
+
+# ==============================================================================
+
+
+# runs the shortest path skim of graph, the graph of disrupted network links table network_file, and writes it to
+# skim_file; only origins whose shortest path tree of base network links table base_network_file uses a removed link
+# are skimmed, the other rows are copied from base network skim base_skim_file
+# returns False (and writes nothing) if the tree file of base_skim_file does not exist or does not match graph, or if
+# network_file differs from base_network_file in more than capacity and link_available, in which case all origins
+# must be skimmed
+def run_disrupt_skim(graph, network_file, base_network_file, skim_file, base_skim_file, logger):
+    tree_file = get_tree_file(base_skim_file)
+    if not os.path.exists(tree_file) or not os.path.exists(base_skim_file):
+        logger.debug("shortest path tree file {} not found, skimming all origins".format(tree_file))
+        return False
+
+    removed_link_ids = get_removed_links(network_file, base_network_file, logger)
+    if removed_link_ids is None:
+        return False
+
+    trees = np.load(tree_file)
+    if (not np.array_equal(trees['centroids'], graph.centroids) or
+            bool(trees['blocked_centroid_flows']) != bool(graph.block_centroid_flows)):
+        logger.debug("shortest path tree file {} does not match the graph, skimming all origins".format(tree_file))
+        return False
+
+    # origins whose tree uses a compact graph link containing a removed link
+    removed_compact_ids = np.unique(trees['compact_id'][np.isin(trees['link_id'], removed_link_ids)])
+    removed_compact_ids = removed_compact_ids[removed_compact_ids >= 0]
+    tree_bits = trees['tree_bits'][:, removed_compact_ids // 8]
+    affected = ((tree_bits >> (7 - removed_compact_ids % 8).astype(np.uint8)) & 1).any(axis=1)
+
+    results = SkimResults()
+    results.prepare(graph)
+    f = omx.open_file(base_skim_file, 'r')
+    try:
+        base_index = f.map_entries(f.list_mappings()[0])
+        if not np.array_equal(np.asarray(base_index), graph.centroids):
+            logger.debug("base network skim {} does not match the graph, skimming all origins".format(base_skim_file))
+            return False
+        for i, skim_field in enumerate(graph.skim_fields):
+            results.skims.matrix_view[:, :, i] = np.array(f[skim_field])
+    finally:
+        f.close()
+
+    logger.debug("skimming {} of {} origins with removed links in their base network shortest path tree".format(
+        affected.sum(), graph.num_zones))
+    # rows of affected origins are reset, as the row of a centroid not in the disrupted graph is not skimmed
+    results.skims.matrix_view[affected, :, :] = np.nan
+    skim_origins(graph, results, graph.centroids[affected], logger)
+
+    results.skims.export(skim_file)
+    return True
+
+
+# ==============================================================================
+
+
+# returns the link ids (as in the graph) of the links removed (link_available = 0) from base network links table
+# base_network_file in disrupted network links table network_file, or None if the two tables differ in more than
+# capacity and link_available
+def get_removed_links(network_file, base_network_file, logger):
+    links = rdr_AEGraph.get_network_links(network_file, logger)
+    base = rdr_AEGraph.get_network_links(base_network_file, logger)
+
+    if links.shape[0] != base.shape[0]:
+        logger.debug("{} does not have the links of {}, skimming all origins".format(network_file, base_network_file))
+        return None
+    for column in ['link_id', 'from_node_id', 'to_node_id', 'directed', 'length', 'travel_time', 'allowed_uses']:
+        if not links[column].equals(base[column]):
+            logger.debug("{} differs from {} in {}, skimming all origins".format(network_file, base_network_file, column))
+            return None
+
+    return links.loc[links['link_available'] <= 0, 'link_id'].astype(np.int64).values
+
+
+# ==============================================================================
+
+
+# skims origins (centroids of graph) into results (SkimResults prepared with graph) as NetworkSkimming.execute does
+# if tree_bits is given, its row for each origin is set to the packed bits of the compact graph links of the shortest
+# path tree of the origin
+def skim_origins(graph, results, origins, logger, tree_bits=None):
+    cores = mp.cpu_count()
+    aux_res = MultiThreadedNetworkSkimming()
+    aux_res.prepare(graph, cores, results.nodes, results.num_skims)
+    centroid_rows = pd.Index(graph.centroids)
+
+    # each thread of the pool uses its own row of the aux_res arrays
+    threads = {}
+    threads_lock = threading.Lock()
+
+    def skim_origin(origin):
+        with threads_lock:
+            th = threads.setdefault(threading.get_ident(), len(threads))
+        skimming_single_origin(origin, graph, results, aux_res, th)
+        if tree_bits is not None:
+            # connectors holds the compact graph link reaching each node of the tree, -1 if none
+            connectors = aux_res.connectors[th]
+            in_tree = np.zeros(graph.compact_num_links, dtype=bool)
+            in_tree[connectors[connectors >= 0]] = True
+            tree_bits[centroid_rows.get_loc(origin), :] = np.packbits(in_tree)
+
+    skim_list = []
+    for origin in origins:
+        i = int(graph.nodes_to_indices[origin])
+        if i >= graph.nodes_to_indices.shape[0] or graph.fs[i] < 0 or graph.fs[i] == graph.fs[i + 1]:
+            # as in NetworkSkimming, the row of a centroid not in the graph is not skimmed
+            # NOTE: graph.fs is left at -1 for the first centroid if it has no links (e.g., all its links are removed),
+            # which NetworkSkimming skims anyway, reading outside the graph arrays
+            logger.debug("Centroid {} does not exist in the graph".format(origin))
+        else:
+            skim_list.append(origin)
+
+    pool = ThreadPool(cores)
+    try:
+        pool.map(skim_origin, skim_list)
+    finally:
+        pool.close()
+        pool.join()
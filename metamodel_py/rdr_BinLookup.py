@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+
+# ---------------------------------------------------------------------------------------------------
+# Name: rdr_BinLookup
+#
+# Looks up the value of the interval bin containing each of an array of exposure values, as defined by a table of
+# bins with a minimum (inclusive) value, maximum (exclusive) value, and bin value on each row, optionally
+# partitioned by a key (e.g., facility type or asset type).
+# Used for the manual and facility_type_manual link availability approaches (calc_link_availability and the
+# exposure grid overlay helper tool) and the exposure-damage tables of rdr_RecoveryInit.
+# The edges of all bins of a partition are sorted into elementary intervals, each assigned the value of the last bin
+# row covering it (as if the bins were applied one row at a time), so each lookup is a single np.searchsorted.
+#
+# ---------------------------------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+
+# ==============================================================================
+
+
+# reads a bins CSV file with columns (key,) minimum, maximum, value in that order and a header row, as in
+# exposure_grid_manual.csv and exposure_grid_facility_type_manual.csv, and builds its lookup
+# key values are converted with key_type, and must be compared to keys of the same type in lookup_bin_values
+def read_bin_lookup(bins_file, keyed=False, key_type=str):
+    bins = pd.read_csv(bins_file, dtype=str, keep_default_na=False)
+    if keyed:
+        return make_bin_lookup(bins.iloc[:, 1].astype(float).values, bins.iloc[:, 2].astype(float).values,
+                               bins.iloc[:, 3].astype(float).values, keys=bins.iloc[:, 0].astype(key_type).values)
+    return make_bin_lookup(bins.iloc[:, 0].astype(float).values, bins.iloc[:, 1].astype(float).values,
+                           bins.iloc[:, 2].astype(float).values)
+
+
+# ==============================================================================
+
+
+# builds the lookup of bins [min_values, max_values) with values bin_values, partitioned by keys if given
+# returns {key: (sorted interval edges, value of each interval)} with key None if not partitioned;
+# intervals not covered by any bin have value NaN
+def make_bin_lookup(min_values, max_values, bin_values, keys=None):
+    min_values = np.asarray(min_values, dtype=float)
+    max_values = np.asarray(max_values, dtype=float)
+    bin_values = np.asarray(bin_values, dtype=float)
+    if keys is None:
+        keys = np.full(min_values.shape[0], None, dtype=object)
+    else:
+        keys = np.asarray(keys, dtype=object)
+
+    bin_lookup = {}
+    for key in pd.unique(keys):
+        in_partition = keys == key if key is not None else np.ones(keys.shape[0], dtype=bool)
+        part_min = min_values[in_partition]
+        part_max = max_values[in_partition]
+        part_values = bin_values[in_partition]
+        edges = np.unique(np.concatenate([part_min, part_max]))
+        interval_values = np.full(max(edges.shape[0] - 1, 0), np.nan)
+        # later rows take precedence over earlier rows for overlapping bins
+        for bin_min, bin_max, bin_value in zip(part_min, part_max, part_values):
+            first = np.searchsorted(edges, bin_min, side='left')
+            last = np.searchsorted(edges, bin_max, side='left')
+            interval_values[first:last] = bin_value
+        bin_lookup[key] = (edges, interval_values)
+
+    return bin_lookup
+
+
+# ==============================================================================
+
+
+# returns a float array with the value of the bin containing each of values (with the matching key if the lookup is
+# partitioned), or default if no bin contains the value, the key is not in the lookup, or the value is NaN
+def lookup_bin_values(bin_lookup, values, keys=None, default=np.nan):
+    values = np.asarray(values, dtype=float)
+    result = np.full(values.shape[0], default, dtype=float)
+
+    if keys is not None:
+        keys = np.asarray(keys, dtype=object)
+
+    for key, (edges, interval_values) in bin_lookup.items():
+        if edges.shape[0] < 2:
+            continue
+        if key is None or keys is None:
+            in_partition = np.ones(values.shape[0], dtype=bool)
+        else:
+            in_partition = keys == key
+        part_values = values[in_partition]
+        # NaN values sort after every edge, so they fall outside the intervals
+        interval = np.searchsorted(edges, part_values, side='right') - 1
+        in_interval = (interval >= 0) & (interval < edges.shape[0] - 1)
+        part_result = np.full(part_values.shape[0], np.nan)
+        part_result[in_interval] = interval_values[interval[in_interval]]
+        part_result = np.where(np.isnan(part_result), result[in_partition], part_result)
+        result[in_partition] = part_result
+
+    return result
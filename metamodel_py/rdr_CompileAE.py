@@ -10,49 +10,83 @@
 # ---------------------------------------------------------------------------------------------------
 import os
 import pandas as pd
+import rdr_RunLedger
 
 
 def main(input_folder, output_folder, cfg, logger, base_year):
     logger.info("Start: AequilibraE compile module")
 
     # to avoid issues with a set of runs going past midnight, using cfg['run_id'] in folder name instead of date
-    # make list of completed runs
     if base_year is True:
-        aeq_runs_folder = os.path.join(output_folder, 'aeq_runs_base_year', 'disrupt', str(cfg['run_id']))
+        runs_folder = 'aeq_runs_base_year'
     else:
-        aeq_runs_folder = os.path.join(output_folder, 'aeq_runs', 'disrupt', str(cfg['run_id']))
-    if not os.path.exists(aeq_runs_folder):
-        logger.error("AEQUILIBRAE FOLDER ERROR: {} could not be found".format(aeq_runs_folder))
-        raise Exception("AEQUILIBRAE FOLDER ERROR: {} could not be found".format(aeq_runs_folder))
-    completed_runs = os.listdir(aeq_runs_folder)
-    if len(completed_runs) == 0:
-        logger.error("MISSING AEQUILIBRAE RUNS ERROR: {} contains no AequilibraE runs".format(aeq_runs_folder))
-        raise Exception("MISSING AEQUILIBRAE RUNS ERROR: {} contains no AequilibraE runs".format(aeq_runs_folder))
+        runs_folder = 'aeq_runs'
+    aeq_runs_folder = os.path.join(output_folder, runs_folder, 'disrupt', str(cfg['run_id']))
+
+    usecols = ['trips', 'miles', 'hours', 'lost_trips', 'extra_miles', 'extra_hours', 'circuitous_trips_removed']
+    if cfg['calc_transit_metrics']:
+        usecols.extend(['lr_trips', 'hr_trips', 'bus_trips', 'car_trips', 'lr_miles', 'hr_miles', 'bus_miles',
+                        'car_miles', 'lr_hours_wait', 'hr_hours_wait', 'bus_hours_wait', 'lr_hours_enroute',
+                        'hr_hours_enroute', 'bus_hours_enroute', 'car_hours'])
 
     # make empty container to hold compiled results
     compiled_results = []
 
-    # step through each completed run, read in NetSkim.csv, and append results
-    for run in completed_runs:
-        try:
-            run_result = pd.read_csv(os.path.join(aeq_runs_folder, run, 'matrix', 'NetSkim.csv'),
-                                     converters={'Type': str, 'SP/RT': str, 'socio': str, 'projgroup': str,
-                                                 'resil': str, 'elasticity': float, 'hazard': str, 'recovery': str,
-                                                 'Scenario': str})
-            # check if there is a 'nocar' folder as well, if so then read NetSkim.csv and add results together cell-by-cell
-            if os.path.exists(os.path.join(aeq_runs_folder, run, 'nocar')):
-                usecols = ['trips', 'miles', 'hours', 'lost_trips', 'extra_miles', 'extra_hours', 'circuitous_trips_removed']
-                if cfg['calc_transit_metrics']:
-                    usecols.extend(['lr_trips', 'hr_trips', 'bus_trips', 'car_trips', 'lr_miles', 'hr_miles', 'bus_miles',
-                                    'car_miles', 'lr_hours_wait', 'hr_hours_wait', 'bus_hours_wait', 'lr_hours_enroute',
-                                    'hr_hours_enroute', 'bus_hours_enroute', 'car_hours'])
+    # make list of completed runs from run ledger written by aeq_run task
+    ledger_file = rdr_RunLedger.get_ledger_file(output_folder)
+    ledger_runs = rdr_RunLedger.get_completed_runs(ledger_file, cfg['run_id'], 'disrupt', runs_folder)
+    ledger_runs = ledger_runs.loc[ledger_runs['netskim'].notna(), :]
+    ledger_scenarios = set()
+    if ledger_runs.shape[0] > 0:
+        logger.info("Compiling {} completed AequilibraE runs from run ledger {}".format(ledger_runs.shape[0], ledger_file))
+        # run key is '{runs_folder}/disrupt/{run_id}/{disruptscenname}/{matrix_name}'
+        ledger_runs = ledger_runs.assign(scenario=ledger_runs['run_key'].str.rsplit('/', n=1).str[0])
+        nocar_runs = ledger_runs.loc[ledger_runs['matrix_name'] == 'nocar', :].set_index('scenario')['netskim']
+        ledger_scenarios = set(ledger_runs['scenario'].str.rsplit('/', n=1).str[-1])
+        for index, row in ledger_runs.loc[ledger_runs['matrix_name'] == 'matrix', :].iterrows():
+            try:
+                run_result = rdr_RunLedger.read_netskim(row['netskim'])
+                # check if there is a 'nocar' run as well, if so then add results together cell-by-cell
+                if row['scenario'] in nocar_runs.index:
+                    run_result_2 = rdr_RunLedger.read_netskim(nocar_runs[row['scenario']]).loc[:, usecols]
+                    run_result.loc[:, usecols] = run_result.loc[:, usecols].add(run_result_2, fill_value=0)
+
+                compiled_results.append(run_result)
+            except:
+                logger.warning('Error reading run ' + row['run_key'] + ' while compiling results')
+    elif not os.path.exists(aeq_runs_folder):
+        logger.error("AEQUILIBRAE FOLDER ERROR: {} could not be found".format(aeq_runs_folder))
+        raise Exception("AEQUILIBRAE FOLDER ERROR: {} could not be found".format(aeq_runs_folder))
+
+    # runs done before the run ledger was introduced, or copied in from elsewhere, are compiled from their run folders
+    if os.path.exists(aeq_runs_folder):
+        folder_runs = [run for run in os.listdir(aeq_runs_folder) if run not in ledger_scenarios]
+        if len(ledger_scenarios) > 0:
+            # a run folder of a run in progress or failed in this task has no NetSkim.csv and is not compiled
+            folder_runs = [run for run in folder_runs
+                           if os.path.exists(os.path.join(aeq_runs_folder, run, 'matrix', 'NetSkim.csv'))]
+            for run in folder_runs:
+                logger.warning("Run folder {} is not in run ledger {}, compiling results from its NetSkim.csv".format(
+                    os.path.join(aeq_runs_folder, run), ledger_file))
+        elif len(folder_runs) == 0:
+            logger.error("MISSING AEQUILIBRAE RUNS ERROR: {} contains no AequilibraE runs".format(aeq_runs_folder))
+            raise Exception("MISSING AEQUILIBRAE RUNS ERROR: {} contains no AequilibraE runs".format(aeq_runs_folder))
 
-                run_result_2 = pd.read_csv(os.path.join(aeq_runs_folder, run, 'nocar', 'NetSkim.csv'), usecols=usecols)
-                run_result.loc[:, usecols] = run_result.loc[:, usecols].add(run_result_2, fill_value=0)
+        # step through each completed run, read in NetSkim.csv, and append results
+        for run in folder_runs:
+            try:
+                run_result = pd.read_csv(os.path.join(aeq_runs_folder, run, 'matrix', 'NetSkim.csv'),
+                                         converters={'Type': str, 'SP/RT': str, 'socio': str, 'projgroup': str,
+                                                     'resil': str, 'elasticity': float, 'hazard': str, 'recovery': str,
+                                                     'Scenario': str})
+                # check if there is a 'nocar' folder as well, if so then read NetSkim.csv and add results together cell-by-cell
+                if os.path.exists(os.path.join(aeq_runs_folder, run, 'nocar')):
+                    run_result_2 = pd.read_csv(os.path.join(aeq_runs_folder, run, 'nocar', 'NetSkim.csv'), usecols=usecols)
+                    run_result.loc[:, usecols] = run_result.loc[:, usecols].add(run_result_2, fill_value=0)
 
-            compiled_results.append(run_result)
-        except:
-            logger.warning('Error reading run ' + run + ' while compiling results')
+                compiled_results.append(run_result)
+            except:
+                logger.warning('Error reading run ' + run + ' while compiling results')
 
     if len(compiled_results) == 0:
         logger.error("MISSING AEQUILIBRAE RUNS ERROR: {} contains no AequilibraE runs".format(aeq_runs_folder))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+
+# ---------------------------------------------------------------------------------------------------
+# Name: rdr_DemandCatalog
+#
+# Records the metadata of the demand OMX files <socio>_demand_summed.omx of an input folder (matrix names, shape,
+# TAZ mapping hash, and trip totals) in a catalog file next to them, so that the run drivers, helper tools, and input
+# validation look up e.g. whether a 'nocar' trip table exists without reopening the HDF5 file for every LHS row.
+# The entry of a socio is built the first time it is requested and rebuilt only when its OMX file changes.
+#
+# ---------------------------------------------------------------------------------------------------
+import os
+import json
+import hashlib
+import numpy as np
+import openmatrix as omx
+import rdr_supporting
+
+DEMAND_CATALOG_FILE = 'demand_catalog.json'
+
+# demand catalogs read in this process, keyed by demand folder
+_demand_catalog_cache = {}
+
+
+# ==============================================================================
+
+
+# returns the folder of the demand OMX and CSV files of input_folder
+def get_demand_folder(input_folder):
+    return os.path.join(input_folder, 'AEMaster', 'matrices')
+
+
+# ==============================================================================
+
+
+# returns the catalog entry of demand OMX file <socio>_demand_summed.omx of input_folder, or None if it does not exist
+# entry is a dictionary with keys 'file_stamp' (size and modification time of the OMX file), 'shape', 'mappings',
+# 'taz_hash', and 'matrices' (dictionary of matrix name -> {'shape', 'total'})
+def get_demand_info(socio, input_folder, logger):
+    demand_folder = get_demand_folder(input_folder)
+    demand_file = os.path.join(demand_folder, socio + '_demand_summed.omx')
+    if not os.path.exists(demand_file):
+        return None
+    file_stamp = [os.path.getsize(demand_file), os.path.getmtime(demand_file)]
+
+    catalog = _demand_catalog_cache.get(demand_folder, {})
+    if socio in catalog and catalog[socio]['file_stamp'] == file_stamp:
+        return catalog[socio]
+
+    catalog_file = os.path.join(demand_folder, DEMAND_CATALOG_FILE)
+    # parallel workers and helper tools wait for the first one to update the catalog
+    lock = rdr_supporting.acquire_file_lock(catalog_file + '.lock', logger)
+    try:
+        catalog = read_demand_catalog(catalog_file, logger)
+        if socio not in catalog or catalog[socio]['file_stamp'] != file_stamp:
+            logger.debug("adding demand file {} to demand catalog {}".format(demand_file, catalog_file))
+            catalog[socio] = describe_demand_omx(demand_file)
+            catalog[socio]['file_stamp'] = file_stamp
+            tmp_file = catalog_file + '.tmp'
+            with open(tmp_file, 'w') as wf:
+                json.dump(catalog, wf, indent=2, sort_keys=True)
+            os.replace(tmp_file, catalog_file)
+    finally:
+        rdr_supporting.release_file_lock(lock)
+
+    _demand_catalog_cache[demand_folder] = catalog
+    return catalog[socio]
+
+
+# ==============================================================================
+
+
+# returns the demand catalog in catalog_file, or an empty catalog if it does not exist or cannot be read
+def read_demand_catalog(catalog_file, logger):
+    if not os.path.exists(catalog_file):
+        return {}
+    try:
+        with open(catalog_file, 'r') as rf:
+            return json.load(rf)
+    except ValueError:
+        logger.warning("demand catalog {} could not be read, rebuilding it".format(catalog_file))
+        return {}
+
+
+# ==============================================================================
+
+
+# opens demand OMX file demand_file once and returns its catalog entry (without 'file_stamp')
+def describe_demand_omx(demand_file):
+    f = omx.open_file(demand_file, 'r')
+    try:
+        mappings = f.list_mappings()
+        taz_hash = None
+        if 'taz' in mappings:
+            taz_hash = hashlib.sha1(np.ascontiguousarray(f.map_entries('taz'), dtype=np.int64).tobytes()).hexdigest()
+        matrices = {}
+        for matrix_name in f.list_matrices():
+            matrix = np.array(f[matrix_name])
+            matrices[matrix_name] = {'shape': list(matrix.shape), 'total': float(np.sum(matrix))}
+        return {'shape': [int(i) for i in f.shape()], 'mappings': mappings, 'taz_hash': taz_hash,
+                'matrices': matrices}
+    finally:
+        f.close()
+
+
+# ==============================================================================
+
+
+# returns True if demand OMX file <socio>_demand_summed.omx of input_folder has a 'nocar' trip table
+def has_nocar_matrix(socio, input_folder, logger):
+    demand_info = get_demand_info(socio, input_folder, logger)
+    if demand_info is None:
+        demand_file = os.path.join(get_demand_folder(input_folder), socio + '_demand_summed.omx')
+        logger.error("DEMAND OMX FILE ERROR: {} could not be found".format(demand_file))
+        raise Exception("DEMAND OMX FILE ERROR: {} could not be found".format(demand_file))
+    return 'nocar' in demand_info['matrices']
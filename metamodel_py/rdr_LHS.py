@@ -14,7 +14,7 @@ import shutil
 import subprocess
 import sys
 from itertools import product
-from rdr_supporting import log_subprocess_output, log_subprocess_error
+from rdr_supporting import log_subprocess_output, log_subprocess_error, read_model_params
 
 
 def main(input_folder, output_folder, cfg_filepath, cfg, logger):
@@ -67,28 +67,22 @@ def main(input_folder, output_folder, cfg_filepath, cfg, logger):
                          "scenario space defined by {}".format(model_params_file)))
 
     if cfg['cfg_type'] == 'config':
-        socio = pd.read_excel(model_params_file, sheet_name='EconomicScenarios',
-                              usecols=['Economic Scenarios'],
-                              converters={'Economic Scenarios': str})
+        socio = read_model_params(model_params_file, 'EconomicScenarios', logger,
+                                  usecols=['Economic Scenarios'])
         
-        projgroup = pd.read_excel(model_params_file, sheet_name='ProjectGroups',
-                                  usecols=['Project Groups'],
-                                  converters={'Project Groups': str})
+        projgroup = read_model_params(model_params_file, 'ProjectGroups', logger,
+                                      usecols=['Project Groups'])
         
-        elasticity = pd.read_excel(model_params_file, sheet_name='Elasticities',
-                                   usecols=['Trip Loss Elasticities'],
-                                   converters={'Trip Loss Elasticities': float})
+        elasticity = read_model_params(model_params_file, 'Elasticities', logger,
+                                       usecols=['Trip Loss Elasticities'])
                         
-        hazard = pd.read_excel(model_params_file, sheet_name='Hazards',
-                               usecols=['Hazard Event'],
-                               converters={'Hazard Event': str})
+        hazard = read_model_params(model_params_file, 'Hazards', logger,
+                                   usecols=['Hazard Event'])
                 
-        recovery = pd.read_excel(model_params_file, sheet_name='RecoveryStages',
-                                 usecols=['Recovery Stages'],
-                                 converters={'Recovery Stages': str})
+        recovery = read_model_params(model_params_file, 'RecoveryStages', logger,
+                                     usecols=['Recovery Stages'])
 
-        projgroup_to_resil = pd.read_excel(model_params_file, sheet_name='ProjectGroups',
-                                           converters={'Project Groups': str, 'Project ID': str})
+        projgroup_to_resil = read_model_params(model_params_file, 'ProjectGroups', logger)
 
         socio = set(socio['Economic Scenarios'].dropna().tolist())
         projgroup = set(projgroup['Project Groups'].dropna().tolist())
@@ -207,21 +201,17 @@ def check_model_params_coverage(model_params_file, input_folder, cfg, logger):
     if cfg['cfg_type'] == 'config':
         
         # Read in columns 'Hazard Event', 'Economic Scenarios', 'Project Groups'
-        hazard = pd.read_excel(model_params_file, sheet_name='Hazards',
-                               usecols=['Hazard Event'],
-                               converters={'Hazard Event': str})
+        hazard = read_model_params(model_params_file, 'Hazards', logger,
+                                   usecols=['Hazard Event'])
 
-        socio = pd.read_excel(model_params_file, sheet_name='EconomicScenarios',
-                              usecols=['Economic Scenarios'],
-                              converters={'Economic Scenarios': str})
+        socio = read_model_params(model_params_file, 'EconomicScenarios', logger,
+                                  usecols=['Economic Scenarios'])
         
-        projgroup = pd.read_excel(model_params_file, sheet_name='ProjectGroups',
-                                  usecols=['Project Groups'],
-                                  converters={'Project Groups': str})
+        projgroup = read_model_params(model_params_file, 'ProjectGroups', logger,
+                                      usecols=['Project Groups'])
         
-        hazards_list = pd.read_excel(model_params_file, sheet_name='Hazards',
-                                     usecols=['Hazard Event', 'Filename'],
-                                     converters={'Hazard Event': str, 'Filename': str})
+        hazards_list = read_model_params(model_params_file, 'Hazards', logger,
+                                         usecols=['Hazard Event', 'Filename'])
 
         # Do not need to check resilience project coverage; if no links are listed in project_table.csv then no effect
         hazard = set(hazard['Hazard Event'].dropna().tolist())
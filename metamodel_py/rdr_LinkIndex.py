@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+
+# ---------------------------------------------------------------------------------------------------
+# Name: rdr_LinkIndex
+#
+# Maps the string link ids of a network to dense int32 positions, so that link-keyed joins of the network links with
+# exposure, project, TrueShape, link availability, and link flow tables are done by array indexing instead of merging
+# on string keys. The index of each network links file is built once per process; the original link ids are kept by
+# the index and only restored when a table is written.
+#
+# ---------------------------------------------------------------------------------------------------
+import os
+import numpy as np
+import pandas as pd
+import rdr_supporting
+
+# link ids of the network links files read in this process, keyed by (file path, modification time)
+_link_index_cache = {}
+LINK_INDEX_CACHE_SIZE = 8
+
+
+# ==============================================================================
+
+
+# returns the link ids of network links file network_file as a pd.Index, in the order of the file
+def get_link_index(network_file, logger):
+    cache_key = (os.path.abspath(network_file), os.path.getmtime(network_file))
+    if cache_key not in _link_index_cache:
+        network_links = rdr_supporting.read_static_table(network_file, 'link', logger, usecols=['link_id'])
+        link_index = pd.Index(network_links['link_id'].values)
+        if not link_index.is_unique:
+            logger.error("NETWORK LINK FILE ERROR: link_id values in {} are not unique".format(network_file))
+            raise Exception("NETWORK LINK FILE ERROR: link_id values in {} are not unique".format(network_file))
+        if len(_link_index_cache) >= LINK_INDEX_CACHE_SIZE:
+            _link_index_cache.pop(next(iter(_link_index_cache)))
+        _link_index_cache[cache_key] = link_index
+
+    return _link_index_cache[cache_key]
+
+
+# ==============================================================================
+
+
+# returns a pd.Index of the distinct link ids of one or more arrays of link ids, in order of first appearance
+def make_link_index(*link_ids):
+    if len(link_ids) == 0:
+        return pd.Index([], dtype=object)
+    return pd.Index(pd.unique(np.concatenate([np.asarray(ids, dtype=object) for ids in link_ids])))
+
+
+# ==============================================================================
+
+
+# returns the int32 position in link_index of each of link_ids, -1 if not in link_index
+def get_link_positions(link_index, link_ids):
+    return link_index.get_indexer(np.asarray(link_ids, dtype=object)).astype(np.int32)
+
+
+# ==============================================================================
+
+
+# returns values[positions], with fill_value for positions of -1 (links not found), as in a left join
+def take_link_values(values, positions, fill_value=np.nan):
+    return pd.api.extensions.take(np.asarray(values), positions, allow_fill=True, fill_value=fill_value)
+
+
+# ==============================================================================
+
+
+# returns values of links link_ids aligned to link_index, with fill_value for links of link_index not in link_ids,
+# and a flag of the links of link_index found in link_ids; links not in link_index are ignored
+def scatter_link_values(link_index, link_ids, values, fill_value=np.nan):
+    positions = get_link_positions(link_index, link_ids)
+    in_index = positions >= 0
+    values = np.asarray(values)
+    result = np.full(len(link_index), fill_value, dtype=object if values.dtype == object else float)
+    result[positions[in_index]] = values[in_index]
+    found = np.zeros(len(link_index), dtype=bool)
+    found[positions[in_index]] = True
+    return result, found
@@ -18,7 +18,7 @@ import numpy as np
 import pandas as pd
 import geopandas as gpd
 from rdr_RecoveryInit import make_hazard_levels
-from rdr_supporting import check_file_exists, check_left_merge
+from rdr_supporting import check_file_exists, check_left_merge, read_model_params, read_typed_csv
 
 
 def main(input_folder, output_folder, cfg, logger):
@@ -144,8 +144,7 @@ def main(input_folder, output_folder, cfg, logger):
     if cfg['cfg_type'] == 'config':
         model_params_file = check_file_exists(os.path.join(input_folder, 'Model_Parameters.xlsx'), logger)
         hazard_levels = make_hazard_levels(model_params_file, 'config', logger)
-        projgroup_to_resil = pd.read_excel(model_params_file, sheet_name='ProjectGroups',
-                                           converters={'Project Groups': str, 'Project ID': str})
+        projgroup_to_resil = read_model_params(model_params_file, 'ProjectGroups', logger)
         projgroup_to_resil = projgroup_to_resil.rename(columns={'Project ID': 'Resiliency Projects'})
     else:  # cfg_type = 'json'
         hazard_levels = make_hazard_levels(cfg, 'json', logger)
@@ -1727,9 +1726,9 @@ def main(input_folder, output_folder, cfg, logger):
         depths = pd.DataFrame()
         for index, row in hazard_levels.iterrows():
             filename = str(row['Filename']) + '.csv'
-            temp_depths = pd.read_csv(os.path.join(exposures_folder, filename),
-                                      usecols=['link_id', cfg['exposure_field']],
-                                      converters={'link_id': str, cfg['exposure_field']: float})
+            temp_depths = read_typed_csv(os.path.join(exposures_folder, filename), 'exposure', logger,
+                                         usecols=['link_id', cfg['exposure_field']],
+                                         dtypes={cfg['exposure_field']: 'float'})
             temp_depths.drop_duplicates(subset=['link_id'], inplace=True, ignore_index=True)
             # catch any empty values in exposure field and set to 0 exposure
             temp_depths[cfg['exposure_field']] = temp_depths[cfg['exposure_field']].fillna(0)
@@ -1816,9 +1815,8 @@ def check_roi_required_inputs(input_folder, cfg, logger):
 
     if cfg['cfg_type'] == 'config':
         model_params_file = check_file_exists(os.path.join(input_folder, 'Model_Parameters.xlsx'), logger)
-        model_params = pd.read_excel(model_params_file, sheet_name='Hazards',
-                                     usecols=['Hazard Event', 'Event Probability in Start Year'],
-                                     converters={'Hazard Event': str, 'Event Probability in Start Year': float})
+        model_params = read_model_params(model_params_file, 'Hazards', logger,
+                                         usecols=['Hazard Event', 'Event Probability in Start Year'])
     else:  # cfg_type = 'json'
         model_params = cfg['hazards']
 
@@ -1946,15 +1944,13 @@ def geom_process(true_shape_file: str, crs: str, logger) -> gpd.GeoDataFrame:
     """geom_process will take the TrueShape.csv and create a geopandas
     geodataframe."""
 
-    true_shape_table = pd.read_csv(true_shape_file, usecols=['link_id', 'WKT'],
-                                   converters={'link_id': str, 'WKT': str})
+    true_shape_table = read_typed_csv(true_shape_file, 'true_shape', logger, usecols=['link_id', 'WKT'])
     true_shape_table = true_shape_table.drop_duplicates(ignore_index=True)
 
     # add asset column to TrueShape data, pulled in from project info and project table
     project_table_path = os.path.join(os.path.dirname(true_shape_file), 'project_table.csv')
 
-    asset_link_id = pd.read_csv(project_table_path, converters={'link_id': str, 'Project ID': str, 'Category': str,
-                                                                'Exposure Reduction': float})
+    asset_link_id = read_typed_csv(project_table_path, 'project_table', logger)
 
     true_shape_table = pd.merge(left = true_shape_table, right = asset_link_id, on = 'link_id', how = 'left')
     logger.debug("Size of look-up table for wkt: {}".format(true_shape_table.shape))
@@ -15,6 +15,9 @@ import numpy as np
 import pandas as pd
 import pandasql
 from itertools import product
+from rdr_supporting import read_model_params, read_typed_csv
+import rdr_BinLookup
+import rdr_LinkIndex
 
 
 def main(input_folder, output_folder, cfg, logger):
@@ -58,24 +61,19 @@ def main(input_folder, output_folder, cfg, logger):
     # (6) set of project groups associated with resilience projects,
     # (7) set of assets to analyze (superset of (4)), (8) user parameters around hazard duration uncertainty
     if cfg['cfg_type'] == 'config':
-        socio = pd.read_excel(model_params_file, sheet_name='EconomicScenarios',
-                              usecols=['Economic Scenarios'],
-                              converters={'Economic Scenarios': str})
+        socio = read_model_params(model_params_file, 'EconomicScenarios', logger,
+                                  usecols=['Economic Scenarios'])
         
-        elasticity = pd.read_excel(model_params_file, sheet_name='Elasticities',
-                                   usecols=['Trip Loss Elasticities'],
-                                   converters={'Trip Loss Elasticities': float})
+        elasticity = read_model_params(model_params_file, 'Elasticities', logger,
+                                       usecols=['Trip Loss Elasticities'])
                         
-        hazard = pd.read_excel(model_params_file, sheet_name='Hazards',
-                               usecols=['Hazard Event'],
-                               converters={'Hazard Event': str})
+        hazard = read_model_params(model_params_file, 'Hazards', logger,
+                                   usecols=['Hazard Event'])
         
-        frequency = pd.read_excel(model_params_file, sheet_name='FrequencyFactors',
-                                  usecols=['Event Frequency Factors'],
-                                  converters={'Event Frequency Factors': float})         
+        frequency = read_model_params(model_params_file, 'FrequencyFactors', logger,
+                                      usecols=['Event Frequency Factors'])         
         
-        projgroup_to_resil = pd.read_excel(model_params_file, sheet_name='ProjectGroups',
-                                           converters={'Project Groups': str, 'Project ID': str})
+        projgroup_to_resil = read_model_params(model_params_file, 'ProjectGroups', logger)
         projgroup_to_resil = projgroup_to_resil.rename(columns={'Project ID': 'Resiliency Projects'})
 
         hazard_to_run = set(hazard['Hazard Event'].dropna().tolist())
@@ -291,13 +289,13 @@ def main(input_folder, output_folder, cfg, logger):
     resil_mitigation_approach = cfg['resil_mitigation_approach']
     logger.config("{} resilience project mitigation approach to be used".format(resil_mitigation_approach))
     if resil_mitigation_approach == 'binary':
-        projects = pd.read_csv(project_table, usecols=['Project ID', 'link_id', 'Category'],
-                               converters={'Project ID': str, 'link_id': str, 'Category': str})
+        projects = read_typed_csv(project_table, 'project_table', logger,
+                                  usecols=['Project ID', 'link_id', 'Category'])
         # NOTE: use 99999 to denote complete mitigation
         projects['Exposure Reduction'] = 99999.0
     elif resil_mitigation_approach == 'manual':
-        projects = pd.read_csv(project_table, usecols=['Project ID', 'link_id', 'Category', 'Exposure Reduction'],
-                               converters={'Project ID': str, 'link_id': str, 'Category': str, 'Exposure Reduction': float})
+        projects = read_typed_csv(project_table, 'project_table', logger,
+                                  usecols=['Project ID', 'link_id', 'Category', 'Exposure Reduction'])
     else:
         logger.error("Invalid option selected for resilience mitigation approach.")
         raise Exception("Variable resil_mitigation_approach must be set to 'binary' or 'manual'.")
@@ -316,9 +314,8 @@ def main(input_folder, output_folder, cfg, logger):
                                                                                          row['Filename'])))
             raise Exception("NETWORK FILE ERROR: {} could not be found".format(os.path.join(networks_folder,
                                                                                             row['Filename'])))
-        temp_network = pd.read_csv(os.path.join(networks_folder, row['Filename']),
-                                   usecols=['link_id', 'length', 'lanes', 'facility_type'],
-                                   converters={'link_id': str, 'length': float, 'lanes': int, 'facility_type': str})
+        temp_network = read_typed_csv(os.path.join(networks_folder, row['Filename']), 'link', logger,
+                                      usecols=['link_id', 'length', 'lanes', 'facility_type'])
         temp_network.rename({'length': 'DISTANCE', 'lanes': 'LANES', 'facility_type': 'FACTYPE'},
                             axis='columns', inplace=True)
         temp_network['Project Group'] = row['Project Group']
@@ -338,9 +335,9 @@ def main(input_folder, output_folder, cfg, logger):
                                                                                                  filename)))
             raise Exception("HAZARD EXPOSURE FILE ERROR: {} could not be found".format(os.path.join(exposures_folder,
                                                                                                     filename)))
-        temp_depths = pd.read_csv(os.path.join(exposures_folder, filename),
-                                  usecols=['link_id', cfg['exposure_field']],
-                                  converters={'link_id': str, cfg['exposure_field']: float})
+        temp_depths = read_typed_csv(os.path.join(exposures_folder, filename), 'exposure', logger,
+                                     usecols=['link_id', cfg['exposure_field']],
+                                     dtypes={cfg['exposure_field']: 'float'})
         temp_depths.drop_duplicates(subset=['link_id'], inplace=True, ignore_index=True)
         # catch any empty values in exposure field and set to 0 exposure
         temp_depths[cfg['exposure_field']] = temp_depths[cfg['exposure_field']].fillna(0)
@@ -348,6 +345,13 @@ def main(input_folder, output_folder, cfg, logger):
         depths = pd.concat([depths, temp_depths], ignore_index=True)
     logger.debug("Size of input exposure table: {}".format(depths.shape))
 
+    # link ids are joined as int32 positions in a link index of the project, network, and exposure tables,
+    # and restored in the repair calculator table
+    link_index = rdr_LinkIndex.make_link_index(projects['link_id'].values, network['link_id'].values,
+                                               depths['link_id'].values)
+    for table in [projects, network, depths]:
+        table['link_id'] = rdr_LinkIndex.get_link_positions(link_index, table['link_id'].values)
+
     # NOTE: 'Exposure Reduction' field merged implicitly, used for damage calculation
     merged1 = pd.merge(initial_stages, projects, how='left', left_on='Resiliency Project', right_on='Project ID',
                        indicator=True)
@@ -435,25 +439,13 @@ def main(input_folder, output_folder, cfg, logger):
         # units for default depth-damage table is feet
         # look up 'Damage (%)' for each network link based on 'min_exposure' and 'max_exposure'
         # look up for both baseline and resilience scenarios
-
-        sqlcode_baseline = """
-        select merged3.*, damages."Damage (%)" as baseline_damage
-        from merged3
-        left outer join damages
-        on merged3."Category" = damages."Asset Type"
-        and merged3."baseline_value" >= damages."min_exposure"
-        and merged3."baseline_value" < damages."max_exposure"
-        """
-        temp = pandasql.sqldf(sqlcode_baseline, locals())
-        sqlcode_project = """
-        select temp.*, damages."Damage (%)" as project_damage
-        from temp
-        left outer join damages
-        on temp."Category" = damages."Asset Type"
-        and temp."project_value" >= damages."min_exposure"
-        and temp."project_value" < damages."max_exposure"
-        """
-        merged4 = pandasql.sqldf(sqlcode_project, locals())
+        damage_lookup = rdr_BinLookup.make_bin_lookup(damages['min_exposure'].values, damages['max_exposure'].values,
+                                                      damages['Damage (%)'].values, keys=damages['Asset Type'].values)
+        merged4 = merged3.copy(deep=True)
+        merged4['baseline_damage'] = rdr_BinLookup.lookup_bin_values(damage_lookup, merged4['baseline_value'].values,
+                                                                     keys=merged4['Category'].values)
+        merged4['project_damage'] = rdr_BinLookup.lookup_bin_values(damage_lookup, merged4['project_value'].values,
+                                                                    keys=merged4['Category'].values)
 
     if exposure_damage_approach == 'manual':
         # use user-defined exposure-damage table with structure similar to default_damage_table
@@ -472,24 +464,13 @@ def main(input_folder, output_folder, cfg, logger):
 
         # look up 'Damage (%)' for each network link based on 'min_exposure' and 'max_exposure'
         # look up for both baseline and resilience scenarios
-        sqlcode_baseline = """
-        select merged3.*, damages."Damage (%)" as baseline_damage
-        from merged3
-        left outer join damages
-        on merged3."Category" = damages."Asset Type"
-        and merged3."baseline_value" >= damages."min_exposure"
-        and merged3."baseline_value" < damages."max_exposure"
-        """
-        temp = pandasql.sqldf(sqlcode_baseline, locals())
-        sqlcode_project = """
-        select temp.*, damages."Damage (%)" as project_damage
-        from temp
-        left outer join damages
-        on temp."Category" = damages."Asset Type"
-        and temp."project_value" >= damages."min_exposure"
-        and temp."project_value" < damages."max_exposure"
-        """
-        merged4 = pandasql.sqldf(sqlcode_project, locals())
+        damage_lookup = rdr_BinLookup.make_bin_lookup(damages['min_exposure'].values, damages['max_exposure'].values,
+                                                      damages['Damage (%)'].values, keys=damages['Asset Type'].values)
+        merged4 = merged3.copy(deep=True)
+        merged4['baseline_damage'] = rdr_BinLookup.lookup_bin_values(damage_lookup, merged4['baseline_value'].values,
+                                                                     keys=merged4['Category'].values)
+        merged4['project_damage'] = rdr_BinLookup.lookup_bin_values(damage_lookup, merged4['project_value'].values,
+                                                                    keys=merged4['Category'].values)
 
     # ensure 'project_damage' values equal 0 for resilience project network links in binary case
     # or network links given value 99999 for Exposure Reduction in manual case
@@ -646,6 +627,11 @@ def main(input_folder, output_folder, cfg, logger):
     logger.debug(("Number of network links missing project " +
                   "repair time values: {}".format(merged6[merged6['project_repair_time'].isnull()].shape[0])))
 
+    # link positions of projects not in the project table are missing (and float after the joins), restored as NaN
+    merged6['link_id'] = rdr_LinkIndex.take_link_values(link_index.values,
+                                                        merged6['link_id'].fillna(-1).astype(np.int32).values,
+                                                        fill_value=np.nan)
+
     repair_calculator_file = os.path.join(output_folder, 'repair_calculator_' + str(cfg['run_id']) + '.csv')
     with open(repair_calculator_file, "w", newline='') as f:
         logger.result("Repair cost and time lookup table written to {}".format(repair_calculator_file))
@@ -739,18 +725,15 @@ def check_user_inputs_coverage(model_params_file, input_folder, cfg, logger):
     is_covered = 1
 
     if cfg['cfg_type'] == 'config':
-        socio = pd.read_excel(model_params_file, sheet_name='EconomicScenarios',
-                              usecols=['Economic Scenarios'],
-                              converters={'Economic Scenarios': str})
+        socio = read_model_params(model_params_file, 'EconomicScenarios', logger,
+                                  usecols=['Economic Scenarios'])
         
-        projgroup_to_resil = pd.read_excel(model_params_file, sheet_name='ProjectGroups',
-                                           converters={'Project Groups': str, 'Project ID': str})
+        projgroup_to_resil = read_model_params(model_params_file, 'ProjectGroups', logger)
         projgroup_to_resil = projgroup_to_resil.rename(columns={'Project ID': 'Resiliency Projects'})
         projgroup_to_resil = projgroup_to_resil.loc[projgroup_to_resil['Resiliency Projects'] != 'no', ['Project Groups', 'Resiliency Projects']]
 
-        hazard_events = pd.read_excel(model_params_file, sheet_name='Hazards',
-                                      usecols=['Hazard Event', 'Filename'],
-                                      converters={'Hazard Event': str, 'Filename': str})
+        hazard_events = read_model_params(model_params_file, 'Hazards', logger,
+                                          usecols=['Hazard Event', 'Filename'])
         
         # read in columns 'Hazard Event', 'Economic Scenarios', 'Resiliency Projects'
         # do not check resilience project coverage
@@ -798,14 +781,11 @@ def check_user_inputs_coverage(model_params_file, input_folder, cfg, logger):
 def make_hazard_levels(input_file, cfg_type, logger):
     logger.info("Start: make_hazard_levels")
     if cfg_type == 'config':
-        hazard_events = pd.read_excel(input_file, sheet_name='Hazards',
-                                      usecols=['Hazard Event', 'Filename', 'HazardDim1', 'HazardDim2',
-                                               'Event Probability in Start Year'],
-                                      converters={'Hazard Event': str, 'Filename': str, 'HazardDim1': int, 'HazardDim2': int,
-                                                  'Event Probability in Start Year': float})
-        model_params = pd.read_excel(input_file, sheet_name='RecoveryStages',
-                                     usecols=['Recovery Stages'],
-                                     converters={'Recovery Stages': str})
+        hazard_events = read_model_params(input_file, 'Hazards', logger,
+                                          usecols=['Hazard Event', 'Filename', 'HazardDim1', 'HazardDim2',
+                                                   'Event Probability in Start Year'])
+        model_params = read_model_params(input_file, 'RecoveryStages', logger,
+                                         usecols=['Recovery Stages'])
         # recovery stages are placed in ascending order as strings not numeric
         recovery = sorted(set(model_params['Recovery Stages'].dropna().tolist()))
     else:  # cfg_type = 'json'
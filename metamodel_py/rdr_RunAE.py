@@ -10,10 +10,16 @@
 # ---------------------------------------------------------------------------------------------------
 import os
 import copy
+import logging
+import logging.handlers
+import traceback
+import multiprocessing
+import concurrent.futures
 import pandas as pd
-import openmatrix as omx
 import sqlite3
 import rdr_AESingleRun
+import rdr_DemandCatalog
+import rdr_supporting
 
 
 def main(input_folder, output_folder, cfg, logger):
@@ -71,30 +77,168 @@ def main(input_folder, output_folder, cfg, logger):
     if os.path.exists(disrupt_runs_folder):
         logger.warning("Disrupt AequilibraE runs folder for {} already exists, appending runs".format(cfg['run_id']))
 
-    # call run_AESingleRun method in rdr_AESingleRun.py for each row of LHS table indicated as selected sample run
+    # build list of AequilibraE runs from each row of LHS table indicated as selected sample run
+    # create demand OMX files up front so the 'nocar' check and all runs read the same file
+    # the 'nocar' check reads the demand catalog (see rdr_DemandCatalog), which opens each OMX file once
+    aeq_runs = []
     for index, row in lhs_runs.iterrows():
         if row['LHS_ID'] != 'NA':
             run_params = copy.deepcopy(row)
             run_params['run_minieq'] = cfg['run_minieq']
             run_params['matrix_name'] = 'matrix'  # always run AequilibraE for the default 'matrix'
+            aeq_runs.append(run_params)
 
+            # run AequilibraE a second time if a 'nocar' trip table exists
+            rdr_AESingleRun.check_demand_omx(run_params['socio'], input_folder, cfg, logger)
+            if rdr_DemandCatalog.has_nocar_matrix(run_params['socio'], input_folder, logger):
+                nocar_params = copy.deepcopy(run_params)
+                nocar_params['matrix_name'] = 'nocar'
+                aeq_runs.append(nocar_params)
+
+    # calculate link availability of every disrupted network up front, so network runs look up their disrupted network
+    rdr_AESingleRun.build_link_availability_table(aeq_runs, input_folder, cfg, logger)
+
+    logger.config("{} AequilibraE runs to be executed with {} parallel worker(s)".format(len(aeq_runs),
+                                                                                        cfg['parallel_workers']))
+
+    if cfg['parallel_workers'] > 1 and len(aeq_runs) > 1:
+        run_parallel(aeq_runs, input_folder, output_folder, cfg, logger)
+    else:
+        # call run_AESingleRun method in rdr_AESingleRun.py for each run
+        for run_params in aeq_runs:
             # determining whether run has already been done takes place within run_AESingleRun method
             rdr_AESingleRun.run_AESingleRun(run_params, input_folder, output_folder, cfg, logger)
 
-            # run AequilibraE a second time if a 'nocar' trip table exists
-            mtx_fldr = 'matrices'
-            demand_file = os.path.join(input_folder, 'AEMaster', mtx_fldr, run_params['socio'] + '_demand_summed.omx')
-            if not os.path.exists(demand_file):
-                logger.error("DEMAND OMX FILE ERROR: {} could not be found".format(demand_file))
-                raise Exception("DEMAND OMX FILE ERROR: {} could not be found".format(demand_file))
-            f = omx.open_file(demand_file)
-            if 'nocar' in f.list_matrices():
-                f.close()
-                run_params['matrix_name'] = 'nocar'
-                
-                # determining whether run has already been done takes place within run_AESingleRun method
-                rdr_AESingleRun.run_AESingleRun(run_params, input_folder, output_folder, cfg, logger)
-            else:
-                f.close()
-
     logger.info("Finished: AequilibraE run module")
+
+
+# ==============================================================================
+
+
+def build_run_graph(aeq_runs, output_folder, cfg):
+    # Build the dependency graph between AequilibraE runs
+    # Every disrupt run reads the skims of the base run for the same socio, projgroup, and matrix_name
+    # ('matrix' and 'nocar' runs have separate base runs) and the disrupted network and shortest path skim shared by
+    # all elasticities (network run), so each base run is a node that releases its network runs, and each network run
+    # is a node that releases its disrupt runs
+    # Returns dictionary of run folder -> run_params used to build it (first run in LHS table order) for base runs,
+    # and dictionary of run folder -> list of dependent (run type, run folder, run_params) for base and network runs
+    base_runs = {}
+    dependents = {}
+    for run_params in aeq_runs:
+        base_run_folder, disrupt_run_folder = rdr_AESingleRun.get_run_folders(run_params, output_folder, cfg)[1::2]
+        if base_run_folder not in base_runs:
+            base_runs[base_run_folder] = run_params
+            dependents[base_run_folder] = []
+        if disrupt_run_folder is not None:
+            network_run_folder = rdr_AESingleRun.get_network_run_folder(run_params, output_folder, cfg)
+            if network_run_folder not in dependents:
+                dependents[base_run_folder].append(('network', network_run_folder, run_params))
+                dependents[network_run_folder] = []
+            dependents[network_run_folder].append(('disrupt', disrupt_run_folder, run_params))
+
+    return base_runs, dependents
+
+
+# ==============================================================================
+
+
+def run_parallel(aeq_runs, input_folder, output_folder, cfg, logger):
+    # Dispatch AequilibraE runs to a pool of worker processes
+    # Each worker writes to its own run folders; log records are passed back to the parent process through a queue
+    # and written by the parent's file and console handlers
+    # Each base and network run is executed once (under a file lock, see rdr_AESingleRun.build_base_run) and its
+    # dependent runs are dispatched as soon as it completes
+    num_workers = min(cfg['parallel_workers'], len(aeq_runs))
+    logger.info("Running AequilibraE runs in parallel with {} worker processes".format(num_workers))
+
+    base_runs, dependents = build_run_graph(aeq_runs, output_folder, cfg)
+    num_network_runs = sum([len(dependents[x]) for x in base_runs])
+    logger.debug("{} base runs, {} network runs, and {} disrupt runs to be scheduled".format(
+        len(base_runs), num_network_runs, sum([len(x) for x in dependents.values()]) - num_network_runs))
+
+    manager = multiprocessing.Manager()
+    log_queue = manager.Queue()
+    listener = logging.handlers.QueueListener(log_queue, *logger.handlers, respect_handler_level=True)
+    listener.start()
+
+    failures = []
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker,
+                                                    initargs=(log_queue,)) as executor:
+            # submit all base runs first so they are ahead of any disrupt run in the pool queue
+            pending = {}
+            for base_run_folder, run_params in base_runs.items():
+                future = executor.submit(run_worker, 'base', run_params, input_folder, output_folder, cfg)
+                pending[future] = ('base', base_run_folder)
+
+            while len(pending) > 0:
+                done, not_done = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    run_type, run_folder = pending.pop(future)
+                    error = get_worker_error(future)
+                    if error is not None:
+                        failures.append((run_folder, error))
+                    if run_type == 'disrupt':
+                        continue
+                    if error is not None:
+                        # dependent runs cannot proceed without their base or network run
+                        for dependent_type, dependent_folder, run_params in dependents[run_folder]:
+                            failures.append((dependent_folder, "{} run {} failed".format(run_type.capitalize(),
+                                                                                         run_folder)))
+                            for disrupt_type, disrupt_folder, disrupt_params in dependents.get(dependent_folder, []):
+                                failures.append((disrupt_folder, "{} run {} failed".format(run_type.capitalize(),
+                                                                                           run_folder)))
+                        continue
+                    logger.debug("{} run {} complete, releasing {} dependent runs".format(
+                        run_type.capitalize(), run_folder, len(dependents[run_folder])))
+                    for dependent_type, dependent_folder, run_params in dependents[run_folder]:
+                        future = executor.submit(run_worker, dependent_type, run_params, input_folder, output_folder,
+                                                 cfg)
+                        pending[future] = (dependent_type, dependent_folder)
+    finally:
+        listener.stop()
+        manager.shutdown()
+
+    if len(failures) > 0:
+        for run_folder, error in failures:
+            logger.error("AEQ RUN ERROR: run {} failed\n{}".format(run_folder, error))
+        logger.error("AEQ RUN ERROR: {} AequilibraE runs failed, see log for details".format(len(failures)))
+        raise Exception("AEQ RUN ERROR: {} AequilibraE runs failed, see log for details".format(len(failures)))
+
+
+# ==============================================================================
+
+
+def init_worker(log_queue):
+    rdr_supporting.create_worker_logger(log_queue)
+
+
+# ==============================================================================
+
+
+def run_worker(run_type, run_params, input_folder, output_folder, cfg):
+    # Executes a single AequilibraE run in a worker process
+    # Returns None if successful or the formatted traceback if the run failed
+    logger = logging.getLogger('log')
+    try:
+        if run_type == 'base':
+            rdr_AESingleRun.run_AEBaseRun(run_params, input_folder, output_folder, cfg, logger)
+        elif run_type == 'network':
+            rdr_AESingleRun.run_AENetworkRun(run_params, input_folder, output_folder, cfg, logger)
+        else:
+            rdr_AESingleRun.run_AESingleRun(run_params, input_folder, output_folder, cfg, logger)
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+
+# ==============================================================================
+
+
+def get_worker_error(future):
+    # A worker process that dies (rather than raising an exception) is reported through the future
+    try:
+        return future.result()
+    except Exception:
+        return traceback.format_exc()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+
+# ---------------------------------------------------------------------------------------------------
+# Name: rdr_RunLedger
+#
+# SQLite ledger of AequilibraE runs kept in the output folder. Records the parameters, status, host, start/end time,
+# per-phase durations, and input fingerprint of each base, network, and disrupt run, along with the NetSkim.csv summary
+# of completed disrupt runs.
+# Used by the aeq_run task to determine which runs (and which phases of an interrupted run) are complete, by the
+# aeq_compile task to compile results without crawling run folders, and by the output report.
+#
+# ---------------------------------------------------------------------------------------------------
+import os
+import io
+import json
+import socket
+import hashlib
+import sqlite3
+import datetime
+import pandas as pd
+
+LEDGER_FILE_NAME = 'aeq_runs_ledger.sqlite'
+
+# concurrent aeq_run processes (or worker processes) may write to the ledger at the same time
+# writes are short, so wait on a locked database rather than failing
+LEDGER_TIMEOUT = 600
+
+# columns added to the runs table after it was first created, added to existing ledgers when opened
+RUNS_ADDED_COLUMNS = {'fingerprint': 'text', 'network_hash': 'text'}
+
+# file hashes computed in this process, keyed by (file path, modification time, size)
+_file_hash_cache = {}
+
+
+# ==============================================================================
+
+
+def get_ledger_file(output_folder):
+    return os.path.join(output_folder, LEDGER_FILE_NAME)
+
+
+# ==============================================================================
+
+
+def get_run_key(output_folder, run_folder):
+    # run key is the run folder relative to the output folder, e.g., 'aeq_runs/disrupt/QS1/base00_no_10_haz1_0/matrix'
+    return os.path.relpath(run_folder, output_folder).replace(os.sep, '/')
+
+
+# ==============================================================================
+
+
+def connect(ledger_file):
+    db_con = sqlite3.connect(ledger_file, timeout=LEDGER_TIMEOUT)
+    db_con.execute("""create table if not exists runs (
+                   run_key text primary key,
+                   run_id text,
+                   run_type text,
+                   socio text,
+                   projgroup text,
+                   resil text,
+                   elasticity real,
+                   hazard text,
+                   recovery text,
+                   matrix_name text,
+                   run_minieq integer,
+                   status text,
+                   host text,
+                   pid integer,
+                   start_time text,
+                   end_time text,
+                   netskim text,
+                   error text);""")
+    db_con.execute("""create table if not exists phases (
+                   run_key text,
+                   phase text,
+                   start_time text,
+                   end_time text,
+                   duration real,
+                   primary key (run_key, phase));""")
+    db_con.execute("""create table if not exists file_hashes (
+                   file_path text primary key,
+                   mtime integer,
+                   size integer,
+                   sha256 text);""")
+    columns = [x[1] for x in db_con.execute("pragma table_info(runs);").fetchall()]
+    for column, column_type in RUNS_ADDED_COLUMNS.items():
+        if column not in columns:
+            db_con.execute("alter table runs add column {} {};".format(column, column_type))
+    return db_con
+
+
+# ==============================================================================
+
+
+def start_run(ledger_file, run_key, run_type, run_params, cfg, fingerprint=None):
+    # status is 'running' until complete_run or fail_run is called
+    # an entry left as 'running' by an aborted run is treated the same as a missing entry
+    # fingerprint identifies the inputs of the run (see get_fingerprint)
+    # phases recorded by an aborted or failed run with the same fingerprint are kept as checkpoints to resume from
+    # (see get_completed_phases)
+    with connect(ledger_file) as db_con:
+        row = db_con.execute("select fingerprint from runs where run_key = ?;", (run_key,)).fetchone()
+        if row is None or fingerprint is None or row[0] != fingerprint:
+            db_con.execute("delete from phases where run_key = ?;", (run_key,))
+        db_con.execute("""insert or replace into runs (run_key, run_id, run_type, socio, projgroup, resil, elasticity,
+                       hazard, recovery, matrix_name, run_minieq, status, host, pid, start_time, fingerprint)
+                       values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'running', ?, ?, ?, ?);""",
+                       (run_key, str(cfg['run_id']), run_type, run_params['socio'], run_params['projgroup'],
+                        run_params['resil'], float(run_params['elasticity']), run_params['hazard'],
+                        run_params['recovery'], run_params['matrix_name'], int(run_params['run_minieq']),
+                        socket.gethostname(), os.getpid(), datetime.datetime.now().isoformat(), fingerprint))
+    db_con.close()
+
+
+# ==============================================================================
+
+
+def record_phase(ledger_file, run_key, phase, start_time):
+    # records the duration of a run phase started at start_time (datetime) and ending now
+    end_time = datetime.datetime.now()
+    with connect(ledger_file) as db_con:
+        db_con.execute("insert or replace into phases (run_key, phase, start_time, end_time, duration) values (?, ?, ?, ?, ?);",
+                       (run_key, phase, start_time.isoformat(), end_time.isoformat(),
+                        (end_time - start_time).total_seconds()))
+    db_con.close()
+
+
+# ==============================================================================
+
+
+def get_completed_phases(ledger_file, run_key):
+    # returns list of phases completed by the current or a previous attempt of a run with the same fingerprint
+    with connect(ledger_file) as db_con:
+        rows = db_con.execute("select phase from phases where run_key = ? order by end_time;", (run_key,)).fetchall()
+    db_con.close()
+    return [x[0] for x in rows]
+
+
+# ==============================================================================
+
+
+def complete_run(ledger_file, run_key, netskim_file=None):
+    # netskim_file is the NetSkim.csv output of a disrupt run, stored in the ledger for the aeq_compile task
+    netskim = None
+    if netskim_file is not None:
+        with open(netskim_file, 'r') as f:
+            netskim = f.read()
+    with connect(ledger_file) as db_con:
+        db_con.execute("update runs set status = 'complete', end_time = ?, netskim = ?, error = null where run_key = ?;",
+                       (datetime.datetime.now().isoformat(), netskim, run_key))
+    db_con.close()
+
+
+# ==============================================================================
+
+
+def fail_run(ledger_file, run_key, error):
+    with connect(ledger_file) as db_con:
+        db_con.execute("update runs set status = 'failed', end_time = ?, error = ? where run_key = ?;",
+                       (datetime.datetime.now().isoformat(), str(error), run_key))
+    db_con.close()
+
+
+# ==============================================================================
+
+
+def get_run_status(ledger_file, run_key):
+    # returns tuple of status ('running', 'complete', 'failed') and input fingerprint of the run
+    # returns (None, None) if the run is not in the ledger
+    if not os.path.exists(ledger_file):
+        return None, None
+    with connect(ledger_file) as db_con:
+        row = db_con.execute("select status, fingerprint from runs where run_key = ?;", (run_key,)).fetchone()
+    db_con.close()
+    if row is None:
+        return None, None
+    return row[0], row[1]
+
+
+# ==============================================================================
+
+
+def set_network_hash(ledger_file, run_key, network_hash):
+    # network_hash identifies the disrupted network and everything else determining the outputs of a disrupt run
+    with connect(ledger_file) as db_con:
+        db_con.execute("update runs set network_hash = ? where run_key = ?;", (network_hash, run_key))
+    db_con.close()
+
+
+# ==============================================================================
+
+
+def find_network_match(ledger_file, network_hash, run_key):
+    # returns list of run keys of other completed runs (from any run ID) with the same network_hash
+    with connect(ledger_file) as db_con:
+        rows = db_con.execute("""select run_key from runs where network_hash = ? and status = 'complete' and run_key != ?
+                              order by end_time;""", (network_hash, run_key)).fetchall()
+    db_con.close()
+    return [x[0] for x in rows]
+
+
+# ==============================================================================
+
+
+def get_file_hash(ledger_file, file_path):
+    # returns SHA-256 hash of file contents, or 'missing' if the file does not exist
+    # hashes are reused while the file modification time and size are unchanged, both within this process and
+    # across processes through the file_hashes table of the ledger
+    if not os.path.exists(file_path):
+        return 'missing'
+    file_path = os.path.abspath(file_path)
+    file_stat = os.stat(file_path)
+    cache_key = (file_path, file_stat.st_mtime_ns, file_stat.st_size)
+    if cache_key in _file_hash_cache:
+        return _file_hash_cache[cache_key]
+
+    with connect(ledger_file) as db_con:
+        row = db_con.execute("select sha256 from file_hashes where file_path = ? and mtime = ? and size = ?;",
+                             cache_key).fetchone()
+    db_con.close()
+    if row is not None:
+        _file_hash_cache[cache_key] = row[0]
+        return row[0]
+
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(block)
+    file_hash = sha256.hexdigest()
+
+    with connect(ledger_file) as db_con:
+        db_con.execute("insert or replace into file_hashes (file_path, mtime, size, sha256) values (?, ?, ?, ?);",
+                       cache_key + (file_hash,))
+    db_con.close()
+    _file_hash_cache[cache_key] = file_hash
+    return file_hash
+
+
+# ==============================================================================
+
+
+def get_fingerprint(ledger_file, input_files, settings):
+    # returns SHA-256 hash identifying the contents of a dictionary of input files (name -> path)
+    # and a dictionary of settings (name -> value)
+    fingerprint = {'files': {name: get_file_hash(ledger_file, path) for name, path in input_files.items()},
+                   'settings': settings}
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+# ==============================================================================
+
+
+def get_completed_runs(ledger_file, run_id, run_type, runs_folder):
+    # returns DataFrame of completed runs of run_type ('base' or 'disrupt') for run_id in runs_folder
+    # (e.g., 'aeq_runs' or 'aeq_runs_base_year'), sorted by run key
+    if not os.path.exists(ledger_file):
+        return pd.DataFrame(columns=['run_key', 'matrix_name', 'netskim'])
+    with connect(ledger_file) as db_con:
+        runs = pd.read_sql_query("""select run_key, matrix_name, netskim from runs
+                                 where run_id = ? and run_type = ? and status = 'complete' and run_key like ?
+                                 order by run_key;""", db_con,
+                                 params=(str(run_id), run_type, runs_folder + '/' + run_type + '/%'))
+    db_con.close()
+    return runs
+
+
+# ==============================================================================
+
+
+def read_netskim(netskim):
+    # parses the NetSkim.csv text stored in the ledger
+    return pd.read_csv(io.StringIO(netskim),
+                       converters={'Type': str, 'SP/RT': str, 'socio': str, 'projgroup': str, 'resil': str,
+                                   'elasticity': float, 'hazard': str, 'recovery': str, 'Scenario': str})
+
+
+# ==============================================================================
+
+
+def summarize_ledger(ledger_file, run_id):
+    # returns DataFrame with number of runs by type and status and DataFrame of total and mean phase durations
+    with connect(ledger_file) as db_con:
+        run_summary = pd.read_sql_query("""select run_type, status, count(*) as runs from runs where run_id = ?
+                                        group by run_type, status order by run_type, status;""", db_con,
+                                        params=(str(run_id),))
+        phase_summary = pd.read_sql_query("""select runs.run_type, phases.phase, count(*) as runs,
+                                          sum(phases.duration) as total_seconds, avg(phases.duration) as mean_seconds
+                                          from phases join runs on phases.run_key = runs.run_key
+                                          where runs.run_id = ? group by runs.run_type, phases.phase
+                                          order by runs.run_type, min(phases.start_time);""", db_con,
+                                          params=(str(run_id),))
+    db_con.close()
+    return run_summary, phase_summary
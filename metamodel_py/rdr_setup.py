@@ -5,6 +5,7 @@
 import sys
 import os
 import configparser
+import importlib.util
 import json
 import re
 import pandas as pd
@@ -221,6 +222,84 @@ def read_config_file(cfg_file, cfg_type='config'):
         else:
             cfg_dict['aeq_rgap_target'] = aeq_rgap_target
 
+    error_list, parallel_workers = read_config_file_helper(cfg, cfg_type, 'metamodel', 'parallel_workers', 'OPTIONAL', error_list)
+    # Set default to 1 (sequential AequilibraE runs) if this is not specified
+    cfg_dict['parallel_workers'] = 1
+    if parallel_workers is not None:
+        parallel_workers = int(parallel_workers)
+        if parallel_workers <= 0:
+            error_list.append(
+                "CONFIG FILE ERROR: {} is an invalid value for parallel_workers, should be an integer greater than zero".format(str(parallel_workers)))
+        else:
+            cfg_dict['parallel_workers'] = parallel_workers
+
+    error_list, run_folder_provisioning = read_config_file_helper(cfg, cfg_type, 'metamodel', 'run_folder_provisioning', 'OPTIONAL', error_list)
+    # Set default to copy if this is not specified
+    cfg_dict['run_folder_provisioning'] = 'copy'
+    if run_folder_provisioning is not None:
+        run_folder_provisioning = run_folder_provisioning.lower()
+        if run_folder_provisioning not in ['copy', 'link']:
+            error_list.append(
+                "CONFIG FILE ERROR: {} is an invalid value for run_folder_provisioning, should be 'copy' or 'link'".format(
+                    run_folder_provisioning))
+        else:
+            cfg_dict['run_folder_provisioning'] = run_folder_provisioning
+
+    error_list, aeq_graph_source = read_config_file_helper(cfg, cfg_type, 'metamodel', 'aeq_graph_source', 'OPTIONAL', error_list)
+    # Set default to database if this is not specified
+    cfg_dict['aeq_graph_source'] = 'database'
+    if aeq_graph_source is not None:
+        aeq_graph_source = aeq_graph_source.lower()
+        if aeq_graph_source not in ['database', 'dataframe']:
+            error_list.append(
+                "CONFIG FILE ERROR: {} is an invalid value for aeq_graph_source, should be 'database' or 'dataframe'".format(
+                    aeq_graph_source))
+        else:
+            cfg_dict['aeq_graph_source'] = aeq_graph_source
+
+    error_list, intermediate_format = read_config_file_helper(cfg, cfg_type, 'metamodel', 'intermediate_format', 'OPTIONAL', error_list)
+    # Set default to csv if this is not specified
+    cfg_dict['intermediate_format'] = 'csv'
+    if intermediate_format is not None:
+        intermediate_format = intermediate_format.lower()
+        if intermediate_format not in ['csv', 'parquet', 'feather']:
+            error_list.append(
+                "CONFIG FILE ERROR: {} is an invalid value for intermediate_format, should be 'csv', 'parquet', or 'feather'".format(
+                    intermediate_format))
+        else:
+            cfg_dict['intermediate_format'] = intermediate_format
+            # Parquet and Feather files are read and written by pandas with the pyarrow package
+            if intermediate_format != 'csv':
+                if importlib.util.find_spec('pyarrow') is None:
+                    error_list.append(
+                        "CONFIG FILE ERROR: intermediate_format {} requires the pyarrow package, which could not be found".format(
+                            intermediate_format))
+
+    error_list, save_debug_demand = read_config_file_helper(cfg, cfg_type, 'metamodel', 'save_debug_demand', 'OPTIONAL', error_list)
+    # Translate config parameter into T/F
+    # Set default to False if this is not specified
+    cfg_dict['save_debug_demand'] = False
+    if save_debug_demand is not None:
+        save_debug_demand = int(save_debug_demand)
+        if save_debug_demand not in [0, 1]:
+            error_list.append(
+                "CONFIG FILE ERROR: {} is an invalid value for save_debug_demand, should be 1 or 0".format(str(save_debug_demand)))
+        else:
+            if save_debug_demand == 1:
+                cfg_dict['save_debug_demand'] = True
+
+    error_list, gis_output = read_config_file_helper(cfg, cfg_type, 'metamodel', 'gis_output', 'OPTIONAL', error_list)
+    # Set default to per_run if this is not specified
+    cfg_dict['gis_output'] = 'per_run'
+    if gis_output is not None:
+        gis_output = gis_output.lower()
+        if gis_output not in ['per_run', 'shared']:
+            error_list.append(
+                "CONFIG FILE ERROR: {} is an invalid value for gis_output, should be 'per_run' or 'shared'".format(
+                    gis_output))
+        else:
+            cfg_dict['gis_output'] = gis_output
+
     # ===================
     # DISRUPTION VALUES
     # ===================
@@ -9,12 +9,65 @@
 #
 # ---------------------------------------------------------------------------------------------------
 import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
 import logging
+import logging.handlers
 import datetime
 import glob
+import rdr_RunLedger
 
 from Run_RDR import VERSION_NUMBER
 
+# file extension of the intermediate tables of AequilibraE runs for each intermediate_format setting
+INTERMEDIATE_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+
+# static input tables parsed in this process, keyed by (file path, modification time, file type, columns, types)
+_static_table_cache = {}
+
+# column types of the GMNS and RDR input CSV files read by read_typed_csv, keyed by file type
+# 'str' columns keep the text of each cell ('' for empty cells), 'float' columns are NaN for empty cells, and 'int'
+# columns may not have empty cells; columns not listed (e.g., the exposure field) are typed by the caller or by pandas
+CSV_SCHEMAS = {'link': {'link_id': 'str', 'from_node_id': 'str', 'to_node_id': 'str', 'directed': 'int',
+                        'length': 'float', 'facility_type': 'str', 'capacity': 'float', 'free_speed': 'float',
+                        'lanes': 'int', 'allowed_uses': 'str', 'toll': 'float', 'travel_time': 'float',
+                        'toll_nocar': 'float', 'travel_time_nocar': 'float'},
+               'node': {'node_id': 'str', 'x_coord': 'float', 'y_coord': 'float', 'node_type': 'str'},
+               'exposure': {'link_id': 'str', 'from_node_id': 'str', 'to_node_id': 'str'},
+               'project_table': {'Project ID': 'str', 'link_id': 'str', 'Category': 'str',
+                                 'Exposure Reduction': 'float'},
+               'true_shape': {'link_id': 'str', 'WKT': 'str'},
+               'link_types': {'facility_type': 'str', 'alpha': 'float', 'beta': 'float'}}
+
+# error prefix of each file type, as reported by the input validation helper tool
+CSV_FILE_ERRORS = {'link': 'NETWORK LINK FILE ERROR', 'node': 'NETWORK NODE FILE ERROR',
+                   'exposure': 'EXPOSURE ANALYSIS FILE ERROR', 'project_table': 'RESILIENCE PROJECTS FILE ERROR',
+                   'true_shape': 'TRUE SHAPE FILE ERROR', 'link_types': 'LINK TYPES FILE ERROR'}
+CSV_DTYPES = {'str': str, 'float': 'float64', 'int': 'int64'}
+# cells read as missing values in float and int columns, the default missing value strings of pd.read_csv
+CSV_NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>',
+                 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+# column types of the sheets of Model_Parameters.xlsx read by read_model_params, keyed by sheet name
+# the sheets and columns are required, as checked by the input validation helper tool
+MODEL_PARAMS_SCHEMAS = {'EconomicScenarios': {'Economic Scenarios': 'str'},
+                        'Elasticities': {'Trip Loss Elasticities': 'float'},
+                        'ProjectGroups': {'Project Groups': 'str', 'Project ID': 'str'},
+                        'Hazards': {'Hazard Event': 'str', 'Filename': 'str', 'HazardDim1': 'int', 'HazardDim2': 'int',
+                                    'Event Probability in Start Year': 'float'},
+                        'RecoveryStages': {'Recovery Stages': 'str'},
+                        'FrequencyFactors': {'Event Frequency Factors': 'float'}}
+MODEL_PARAMS_DTYPES = {'str': object, 'float': 'float64', 'int': 'int64'}
+
+# compiled snapshot of the typed sheets of Model_Parameters.xlsx, saved as JSON next to the workbook
+MODEL_PARAMS_SNAPSHOT_EXT = '.snapshot.json'
+MODEL_PARAMS_SNAPSHOT_VERSION = 2
+
+# Model_Parameters.xlsx snapshots loaded in this process, keyed by workbook file path
+_model_params_cache = {}
+
 
 # ==============================================================================
 
@@ -83,6 +136,341 @@ def log_subprocess_error(pipe, logger):
 # ==================================================================
 
 
+# returns the file extension of the intermediate tables of AequilibraE runs (network links tables, link availability
+# tables, and link flows) set by the intermediate_format parameter
+def get_table_ext(cfg):
+    return INTERMEDIATE_EXTENSIONS[cfg['intermediate_format']]
+
+
+# ==================================================================
+
+
+# writes an intermediate table in the format given by the extension of file_path
+# Parquet and Feather files keep the column types and are read back without parsing;
+# index = True writes the index (e.g., link_id of AequilibraE link flows) as a column
+def write_table(df, file_path, index=False, columns=None):
+    ext = os.path.splitext(file_path)[1]
+    if ext in ['.parquet', '.feather']:
+        if columns is not None:
+            df = df[columns]
+        if index:
+            df = df.reset_index()
+        if ext == '.parquet':
+            df.to_parquet(file_path, index=False)
+        else:
+            df.reset_index(drop=True).to_feather(file_path)
+    else:
+        with open(file_path, "w", newline='') as f:
+            df.to_csv(f, index=index, columns=columns)
+
+
+# ==================================================================
+
+
+# reads an intermediate table written by write_table, selecting usecols if given
+# converters are passed to pd.read_csv for CSV files; Parquet and Feather files are already typed,
+# so converters only align column types (str, int, float), with missing strings read as '' as in pd.read_csv
+def read_table(file_path, usecols=None, converters=None):
+    ext = os.path.splitext(file_path)[1]
+    if ext not in ['.parquet', '.feather']:
+        return pd.read_csv(file_path, usecols=usecols, converters=converters)
+
+    if ext == '.parquet':
+        df = pd.read_parquet(file_path, columns=usecols)
+    else:
+        df = pd.read_feather(file_path, columns=usecols)
+    if converters is not None:
+        for column, converter in converters.items():
+            if column not in df.columns:
+                continue
+            if converter is str:
+                df[column] = df[column].astype(str).where(df[column].notna(), '')
+            elif converter in [int, float]:
+                df[column] = df[column].astype(converter)
+    return df
+
+
+# ==================================================================
+
+
+# reads input CSV file file_path of file_type (a key of CSV_SCHEMAS) with the column types of its schema, updated
+# by dtypes (e.g., {cfg['exposure_field']: 'float'}), parsed by the pandas C engine without per-cell converters
+# raises an exception naming the file and column if a required column is missing or cannot be converted
+def read_typed_csv(file_path, file_type, logger, usecols=None, dtypes=None):
+    schema = dict(CSV_SCHEMAS[file_type])
+    if dtypes is not None:
+        schema.update(dtypes)
+    error_label = CSV_FILE_ERRORS[file_type]
+
+    header = list(pd.read_csv(file_path, nrows=0).columns)
+    if usecols is not None:
+        missing_columns = [column for column in usecols if column not in header]
+        if missing_columns:
+            logger.error("{}: {} is missing required columns {}".format(error_label, file_path, missing_columns))
+            raise Exception("{}: {} is missing required columns {}".format(error_label, file_path, missing_columns))
+    columns = header if usecols is None else [column for column in header if column in usecols]
+
+    # text columns are not checked for missing values, so empty cells are read as ''
+    # round_trip float precision parses numbers to the same values as float()
+    dtype = {column: CSV_DTYPES[schema[column]] for column in columns if column in schema}
+    na_values = {column: CSV_NA_VALUES for column in columns if schema.get(column) != 'str'}
+    try:
+        df = pd.read_csv(file_path, usecols=usecols, dtype=dtype, keep_default_na=False, na_values=na_values,
+                         float_precision='round_trip')
+    except ValueError:
+        # find the first column that cannot be converted to its type
+        df = pd.read_csv(file_path, usecols=usecols, dtype=str, keep_default_na=False)
+        for column in columns:
+            if schema.get(column) not in ['float', 'int']:
+                continue
+            values = pd.to_numeric(df[column].where(~df[column].isin(CSV_NA_VALUES)), errors='coerce')
+            invalid = values.isna() & ~df[column].isin(CSV_NA_VALUES)
+            if schema[column] == 'int':
+                invalid = values.isna() | (values != values.round())
+            if invalid.any():
+                logger.error("{}: Column {} could not be converted to {} in {}, first invalid value {!r} on row {}".format(
+                    error_label, column, schema[column], file_path, df.loc[invalid, column].iloc[0],
+                    invalid.values.argmax() + 2))
+                raise Exception("{}: Column {} could not be converted to {} in {}".format(error_label, column,
+                                                                                          schema[column], file_path))
+        raise
+
+    return df
+
+
+# ==================================================================
+
+
+# reads an input CSV file that does not change during a task (e.g., network, TrueShape, project, exposure, and link
+# types tables) with read_typed_csv
+# each table is parsed once per process for a given file, file type, columns, and types, and re-read if the file is
+# modified; callers get a copy of the parsed table, so they may modify it without affecting later calls
+def read_static_table(file_path, file_type, logger, usecols=None, dtypes=None):
+    file_path = os.path.abspath(file_path)
+    cache_key = (file_path, os.path.getmtime(file_path), file_type,
+                 tuple(usecols) if usecols is not None else None,
+                 tuple(sorted(dtypes.items())) if dtypes is not None else None)
+
+    if cache_key not in _static_table_cache:
+        # drop tables parsed from a previous version of the file
+        for key in [key for key in _static_table_cache if key[0] == file_path and key[1] != cache_key[1]]:
+            del _static_table_cache[key]
+        _static_table_cache[cache_key] = read_typed_csv(file_path, file_type, logger, usecols=usecols, dtypes=dtypes)
+
+    return _static_table_cache[cache_key].copy()
+
+
+# ==================================================================
+
+
+# reads sheet_name of Model_Parameters.xlsx file model_params_file with the column types of MODEL_PARAMS_SCHEMAS,
+# returning the columns usecols (all columns of the schema if None)
+# the sheets are read from a snapshot compiled once from the workbook instead of being parsed by openpyxl each time
+def read_model_params(model_params_file, sheet_name, logger, usecols=None):
+    sheets = get_model_params_snapshot(model_params_file, logger)
+    if sheet_name not in sheets:
+        logger.error("MODEL PARAMETERS FILE ERROR: {} is not a sheet of the model parameters snapshot".format(sheet_name))
+        raise Exception("MODEL PARAMETERS FILE ERROR: {} is not a sheet of the model parameters snapshot".format(sheet_name))
+
+    schema = MODEL_PARAMS_SCHEMAS[sheet_name]
+    columns = list(schema) if usecols is None else usecols
+    missing_columns = [column for column in columns if column not in schema]
+    if missing_columns:
+        logger.error("MODEL PARAMETERS FILE ERROR: {} tab has no columns {}".format(sheet_name, missing_columns))
+        raise Exception("MODEL PARAMETERS FILE ERROR: {} tab has no columns {}".format(sheet_name, missing_columns))
+
+    data = sheets[sheet_name]
+    model_params = pd.DataFrame({column: pd.Series(data[column], dtype=MODEL_PARAMS_DTYPES[schema[column]])
+                                 for column in columns}, columns=columns)
+    # empty cells of str columns are NaN, as read by pd.read_excel with str converters
+    return model_params.where(model_params.notna(), np.nan)
+
+
+# ==================================================================
+
+
+# returns the typed columns of the sheets of model_params_file as {sheet name: {column: list of values}}
+# the snapshot file is valid while the size and modification time of the workbook are unchanged, or if the workbook
+# contents have the same hash (e.g., file copied or checked out again); otherwise the workbook is compiled again
+def get_model_params_snapshot(model_params_file, logger):
+    model_params_file = os.path.abspath(model_params_file)
+    file_stat = os.stat(model_params_file)
+    file_key = (file_stat.st_size, file_stat.st_mtime)
+
+    if model_params_file in _model_params_cache and _model_params_cache[model_params_file][0] == file_key:
+        return _model_params_cache[model_params_file][1]
+
+    snapshot_file = os.path.splitext(model_params_file)[0] + MODEL_PARAMS_SNAPSHOT_EXT
+    snapshot = None
+    file_hash = None
+    if os.path.exists(snapshot_file):
+        try:
+            with open(snapshot_file, 'r') as f:
+                snapshot = json.load(f)
+        except ValueError:
+            logger.warning("Model parameters snapshot {} could not be read, compiling it again".format(snapshot_file))
+            snapshot = None
+        # a snapshot of another version or schema is compiled again
+        if snapshot is not None and (not isinstance(snapshot, dict) or
+                                     snapshot.get('version') != MODEL_PARAMS_SNAPSHOT_VERSION or
+                                     snapshot.get('schemas') != MODEL_PARAMS_SCHEMAS):
+            snapshot = None
+        if snapshot is not None and [snapshot['size'], snapshot['mtime']] != list(file_key):
+            file_hash = get_file_hash(model_params_file)
+            if snapshot['hash'] != file_hash:
+                snapshot = None
+            else:
+                snapshot['size'], snapshot['mtime'] = file_key
+                save_model_params_snapshot(snapshot, snapshot_file, logger)
+
+    if snapshot is None:
+        logger.debug("compiling model parameters snapshot {}".format(snapshot_file))
+        snapshot = {'version': MODEL_PARAMS_SNAPSHOT_VERSION,
+                    'schemas': MODEL_PARAMS_SCHEMAS,
+                    'size': file_key[0],
+                    'mtime': file_key[1],
+                    'hash': file_hash if file_hash is not None else get_file_hash(model_params_file),
+                    'sheets': compile_model_params(model_params_file, logger)}
+        save_model_params_snapshot(snapshot, snapshot_file, logger)
+
+    _model_params_cache[model_params_file] = (file_key, snapshot['sheets'])
+    return snapshot['sheets']
+
+
+# ==================================================================
+
+
+# reads the sheets of MODEL_PARAMS_SCHEMAS from model_params_file, converting each column to its type
+# cell values are read as by pd.read_excel, so text such as 'NA' is an empty cell; rows with no values in the columns
+# of the schema (e.g., formatted blank rows) are dropped; empty cells of a float or str column are None
+# raises an exception naming the sheet, column, and row if a sheet or column is missing or a value cannot be converted
+def compile_model_params(model_params_file, logger):
+    try:
+        workbook = pd.read_excel(model_params_file, sheet_name=list(MODEL_PARAMS_SCHEMAS), dtype=object)
+    except ValueError as e:
+        logger.error("MODEL PARAMETERS FILE ERROR: {} could not be read: {}".format(model_params_file, e))
+        raise Exception("MODEL PARAMETERS FILE ERROR: {} could not be read: {}".format(model_params_file, e))
+
+    sheets = {}
+    for sheet_name, schema in MODEL_PARAMS_SCHEMAS.items():
+        sheet = workbook[sheet_name]
+        missing_columns = [column for column in schema if column not in sheet.columns]
+        if missing_columns:
+            logger.error("MODEL PARAMETERS FILE ERROR: {} tab of {} is missing required columns {}".format(
+                sheet_name, model_params_file, missing_columns))
+            raise Exception("MODEL PARAMETERS FILE ERROR: {} tab of {} is missing required columns {}".format(
+                sheet_name, model_params_file, missing_columns))
+        sheet = sheet.loc[sheet[list(schema)].notna().any(axis=1), list(schema)]
+
+        sheets[sheet_name] = {}
+        for column, column_type in schema.items():
+            values = []
+            for row, value in zip(sheet.index, sheet[column]):
+                try:
+                    values.append(convert_model_param(value, column_type))
+                except ValueError:
+                    # row number as shown in Excel, below the header row
+                    logger.error("MODEL PARAMETERS FILE ERROR: {} column of {} tab could not be converted to {}, value {!r} on row {}".format(
+                        column, sheet_name, column_type, value, row + 2))
+                    raise Exception("MODEL PARAMETERS FILE ERROR: {} column of {} tab could not be converted to {}, value {!r} on row {}".format(
+                        column, sheet_name, column_type, value, row + 2))
+            sheets[sheet_name][column] = values
+
+    return sheets
+
+
+# ==================================================================
+
+
+# returns cell value of a model parameters sheet converted to column_type ('str', 'float', or 'int'), None if empty
+# raises ValueError if value cannot be converted, or is empty or not a whole number for an 'int' column
+def convert_model_param(value, column_type):
+    if pd.isna(value):
+        if column_type == 'int':
+            raise ValueError("empty cell")
+        return None
+    if column_type == 'str':
+        return str(value)
+    value = float(value)
+    if not np.isfinite(value):
+        raise ValueError("not a finite number")
+    if column_type == 'float':
+        return value
+    if not value.is_integer():
+        raise ValueError("not a whole number")
+    return int(value)
+
+
+# ==================================================================
+
+
+# saves snapshot to snapshot_file as JSON; several processes may save the same snapshot at the same time, so the file
+# is written under a temporary name and moved in place
+# the snapshot is an optimization, so failing to save it (e.g., read-only input folder) is only logged
+def save_model_params_snapshot(snapshot, snapshot_file, logger):
+    temp_file = snapshot_file + '.' + str(os.getpid()) + '.tmp'
+    try:
+        with open(temp_file, 'w') as f:
+            json.dump(snapshot, f, allow_nan=False)
+        os.replace(temp_file, snapshot_file)
+    except OSError as e:
+        logger.warning("Model parameters snapshot {} could not be saved: {}".format(snapshot_file, e))
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+# ==================================================================
+
+
+def get_file_hash(file_path):
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# ==================================================================
+
+
+# acquires an exclusive lock on lock_file, waiting if another process holds it
+# the operating system releases the lock if the holding process exits, so an aborted run never leaves a stale lock
+# returns the open lock file, which must be passed to release_file_lock
+def acquire_file_lock(lock_file, logger):
+    os.makedirs(os.path.dirname(lock_file), exist_ok=True)
+    f = open(lock_file, 'a+')
+    logger.debug("waiting for lock on {}".format(lock_file))
+    if os.name == 'nt':
+        import msvcrt
+        while True:
+            try:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                # LK_LOCK gives up after 10 attempts one second apart, keep waiting
+                continue
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    logger.debug("acquired lock on {}".format(lock_file))
+    return f
+
+
+# ==================================================================
+
+
+def release_file_lock(f):
+    if os.name == 'nt':
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    f.close()
+
+
+# ==================================================================
+
+
 # Taken from FTOT project, ftot_supporting.py
 def get_total_runtime_string(start_time):
     end_time = datetime.datetime.now()
@@ -128,25 +516,10 @@ def create_loggers(dirLocation, task, cfg):
     # DEBUG          10
     # DETAILED_DEBUG  5
 
-    logging.RESULT = 25
-    logging.addLevelName(logging.RESULT, 'RESULT')
-
-    logging.CONFIG = 19
-    logging.addLevelName(logging.CONFIG, 'CONFIG')
-
-    logging.RUNTIME = 11
-    logging.addLevelName(logging.RUNTIME, 'RUNTIME')
-
-    logging.DETAILED_DEBUG = 5
-    logging.addLevelName(logging.DETAILED_DEBUG, 'DETAILED_DEBUG')
-
     logger = logging.getLogger('log')
     logger.setLevel(logging.DEBUG)
 
-    logger.result = lambda msg, *args: logger._log(logging.RESULT, msg, args)
-    logger.config = lambda msg, *args: logger._log(logging.CONFIG, msg, args)
-    logger.runtime = lambda msg, *args: logger._log(logging.RUNTIME, msg, args)
-    logger.detailed_debug = lambda msg, *args: logger._log(logging.DETAILED_DEBUG, msg, args)
+    add_logging_levels(logger)
 
     # FILE LOG
     # ------------------------------------------------------------------------------
@@ -180,6 +553,50 @@ def create_loggers(dirLocation, task, cfg):
 # ==================================================================
 
 
+def add_logging_levels(logger):
+    """Register the custom RDR logging levels and attach the convenience methods to the logger"""
+
+    logging.RESULT = 25
+    logging.addLevelName(logging.RESULT, 'RESULT')
+
+    logging.CONFIG = 19
+    logging.addLevelName(logging.CONFIG, 'CONFIG')
+
+    logging.RUNTIME = 11
+    logging.addLevelName(logging.RUNTIME, 'RUNTIME')
+
+    logging.DETAILED_DEBUG = 5
+    logging.addLevelName(logging.DETAILED_DEBUG, 'DETAILED_DEBUG')
+
+    logger.result = lambda msg, *args: logger._log(logging.RESULT, msg, args)
+    logger.config = lambda msg, *args: logger._log(logging.CONFIG, msg, args)
+    logger.runtime = lambda msg, *args: logger._log(logging.RUNTIME, msg, args)
+    logger.detailed_debug = lambda msg, *args: logger._log(logging.DETAILED_DEBUG, msg, args)
+
+
+# ==================================================================
+
+
+def create_worker_logger(log_queue):
+    """Create the logger for a worker process, forwarding all records to the parent process through log_queue"""
+
+    logger = logging.getLogger('log')
+    logger.setLevel(logging.DEBUG)
+
+    # handlers inherited from the parent process (e.g., when processes are forked) would write to the same
+    # log file concurrently, so records are only passed to the queue and written out by the parent
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    add_logging_levels(logger)
+
+    return logger
+
+
+# ==================================================================
+
+
 def generate_reports(dirLocation, cfg, logger):
     logger.info("start: parse log operation for reports")
     report_directory = os.path.join(dirLocation, "Reports")
@@ -305,6 +722,19 @@ def generate_reports(dirLocation, cfg, logger):
         for x in message_dict['CONFIG']:
             wf.write('{}\t:\t{}\n'.format(x[0], x[1]))
 
+        # summary of AequilibraE runs and phase durations from run ledger written by aeq_run task
+        ledger_file = rdr_RunLedger.get_ledger_file(dirLocation)
+        if os.path.exists(ledger_file):
+            run_summary, phase_summary = rdr_RunLedger.summarize_ledger(ledger_file, cfg['run_id'])
+            wf.write('\nAEQUILIBRAE RUNS\n')
+            wf.write('---------------------------------------------------------------------\n')
+            for index, row in run_summary.iterrows():
+                wf.write('{} runs {}\t:\t{}\n'.format(row['run_type'], row['status'], row['runs']))
+            for index, row in phase_summary.iterrows():
+                wf.write('{} runs {} phase\t:\t{} runs, {} total (HMS), {:.1f} seconds per run\n'.format(
+                    row['run_type'], row['phase'], row['runs'],
+                    str(datetime.timedelta(seconds=int(row['total_seconds']))), row['mean_seconds']))
+
         if len(message_dict['ERROR']) > 0:
             wf.write('\nERROR\n')
             wf.write('---------------------------------------------------------------------\n')
@@ -0,0 +1,98 @@
+# Tests of the interval bin lookup of rdr_BinLookup against the row-by-row np.where loop it replaced in
+# calc_link_availability (manual and facility_type_manual link availability approaches)
+# Local test:
+#   conda activate RDRenv
+#   cd C:/GitHub/RDR
+#   pytest
+# or to run just this file
+#   python -m pytest metamodel_py/tests/bin_lookup_test.py -v
+# use pytest flag -rP for extra summary info for passed tests, -rx for failed tests
+
+import os
+import numpy as np
+
+
+def loop_bin_values(values, min_values, max_values, bin_values, keys=None, bin_keys=None):
+    # each bin row in turn overwrites the values in [minimum, maximum) (and with the bin key), so later rows take
+    # precedence; values in no bin are NaN
+    result = np.full(values.shape[0], np.nan)
+    for i in range(min_values.shape[0]):
+        in_bin = (values >= min_values[i]) & (values < max_values[i])
+        if bin_keys is not None:
+            in_bin = in_bin & (keys == bin_keys[i])
+        result = np.where(in_bin, bin_values[i], result)
+    return result
+
+
+def random_bins(rng, num_bins):
+    # edges on a coarse grid so that bins overlap, share edges, and are sometimes empty
+    min_values = rng.integers(0, 20, num_bins) / 2.0
+    max_values = min_values + rng.integers(0, 8, num_bins) / 2.0
+    bin_values = rng.random(num_bins).round(3)
+    return min_values, max_values, bin_values
+
+
+def random_values(rng, num_values):
+    # values on the same grid as the edges (to test min-inclusive and max-exclusive bounds) and off the grid,
+    # outside all bins, and NaN
+    values = np.concatenate([rng.integers(-2, 30, num_values) / 2.0,
+                             rng.uniform(-1.0, 15.0, num_values),
+                             [np.nan, np.nan]])
+    rng.shuffle(values)
+    return values
+
+
+def test_bin_lookup_parity():
+    import rdr_BinLookup
+    rng = np.random.default_rng(8888)
+    for trial in range(200):
+        min_values, max_values, bin_values = random_bins(rng, int(rng.integers(1, 12)))
+        values = random_values(rng, 100)
+
+        bin_lookup = rdr_BinLookup.make_bin_lookup(min_values, max_values, bin_values)
+        result = rdr_BinLookup.lookup_bin_values(bin_lookup, values)
+        expected = loop_bin_values(values, min_values, max_values, bin_values)
+        np.testing.assert_array_equal(result, expected)
+
+
+def test_keyed_bin_lookup_parity():
+    import rdr_BinLookup
+    rng = np.random.default_rng(8888)
+    for trial in range(200):
+        num_bins = int(rng.integers(1, 16))
+        min_values, max_values, bin_values = random_bins(rng, num_bins)
+        bin_keys = rng.choice(['1', '2', '3'], num_bins).astype(object)
+        values = random_values(rng, 100)
+        # key '4' is not in the bins table
+        keys = rng.choice(['1', '2', '3', '4'], values.shape[0]).astype(object)
+
+        bin_lookup = rdr_BinLookup.make_bin_lookup(min_values, max_values, bin_values, keys=bin_keys)
+        result = rdr_BinLookup.lookup_bin_values(bin_lookup, values, keys=keys)
+        expected = loop_bin_values(values, min_values, max_values, bin_values, keys, bin_keys)
+        np.testing.assert_array_equal(result, expected)
+
+
+def test_bin_lookup_default():
+    import rdr_BinLookup
+    bin_lookup = rdr_BinLookup.make_bin_lookup([0.0, 1.0], [1.0, 2.0], [0.5, 0.25], keys=['1', '1'])
+    values = np.array([0.0, 1.0, 2.0, np.nan, 0.5])
+    keys = np.array(['1', '1', '1', '1', '2'], dtype=object)
+    # calc_link_availability treats values in no bin as fully available
+    result = rdr_BinLookup.lookup_bin_values(bin_lookup, values, keys=keys, default=1.0)
+    np.testing.assert_array_equal(result, [0.5, 0.25, 1.0, 1.0, 1.0])
+
+
+def test_read_bin_lookup(tmp_path):
+    import rdr_BinLookup
+    bins_file = os.path.join(str(tmp_path), 'exposure_grid_facility_type_manual.csv')
+    with open(bins_file, 'w') as wf:
+        wf.write('facility_type,min,max,link_availability\n')
+        wf.write('1,0,0.5,0.75\n')
+        wf.write('1,0.25,1,0\n')
+        wf.write('2,0,1,0.5\n')
+
+    bin_lookup = rdr_BinLookup.read_bin_lookup(bins_file, keyed=True)
+    values = np.array([0.1, 0.3, 0.3, 1.0])
+    keys = np.array(['1', '1', '2', '2'], dtype=object)
+    result = rdr_BinLookup.lookup_bin_values(bin_lookup, values, keys=keys)
+    np.testing.assert_array_equal(result, [0.75, 0.0, 0.5, np.nan])
@@ -43,5 +43,11 @@ def test_conf():
     assert os.path.isdir(input_folder)
     assert os.path.isdir(output_folder)
     assert seed == '8888'
+    assert cfg['parallel_workers'] == 1
+    assert cfg['run_folder_provisioning'] == 'copy'
+    assert cfg['aeq_graph_source'] == 'database'
+    assert cfg['intermediate_format'] == 'csv'
+    assert cfg['save_debug_demand'] is False
+    assert cfg['gis_output'] == 'per_run'
 
     teardown_readconfig(output_folder)
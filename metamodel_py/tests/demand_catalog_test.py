@@ -0,0 +1,95 @@
+# Tests of the demand catalog of the demand OMX files of an input folder (rdr_DemandCatalog) and of its exclusion
+# from run folders set up by 'copy' provisioning (rdr_AESingleRun.setup_run_folder)
+# Local test:
+#   conda activate RDRenv
+#   cd C:/GitHub/RDR
+#   pytest
+# or to run just this file
+#   python -m pytest metamodel_py/tests/demand_catalog_test.py -v
+# use pytest flag -rP for extra summary info for passed tests, -rx for failed tests
+
+import os
+import json
+import logging
+import numpy as np
+import openmatrix as omx
+import pytest
+
+logger = logging.getLogger('demand_catalog_test')
+
+
+def write_demand_omx(input_folder, socio, matrices):
+    demand_folder = os.path.join(input_folder, 'AEMaster', 'matrices')
+    os.makedirs(demand_folder, exist_ok=True)
+    demand_file = os.path.join(demand_folder, socio + '_demand_summed.omx')
+    f = omx.open_file(demand_file, 'w')
+    f.create_mapping('taz', [1, 5, 9])
+    for matrix_name, matrix in matrices.items():
+        f[matrix_name] = matrix
+    f.close()
+    return demand_file
+
+
+def test_demand_info(tmp_path):
+    import rdr_DemandCatalog
+    input_folder = str(tmp_path)
+    demand_file = write_demand_omx(input_folder, 'base', {'matrix': np.arange(9.0).reshape(3, 3)})
+
+    demand_info = rdr_DemandCatalog.get_demand_info('base', input_folder, logger)
+    assert demand_info['shape'] == [3, 3]
+    assert demand_info['mappings'] == ['taz']
+    assert demand_info['matrices'] == {'matrix': {'shape': [3, 3], 'total': 36.0}}
+    assert not rdr_DemandCatalog.has_nocar_matrix('base', input_folder, logger)
+    assert rdr_DemandCatalog.get_demand_info('other', input_folder, logger) is None
+
+    # the entry is written to the catalog file next to the OMX file
+    catalog_file = os.path.join(rdr_DemandCatalog.get_demand_folder(input_folder),
+                                rdr_DemandCatalog.DEMAND_CATALOG_FILE)
+    with open(catalog_file, 'r') as rf:
+        catalog = json.load(rf)
+    assert catalog['base']['matrices'] == demand_info['matrices']
+    assert catalog['base']['file_stamp'] == [os.path.getsize(demand_file), os.path.getmtime(demand_file)]
+
+    # the entry is rebuilt when the OMX file changes
+    write_demand_omx(input_folder, 'base', {'matrix': np.ones((3, 3)), 'nocar': np.ones((3, 3))})
+    os.utime(demand_file, (0, catalog['base']['file_stamp'][1] + 10))
+    assert rdr_DemandCatalog.has_nocar_matrix('base', input_folder, logger)
+    assert rdr_DemandCatalog.get_demand_info('base', input_folder, logger)['matrices']['matrix']['total'] == 9.0
+
+    # a demand OMX file that does not exist is an error for the 'nocar' check
+    with pytest.raises(Exception, match='DEMAND OMX FILE ERROR'):
+        rdr_DemandCatalog.has_nocar_matrix('other', input_folder, logger)
+
+
+def test_unreadable_demand_catalog(tmp_path):
+    import rdr_DemandCatalog
+    input_folder = str(tmp_path)
+    write_demand_omx(input_folder, 'base', {'matrix': np.ones((3, 3)), 'nocar': np.ones((3, 3))})
+    catalog_file = os.path.join(rdr_DemandCatalog.get_demand_folder(input_folder),
+                                rdr_DemandCatalog.DEMAND_CATALOG_FILE)
+    with open(catalog_file, 'w') as wf:
+        wf.write('{"base": ')
+
+    # a catalog that cannot be read (e.g., a truncated file) is rebuilt
+    assert rdr_DemandCatalog.has_nocar_matrix('base', input_folder, logger)
+    with open(catalog_file, 'r') as rf:
+        assert 'nocar' in json.load(rf)['base']['matrices']
+
+
+def test_copy_run_folder_skips_demand_catalog(tmp_path):
+    import rdr_DemandCatalog
+    import rdr_AESingleRun
+    input_folder = os.path.join(str(tmp_path), 'inputs')
+    write_demand_omx(input_folder, 'base', {'matrix': np.ones((3, 3))})
+    write_demand_omx(input_folder, 'future', {'matrix': np.ones((3, 3))})
+    rdr_DemandCatalog.get_demand_info('base', input_folder, logger)
+    with open(os.path.join(input_folder, 'AEMaster', 'parameters.yml'), 'w') as wf:
+        wf.write('parameters\n')
+
+    run_folder = os.path.join(str(tmp_path), 'run')
+    cfg = {'run_folder_provisioning': 'copy'}
+    rdr_AESingleRun.setup_run_folder({'socio': 'base'}, input_folder, run_folder, cfg, logger)
+
+    # the run gets the demand OMX file of its socio, but not the catalog of the input folder or its lock file
+    assert os.path.exists(os.path.join(run_folder, 'parameters.yml'))
+    assert sorted(os.listdir(os.path.join(run_folder, 'matrices'))) == ['base_demand_summed.omx']
@@ -0,0 +1,59 @@
+# Tests of the demand matrix built from a demand CSV file (rdr_AESingleRun.create_matrix), with orig_node and dest_node
+# given as centroid node ids or as zero-based matrix positions, read in several chunks of rows
+# Local test:
+#   conda activate RDRenv
+#   cd C:/GitHub/RDR
+#   pytest
+# or to run just this file
+#   python -m pytest metamodel_py/tests/demand_matrix_test.py -v
+# use pytest flag -rP for extra summary info for passed tests, -rx for failed tests
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+import pytest
+
+logger = logging.getLogger('demand_matrix_test')
+
+taz_list = [1, 2, 5]
+
+
+def create_matrix(folder, trips, monkeypatch):
+    import rdr_AESingleRun
+    # two rows per chunk, so that the layout is not decided from the first chunk only
+    monkeypatch.setattr(rdr_AESingleRun, 'DEMAND_CSV_CHUNK_SIZE', 2)
+    trip_csv_file = os.path.join(folder, 'base_trips.csv')
+    pd.DataFrame(trips, columns=['orig_node', 'dest_node', 'trips']).to_csv(trip_csv_file, index=False)
+    f_output = {}
+    rdr_AESingleRun.create_matrix(folder, 'base', trip_csv_file, 'matrix', f_output, taz_list,
+                                  {'save_debug_demand': True}, logger)
+    debug_demand = pd.read_csv(os.path.join(folder, 'base_debug_demand.csv'), index_col='orig_node')
+    return f_output['matrix'], debug_demand
+
+
+def test_demand_by_centroid(tmp_path, monkeypatch):
+    # trips of duplicate O-D pairs are summed
+    matrix, debug_demand = create_matrix(str(tmp_path), [(1, 2, 10.0), (5, 1, 4.0), (2, 5, 3.0), (1, 2, 1.5),
+                                                         (5, 5, 2.0)], monkeypatch)
+    np.testing.assert_array_equal(matrix, [[0.0, 11.5, 0.0], [0.0, 0.0, 3.0], [4.0, 0.0, 2.0]])
+    assert debug_demand.index.tolist() == taz_list
+
+
+def test_demand_by_position(tmp_path, monkeypatch):
+    # the first two chunks only have positions that are also centroid ids, and position 0 is in the last chunk
+    matrix, debug_demand = create_matrix(str(tmp_path), [(1, 2, 10.0), (2, 1, 4.0), (2, 2, 3.0), (1, 1, 1.5),
+                                                         (0, 2, 2.0)], monkeypatch)
+    np.testing.assert_array_equal(matrix, [[0.0, 0.0, 2.0], [0.0, 1.5, 10.0], [0.0, 4.0, 3.0]])
+    assert debug_demand.index.tolist() == [0, 1, 2]
+
+    # orig_node is never position 0, and only the dest_node of the last row is
+    matrix, debug_demand = create_matrix(str(tmp_path), [(1, 1, 1.0), (2, 1, 2.0), (1, 1, 3.0), (2, 2, 4.0),
+                                                         (1, 2, 5.0), (2, 1, 6.0), (2, 0, 7.0)], monkeypatch)
+    np.testing.assert_array_equal(matrix, [[0.0, 0.0, 0.0], [0.0, 4.0, 5.0], [7.0, 8.0, 4.0]])
+
+
+def test_demand_outside_matrix(tmp_path, monkeypatch):
+    # a node that is neither a centroid nor a matrix position
+    with pytest.raises(Exception, match='DEMAND FILE ERROR'):
+        create_matrix(str(tmp_path), [(1, 2, 10.0), (5, 1, 4.0), (5, 7, 3.0)], monkeypatch)
@@ -0,0 +1,107 @@
+# Tests of the link-keyed joins of rdr_LinkIndex (take_link_values and scatter_link_values) against the pandas
+# merges on link_id they replaced in rdr_AESingleRun
+# Local test:
+#   conda activate RDRenv
+#   cd C:/GitHub/RDR
+#   pytest
+# or to run just this file
+#   python -m pytest metamodel_py/tests/link_index_test.py -v
+# use pytest flag -rP for extra summary info for passed tests, -rx for failed tests
+
+import numpy as np
+import pandas as pd
+
+# network links; link ids are strings, as read by rdr_supporting.read_static_table
+network_links = pd.DataFrame({'link_id': ['101', '102', '103', '104', '105']})
+
+
+def merge_link_values(links, table, column):
+    # left join of links with table on link_id, as done before the link index
+    return pd.merge(links, table, how='left', on='link_id')[column].values
+
+
+def test_take_link_values():
+    import rdr_LinkIndex
+    flows = pd.DataFrame({'link_id': ['105', '101', '103', '999'],
+                          'matrix_ab': [5.5, 1.5, 3.5, 9.5]})
+    positions = rdr_LinkIndex.get_link_positions(rdr_LinkIndex.make_link_index(flows['link_id'].values),
+                                                 network_links['link_id'].values)
+    np.testing.assert_array_equal(positions, [1, -1, 2, -1, 0])
+    assert positions.dtype == np.int32
+
+    result = rdr_LinkIndex.take_link_values(flows['matrix_ab'].values, positions)
+    np.testing.assert_array_equal(result, merge_link_values(network_links, flows, 'matrix_ab'))
+    np.testing.assert_array_equal(result, [1.5, np.nan, 3.5, np.nan, 5.5])
+
+
+def test_scatter_link_values_float():
+    import rdr_LinkIndex
+    # link '999' is not in the network, links '102' and '104' are not in the table
+    availabilities = pd.DataFrame({'link_id': ['105', '101', '999', '103'],
+                                   'link_available': [0, 1, 0, 1]})
+    link_index = pd.Index(network_links['link_id'].values)
+    result, found = rdr_LinkIndex.scatter_link_values(link_index, availabilities['link_id'].values,
+                                                      availabilities['link_available'].values)
+
+    # integer values are returned as float, so that links not found are NaN, as in the merge
+    assert result.dtype == float
+    np.testing.assert_array_equal(result, merge_link_values(network_links, availabilities, 'link_available'))
+    np.testing.assert_array_equal(result, [1.0, np.nan, 1.0, np.nan, 0.0])
+    np.testing.assert_array_equal(found, [True, False, True, False, True])
+
+
+def test_scatter_link_values_object():
+    import rdr_LinkIndex
+    true_shape_table = pd.DataFrame({'link_id': ['103', '101', '999'],
+                                     'WKT': ['LINESTRING (3 0, 3 1)', 'LINESTRING (1 0, 1 1)',
+                                             'LINESTRING (9 0, 9 1)']})
+    link_index = pd.Index(network_links['link_id'].values)
+    result, found = rdr_LinkIndex.scatter_link_values(link_index, true_shape_table['link_id'].values,
+                                                      true_shape_table['WKT'].values)
+
+    # string values are kept as objects, with NaN for links not found, as in the merge
+    assert result.dtype == object
+    expected = merge_link_values(network_links, true_shape_table, 'WKT')
+    assert list(result[found]) == list(expected[found])
+    assert pd.isna(result[~found]).all() and pd.isna(expected[~found]).all()
+    assert list(result[found]) == ['LINESTRING (1 0, 1 1)', 'LINESTRING (3 0, 3 1)']
+    np.testing.assert_array_equal(found, [True, False, True, False, False])
+
+    # fill_value is used for links not found
+    result, found = rdr_LinkIndex.scatter_link_values(link_index, true_shape_table['link_id'].values,
+                                                      true_shape_table['WKT'].values, fill_value="")
+    assert list(result[~found]) == ["", "", ""]
+
+
+def test_scatter_link_values_duplicates():
+    import rdr_LinkIndex
+    # link '101' has more than one row in the look-up table; the merge would repeat the network link for each row
+    true_shape_table = pd.DataFrame({'link_id': ['101', '102', '101', '101'],
+                                     'WKT': ['first', 'second', 'third', 'last']})
+    link_index = pd.Index(network_links['link_id'].values)
+    result, found = rdr_LinkIndex.scatter_link_values(link_index, true_shape_table['link_id'].values,
+                                                      true_shape_table['WKT'].values)
+    assert pd.merge(network_links, true_shape_table, how='left', on='link_id').shape[0] == 7
+
+    # the last row of each link is used, the same as a merge with the duplicates dropped keeping the last
+    expected = merge_link_values(network_links, true_shape_table.drop_duplicates('link_id', keep='last'), 'WKT')
+    assert list(result[found]) == list(expected[found])
+    assert list(result[found]) == ['last', 'second']
+    np.testing.assert_array_equal(found, [True, True, False, False, False])
+
+    # the same holds for float values
+    availabilities = pd.DataFrame({'link_id': ['104', '104', '102', '104'],
+                                   'link_available': [0.25, 0.5, 0.75, 1.0]})
+    result, found = rdr_LinkIndex.scatter_link_values(link_index, availabilities['link_id'].values,
+                                                      availabilities['link_available'].values)
+    np.testing.assert_array_equal(result, [np.nan, 0.75, np.nan, 1.0, np.nan])
+
+
+def test_scatter_link_values_empty():
+    import rdr_LinkIndex
+    # no links of the table in the network, e.g. a link availability table of another network
+    link_index = pd.Index(network_links['link_id'].values)
+    result, found = rdr_LinkIndex.scatter_link_values(link_index, np.array(['998', '999'], dtype=object),
+                                                      np.array([0.0, 1.0]))
+    assert np.isnan(result).all()
+    assert not found.any()
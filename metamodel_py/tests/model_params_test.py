@@ -0,0 +1,141 @@
+# Tests of the typed JSON snapshot of the sheets of Model_Parameters.xlsx read by rdr_supporting.read_model_params,
+# and of the validation of the sheets when the snapshot is compiled
+# Local test:
+#   conda activate RDRenv
+#   cd C:/GitHub/RDR
+#   pytest
+# or to run just this file
+#   python -m pytest metamodel_py/tests/model_params_test.py -v
+# use pytest flag -rP for extra summary info for passed tests, -rx for failed tests
+
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+import pytest
+
+logger = logging.getLogger('model_params_test')
+
+
+def get_sheets():
+    # a small model parameters workbook; project groups and IDs are numbers in Excel, and the blank row of
+    # the Hazards tab is dropped
+    return {'EconomicScenarios': pd.DataFrame({'Economic Scenarios': ['base', 'urban']}),
+            'Elasticities': pd.DataFrame({'Trip Loss Elasticities': [-1, -0.5]}),
+            'ProjectGroups': pd.DataFrame({'Project Groups': [1, 2, 3], 'Project ID': ['no', 101, 'L2']}),
+            'Hazards': pd.DataFrame({'Hazard Event': ['flood', None, 'quake'],
+                                     'Filename': ['flood.csv', None, 'quake.csv'],
+                                     'HazardDim1': [100, None, 500.0], 'HazardDim2': [1, None, 2],
+                                     'Event Probability in Start Year': [0.01, None, None],
+                                     'Description': ['river flood', None, 'earthquake']}),
+            'RecoveryStages': pd.DataFrame({'Recovery Stages': [0, 1, 2]}),
+            'FrequencyFactors': pd.DataFrame({'Event Frequency Factors': [1, 2.5]})}
+
+
+def write_model_params(folder, sheets):
+    model_params_file = os.path.join(folder, 'Model_Parameters.xlsx')
+    with pd.ExcelWriter(model_params_file) as writer:
+        for sheet_name, sheet in sheets.items():
+            sheet.to_excel(writer, sheet_name=sheet_name, index=False)
+    return model_params_file
+
+
+def test_read_model_params(tmp_path):
+    import rdr_supporting
+    model_params_file = write_model_params(str(tmp_path), get_sheets())
+
+    hazards = rdr_supporting.read_model_params(model_params_file, 'Hazards', logger)
+    assert list(hazards.columns) == ['Hazard Event', 'Filename', 'HazardDim1', 'HazardDim2',
+                                     'Event Probability in Start Year']
+    assert hazards['Hazard Event'].tolist() == ['flood', 'quake']
+    assert hazards['HazardDim1'].dtype == np.int64 and hazards['HazardDim1'].tolist() == [100, 500]
+    assert hazards['Event Probability in Start Year'].dtype == np.float64
+    assert np.isnan(hazards['Event Probability in Start Year'][1])
+
+    # str columns are strings, with whole numbers written without a decimal point
+    project_groups = rdr_supporting.read_model_params(model_params_file, 'ProjectGroups', logger,
+                                                      usecols=['Project ID'])
+    assert list(project_groups.columns) == ['Project ID']
+    assert project_groups['Project ID'].tolist() == ['no', '101', 'L2']
+    recovery = rdr_supporting.read_model_params(model_params_file, 'RecoveryStages', logger)
+    assert recovery['Recovery Stages'].tolist() == ['0', '1', '2']
+    elasticities = rdr_supporting.read_model_params(model_params_file, 'Elasticities', logger)
+    assert elasticities['Trip Loss Elasticities'].tolist() == [-1.0, -0.5]
+
+    # columns that are not in the schema of the sheet cannot be read
+    with pytest.raises(Exception, match='MODEL PARAMETERS FILE ERROR'):
+        rdr_supporting.read_model_params(model_params_file, 'Hazards', logger, usecols=['Description'])
+
+
+def test_model_params_snapshot(tmp_path, monkeypatch):
+    import rdr_supporting
+    model_params_file = write_model_params(str(tmp_path), get_sheets())
+    rdr_supporting.read_model_params(model_params_file, 'Hazards', logger)
+
+    # the snapshot is JSON next to the workbook, with its version and the column types
+    snapshot_file = os.path.join(str(tmp_path), 'Model_Parameters' + rdr_supporting.MODEL_PARAMS_SNAPSHOT_EXT)
+    with open(snapshot_file, 'r') as f:
+        snapshot = json.load(f)
+    assert snapshot['version'] == rdr_supporting.MODEL_PARAMS_SNAPSHOT_VERSION
+    assert snapshot['schemas'] == rdr_supporting.MODEL_PARAMS_SCHEMAS
+    assert snapshot['sheets']['Hazards']['Event Probability in Start Year'] == [0.01, None]
+
+    # a new process reads the snapshot instead of the workbook, also after the workbook is copied
+    def compile_model_params(model_params_file, logger):
+        raise AssertionError("workbook compiled again")
+    monkeypatch.setattr(rdr_supporting, 'compile_model_params', compile_model_params)
+    rdr_supporting._model_params_cache.clear()
+    assert rdr_supporting.read_model_params(model_params_file, 'Hazards', logger).shape == (2, 5)
+    os.utime(model_params_file, (0, os.path.getmtime(model_params_file) + 10))
+    rdr_supporting._model_params_cache.clear()
+    assert rdr_supporting.read_model_params(model_params_file, 'Hazards', logger).shape == (2, 5)
+    monkeypatch.undo()
+
+    # the snapshot is compiled again when the workbook changes, or if it cannot be read
+    sheets = get_sheets()
+    sheets['EconomicScenarios'] = pd.DataFrame({'Economic Scenarios': ['base', 'urban', 'rural']})
+    write_model_params(str(tmp_path), sheets)
+    os.utime(model_params_file, (0, os.path.getmtime(model_params_file) + 20))
+    socio = rdr_supporting.read_model_params(model_params_file, 'EconomicScenarios', logger)
+    assert socio['Economic Scenarios'].tolist() == ['base', 'urban', 'rural']
+
+    with open(snapshot_file, 'w') as f:
+        f.write('{"version": ')
+    rdr_supporting._model_params_cache.clear()
+    socio = rdr_supporting.read_model_params(model_params_file, 'EconomicScenarios', logger)
+    assert socio['Economic Scenarios'].tolist() == ['base', 'urban', 'rural']
+    with open(snapshot_file, 'r') as f:
+        assert json.load(f)['sheets']['EconomicScenarios']['Economic Scenarios'] == ['base', 'urban', 'rural']
+
+
+@pytest.mark.parametrize('sheet_name, column, values, match', [
+    ('Hazards', 'HazardDim1', [100, None, 'high'], "HazardDim1 column of Hazards tab .* value 'high' on row 4"),
+    ('Hazards', 'HazardDim2', [1, None, 2.5], "HazardDim2 column of Hazards tab .* on row 4"),
+    ('Hazards', 'HazardDim2', [1, None, None], "HazardDim2 column of Hazards tab .* on row 4"),
+    ('Elasticities', 'Trip Loss Elasticities', [-1, 'x'], "Trip Loss Elasticities column of Elasticities tab"),
+])
+def test_model_params_invalid_values(tmp_path, sheet_name, column, values, match):
+    import rdr_supporting
+    sheets = get_sheets()
+    sheets[sheet_name][column] = values
+    model_params_file = write_model_params(str(tmp_path), sheets)
+    with pytest.raises(Exception, match='MODEL PARAMETERS FILE ERROR: ' + match):
+        rdr_supporting.read_model_params(model_params_file, 'EconomicScenarios', logger)
+    assert not os.path.exists(os.path.join(str(tmp_path), 'Model_Parameters' + rdr_supporting.MODEL_PARAMS_SNAPSHOT_EXT))
+
+
+def test_model_params_missing_columns(tmp_path):
+    import rdr_supporting
+    sheets = get_sheets()
+    sheets['Hazards'] = sheets['Hazards'].drop(columns=['HazardDim2'])
+    model_params_file = write_model_params(str(tmp_path), sheets)
+    with pytest.raises(Exception, match="Hazards tab of .* is missing required columns \\['HazardDim2'\\]"):
+        rdr_supporting.read_model_params(model_params_file, 'EconomicScenarios', logger)
+
+    # a missing sheet is also an error
+    sheets = get_sheets()
+    del sheets['FrequencyFactors']
+    model_params_file = write_model_params(str(tmp_path), sheets)
+    with pytest.raises(Exception, match='MODEL PARAMETERS FILE ERROR'):
+        rdr_supporting.read_model_params(model_params_file, 'EconomicScenarios', logger)
@@ -0,0 +1,82 @@
+# Tests of the repair cost and time tables of the recovery initialization module (rdr_RecoveryInit) on a small input
+# folder, including a resilience project that is not in the project table
+# Local test:
+#   conda activate RDRenv
+#   cd C:/GitHub/RDR
+#   pytest
+# or to run just this file
+#   python -m pytest metamodel_py/tests/recovery_init_test.py -v
+# use pytest flag -rP for extra summary info for passed tests, -rx for failed tests
+
+import os
+import logging
+import pandas as pd
+
+logger = logging.getLogger('recovery_init_test')
+# the config and result levels are added to the logger of a run by rdr_supporting.create_loggers
+logger.config = logger.info
+logger.result = logger.info
+
+
+def write_inputs(input_folder):
+    # one network, one hazard event, and a repair cost and time for each category and facility type
+    for folder in ['Networks', 'Hazards', 'LookupTables']:
+        os.makedirs(os.path.join(input_folder, folder), exist_ok=True)
+    pd.DataFrame({'link_id': ['11', '12', '13'], 'from_node_id': ['1', '2', '3'], 'to_node_id': ['2', '3', '4'],
+                  'length': [1.0, 2.0, 0.5], 'lanes': [2, 1, 2],
+                  'facility_type': ['1', '2', '1']}).to_csv(os.path.join(input_folder, 'Networks', 'base01.csv'),
+                                                            index=False)
+    pd.DataFrame({'link_id': ['11', '12', '13'],
+                  'depth': [1.5, 0.0, 3.0]}).to_csv(os.path.join(input_folder, 'Hazards', 'flood.csv'), index=False)
+    pd.DataFrame({'Project ID': ['P1', 'P1', 'P3'], 'link_id': ['11', '13', '12'],
+                  'Category': ['Highway', 'Highway', 'Highway']}).to_csv(
+        os.path.join(input_folder, 'LookupTables', 'project_table.csv'), index=False)
+
+    repair_cost_csv = os.path.join(input_folder, 'repair_costs.csv')
+    pd.DataFrame({'Asset Type': ['Highway', 'Highway'], 'Facility Type': ['1', '2'],
+                  'Damage Repair Cost': [100.0, 200.0], 'Total Repair Cost': [1000.0, 2000.0]}).to_csv(
+        repair_cost_csv, index=False)
+    repair_time_csv = os.path.join(input_folder, 'repair_times.csv')
+    pd.DataFrame({'Asset Type': ['Highway'], 'min_inclusive': [0.0], 'max_exclusive': [10.0],
+                  'repair_time': [30.0]}).to_csv(repair_time_csv, index=False)
+    return repair_cost_csv, repair_time_csv
+
+
+def get_cfg(repair_cost_csv, repair_time_csv):
+    # scenario space of a UI run; resilience project P2 is in the project groups but not in the project table
+    return {'cfg_type': 'json', 'run_id': 'test',
+            'projects': pd.DataFrame({'Project Groups': ['01', '01'], 'Project ID': ['P1', 'P2']}),
+            'hazards': pd.DataFrame({'Hazard Event': ['flood'], 'Filename': ['flood'], 'HazardDim1': [100],
+                                     'HazardDim2': [1], 'Event Probability in Start Year': [0.01]}),
+            'socios': pd.DataFrame({'Economic Scenarios': ['base']}),
+            'elasticities': [-1.0], 'event_frequencies': [1.0], 'recovery_stages': ['0', '1'],
+            'min_duration': 2, 'max_duration': 2, 'num_duration_cases': 1, 'hazard_recov_type': 'days',
+            'hazard_recov_length': 1, 'hazard_recov_path_model': 'equal',
+            'resil_mitigation_approach': 'binary', 'exposure_field': 'depth', 'exposure_damage_approach': 'binary',
+            'repair_cost_approach': 'user-defined', 'repair_cost_csv': repair_cost_csv,
+            'repair_time_approach': 'user-defined', 'repair_time_csv': repair_time_csv}
+
+
+def test_project_not_in_project_table(tmp_path):
+    import rdr_RecoveryInit
+    input_folder = os.path.join(str(tmp_path), 'inputs')
+    output_folder = os.path.join(str(tmp_path), 'outputs')
+    os.makedirs(output_folder)
+    cfg = get_cfg(*write_inputs(input_folder))
+    rdr_RecoveryInit.main(input_folder, output_folder, cfg, logger)
+
+    # the links of project P1 keep their link ids, and project P2 has one row with no link
+    repair_calculator = pd.read_csv(os.path.join(output_folder, 'repair_calculator_test.csv'),
+                                    dtype={'link_id': str})
+    p1_links = repair_calculator.loc[repair_calculator['Resiliency Project'] == 'P1', 'link_id']
+    assert sorted(p1_links.unique()) == ['11', '13']
+    p2_links = repair_calculator.loc[repair_calculator['Resiliency Project'] == 'P2', 'link_id']
+    assert p2_links.shape[0] == 1 and p2_links.isna().all()
+
+    # repair costs are calculated for project P1 only, from the links exposed to the flood
+    repair_output = pd.read_csv(os.path.join(output_folder, 'scenario_repair_output_test.csv'))
+    repair_output = repair_output.set_index('Resiliency Project')
+    assert repair_output.loc['P1', 'baseline_damage_repair'] == 100.0 * 1.0 * 2 + 100.0 * 0.5 * 2
+    assert repair_output.loc['P1', 'project_damage_repair'] == 0.0
+    assert repair_output.loc['P1', 'baseline_repair_time'] == 30.0
+    assert repair_output.loc['P2', 'baseline_damage_repair'] == 0.0
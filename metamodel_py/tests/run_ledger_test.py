@@ -0,0 +1,123 @@
+# Tests of the run ledger matching of disrupt runs with identical disrupted networks (rdr_RunLedger.find_network_match)
+# and of the reuse of the outputs of the matching run (rdr_AESingleRun.alias_disrupt_run)
+# Local test:
+#   conda activate RDRenv
+#   cd C:/GitHub/RDR
+#   pytest
+# or to run just this file
+#   python -m pytest metamodel_py/tests/run_ledger_test.py -v
+# use pytest flag -rP for extra summary info for passed tests, -rx for failed tests
+
+import os
+import logging
+import pandas as pd
+
+logger = logging.getLogger('run_ledger_test')
+
+cfg = {'run_id': 'test', 'calc_transit_metrics': False, 'aeq_run_type': 'SP', 'save_output_format': 'csv',
+       'intermediate_format': 'csv'}
+
+netskim_header = ('Type,SP/RT,socio,projgroup,resil,elasticity,hazard,recovery,Scenario,trips,miles,hours,'
+                  'lost_trips,extra_miles,extra_hours,circuitous_trips_removed')
+
+
+def get_run_params(**kwargs):
+    run_params = {'socio': 'base', 'projgroup': '00', 'resil': 'no', 'elasticity': -1.0, 'hazard': 'haz1',
+                  'recovery': '0', 'matrix_name': 'matrix', 'run_minieq': 1}
+    run_params.update(kwargs)
+    return run_params
+
+
+def start_disrupt_run(ledger_file, run_key, run_params, network_file):
+    import rdr_RunLedger
+    import rdr_AESingleRun
+    rdr_RunLedger.start_run(ledger_file, run_key, 'disrupt', run_params, cfg)
+    network_hash = rdr_AESingleRun.get_network_hash(run_params, network_file, ledger_file, cfg, 'base_fingerprint')
+    rdr_RunLedger.set_network_hash(ledger_file, run_key, network_hash)
+    return network_hash
+
+
+def test_find_network_match(tmp_path):
+    import rdr_RunLedger
+    ledger_file = rdr_RunLedger.get_ledger_file(str(tmp_path))
+    network_file = os.path.join(str(tmp_path), 'Group00_no_haz1_0.csv')
+    with open(network_file, 'w') as wf:
+        wf.write('link_id,link_available\n1,0\n2,1\n')
+
+    first_key = 'aeq_runs/disrupt/test/base00_no_10_haz1_0/matrix'
+    first_hash = start_disrupt_run(ledger_file, first_key, get_run_params(), network_file)
+    # a run that is not complete is not matched
+    assert rdr_RunLedger.find_network_match(ledger_file, first_hash, 'other') == []
+    rdr_RunLedger.complete_run(ledger_file, first_key)
+
+    # same disrupted network and settings, e.g. a different recovery stage with the same link availability
+    second_key = 'aeq_runs/disrupt/test/base00_no_10_haz1_1/matrix'
+    second_hash = start_disrupt_run(ledger_file, second_key, get_run_params(recovery='1'), network_file)
+    assert second_hash == first_hash
+    assert rdr_RunLedger.find_network_match(ledger_file, second_hash, second_key) == [first_key]
+
+    # a changed elasticity or run_minieq changes the outputs, so the run is not matched
+    elasticity_key = 'aeq_runs/disrupt/test/base00_no_5_haz1_0/matrix'
+    elasticity_hash = start_disrupt_run(ledger_file, elasticity_key, get_run_params(elasticity=-0.5), network_file)
+    assert rdr_RunLedger.find_network_match(ledger_file, elasticity_hash, elasticity_key) == []
+
+    minieq_key = 'aeq_runs/disrupt/test/base00_no_10_haz1_2/matrix'
+    minieq_hash = start_disrupt_run(ledger_file, minieq_key, get_run_params(recovery='2', run_minieq=0), network_file)
+    assert rdr_RunLedger.find_network_match(ledger_file, minieq_hash, minieq_key) == []
+
+    # a changed disrupted network is not matched
+    with open(network_file, 'w') as wf:
+        wf.write('link_id,link_available\n1,1\n2,1\n')
+    network_key = 'aeq_runs/disrupt/test/base00_no_10_haz1_3/matrix'
+    network_hash = start_disrupt_run(ledger_file, network_key, get_run_params(recovery='3'), network_file)
+    assert rdr_RunLedger.find_network_match(ledger_file, network_hash, network_key) == []
+
+
+def test_alias_disrupt_run(tmp_path):
+    import rdr_AESingleRun
+    match_run_folder = os.path.join(str(tmp_path), 'base00_no_10_haz1_0', 'matrix')
+    disrupt_run_folder = os.path.join(str(tmp_path), 'base00_no_10_haz1_1', 'matrix')
+    for run_folder in [match_run_folder, disrupt_run_folder]:
+        os.makedirs(os.path.join(run_folder, 'matrices'))
+    for match_file in ['sp_disrupt_base00_no_10_haz1_0.omx', 'new_demand_summed.omx']:
+        with open(os.path.join(match_run_folder, 'matrices', match_file), 'w') as wf:
+            wf.write(match_file)
+    with open(os.path.join(match_run_folder, 'NetSkim.csv'), 'w') as wf:
+        wf.write(netskim_header + '\n')
+        wf.write('Base,SP,base,00,no,-1.0,haz1,0,base00,100.5,200.25,30.125\n')
+        # a quoted field with a comma does not shift the columns
+        wf.write('Disrupt,SP,base,00,no,-1.0,"haz1,a",0,base00_no_10_haz1_0,90.5,210.25,35.125,10.0,10.0,5.0,0.0\n')
+
+    # elasticity as given in the run parameters, e.g. an int
+    run_params = get_run_params(recovery='1', elasticity=-1)
+    assert rdr_AESingleRun.alias_disrupt_run(run_params, match_run_folder, disrupt_run_folder, cfg, logger)
+
+    # skims are copied under the scenario name of the aliased run
+    with open(os.path.join(disrupt_run_folder, 'matrices', 'sp_disrupt_base00_no_10_haz1_1.omx'), 'r') as rf:
+        assert rf.read() == 'sp_disrupt_base00_no_10_haz1_0.omx'
+    assert os.path.exists(os.path.join(disrupt_run_folder, 'matrices', 'new_demand_summed.omx'))
+
+    # scenario columns of NetSkim.csv are relabeled, the metrics are unchanged
+    netskim = pd.read_csv(os.path.join(disrupt_run_folder, 'NetSkim.csv'), dtype={'projgroup': str, 'recovery': str})
+    assert ','.join(netskim.columns) == netskim_header
+    assert netskim.iloc[:, :9].values.tolist() == [
+        ['Base', 'SP', 'base', '00', 'no', -1.0, 'haz1', '1', 'base00'],
+        ['Disrupt', 'SP', 'base', '00', 'no', -1.0, 'haz1', '1', 'base00_no_10_haz1_1']]
+    assert netskim.iloc[0, 9:12].tolist() == [100.5, 200.25, 30.125]
+    assert netskim.iloc[0, 12:].isna().all()
+    assert netskim.iloc[1, 9:].tolist() == [90.5, 210.25, 35.125, 10.0, 10.0, 5.0, 0.0]
+
+
+def test_alias_disrupt_run_missing_output(tmp_path):
+    import rdr_AESingleRun
+    match_run_folder = os.path.join(str(tmp_path), 'base00_no_10_haz1_0', 'matrix')
+    disrupt_run_folder = os.path.join(str(tmp_path), 'base00_no_10_haz1_1', 'matrix')
+    for run_folder in [match_run_folder, disrupt_run_folder]:
+        os.makedirs(os.path.join(run_folder, 'matrices'))
+    with open(os.path.join(match_run_folder, 'NetSkim.csv'), 'w') as wf:
+        wf.write(netskim_header + '\n')
+
+    # the skims of the matching run are missing, so the run is done normally
+    assert not rdr_AESingleRun.alias_disrupt_run(get_run_params(recovery='1'), match_run_folder, disrupt_run_folder,
+                                                 cfg, logger)
+    assert not os.path.exists(os.path.join(disrupt_run_folder, 'NetSkim.csv'))
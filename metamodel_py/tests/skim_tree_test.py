@@ -0,0 +1,202 @@
+# Tests of the shortest path skims of a disrupted network from the shortest path trees of the base network skim
+# (rdr_AESkimTree) against a full AequilibraE NetworkSkimming of the disrupted network, and of the fallback to a full
+# skim when the trees cannot be used
+# Local test:
+#   conda activate RDRenv
+#   cd C:/GitHub/RDR
+#   pytest
+# or to run just this file
+#   python -m pytest metamodel_py/tests/skim_tree_test.py -v
+# use pytest flag -rP for extra summary info for passed tests, -rx for failed tests
+
+import os
+import sqlite3
+import logging
+import numpy as np
+import pandas as pd
+import openmatrix as omx
+
+logger = logging.getLogger('skim_tree_test')
+
+centroids = [1, 2, 3, 4]
+
+
+def write_network(folder, seed):
+    # 4 x 4 grid of two-way links between nodes 101..116, with centroids 1..4 connected to the corners and the middle
+    # travel times are random so that no two paths have the same cost (equal-cost paths may be resolved differently
+    # by a full skim, see rdr_AESkimTree)
+    rng = np.random.default_rng(seed)
+    node_ids = np.arange(101, 117).reshape(4, 4)
+    pairs = []
+    for i in range(4):
+        for j in range(3):
+            pairs.append((node_ids[i, j], node_ids[i, j + 1]))
+            pairs.append((node_ids[j, i], node_ids[j + 1, i]))
+    pairs = pairs + [(1, 101), (2, 104), (3, 113), (4, 116), (4, 106)]
+    rows = []
+    for a, b in pairs:
+        for from_node, to_node in [(a, b), (b, a)]:
+            rows.append({'link_id': str(len(rows) + 1), 'from_node_id': str(from_node), 'to_node_id': str(to_node),
+                         'directed': 1, 'length': round(rng.uniform(0.5, 2.0), 3), 'facility_type': '1',
+                         'capacity': 1000.0, 'free_speed': 30.0, 'allowed_uses': 'c',
+                         'travel_time': rng.uniform(1.0, 5.0), 'toll': 0.0, 'alpha': 0.15, 'beta': 4.0,
+                         'link_available': 1.0})
+    links = pd.DataFrame(rows)
+    base_network_file = os.path.join(folder, 'base00.csv')
+    links.to_csv(base_network_file, index=False)
+
+    network_db = os.path.join(folder, 'project_database.sqlite')
+    with sqlite3.connect(network_db) as db_con:
+        db_con.execute("create table nodes (node_id integer, is_centroid integer);")
+        db_con.executemany("insert into nodes values (?, ?);",
+                           [(i, 1) for i in centroids] + [(int(i), 0) for i in node_ids.flatten()])
+    db_con.close()
+    return links, base_network_file, network_db
+
+
+def write_disrupted_network(folder, links, removed, name):
+    # removed links get link_available = 0, and capacity is multiplied by link_available, as in the network files of
+    # disrupt runs
+    links = links.copy()
+    links.loc[removed, 'link_available'] = 0.0
+    links['capacity'] = links['capacity'] * links['link_available']
+    network_file = os.path.join(folder, name + '.csv')
+    links.to_csv(network_file, index=False)
+    return network_file
+
+
+def skim_graph(graph, blocked_centroid_flows=True):
+    # as set up for the shortest path skims by open_project_graph in rdr_AERouteBase
+    graph.set_graph('free_flow_time')
+    graph.set_skimming(['free_flow_time', 'distance'])
+    graph.set_blocked_centroid_flows(blocked_centroid_flows)
+    return graph
+
+
+def full_skim(graph):
+    from aequilibrae.paths import NetworkSkimming
+    skimming = NetworkSkimming(graph)
+    skimming.execute()
+    return {skim_field: skimming.results.skims.matrix_view[:, :, i].copy()
+            for i, skim_field in enumerate(graph.skim_fields)}
+
+
+def read_skim(skim_file):
+    f = omx.open_file(skim_file, 'r')
+    skims = {skim_field: np.array(f[skim_field]) for skim_field in f.list_matrices()}
+    f.close()
+    return skims
+
+
+def assert_skims_equal(skims, expected):
+    assert sorted(skims.keys()) == sorted(expected.keys())
+    for skim_field in expected:
+        np.testing.assert_array_equal(skims[skim_field], expected[skim_field])
+
+
+def test_disrupt_skim_parity(tmp_path):
+    import rdr_AEGraph
+    import rdr_AESkimTree
+    folder = str(tmp_path)
+    links, base_network_file, network_db = write_network(folder, 8888)
+    rng = np.random.default_rng(8888)
+
+    for blocked_centroid_flows in [True, False]:
+        base_skim_file = os.path.join(folder, 'sp_base00_{}.omx'.format(blocked_centroid_flows))
+        base_graph = skim_graph(rdr_AEGraph.build_car_graph(base_network_file, network_db, logger),
+                                blocked_centroid_flows)
+        rdr_AESkimTree.run_base_skim(base_graph, base_skim_file, logger)
+        assert os.path.exists(rdr_AESkimTree.get_tree_file(base_skim_file))
+        assert_skims_equal(read_skim(base_skim_file), full_skim(base_graph))
+
+        # no links removed, one link, several links, and all links of a centroid (which becomes unreachable)
+        removed_sets = [[], [0], list(rng.choice(links.shape[0], 6, replace=False)),
+                        list(links.index[(links['from_node_id'] == '4') | (links['to_node_id'] == '4')])]
+        for k, removed in enumerate(removed_sets):
+            network_file = write_disrupted_network(folder, links, removed, 'disrupt{}_{}'.format(k, blocked_centroid_flows))
+            skim_file = os.path.join(folder, 'sp_disrupt{}_{}.omx'.format(k, blocked_centroid_flows))
+
+            graph = skim_graph(rdr_AEGraph.build_disrupted_car_graph(network_file, base_network_file, 'matrix',
+                                                                     network_db, logger), blocked_centroid_flows)
+            assert rdr_AESkimTree.run_disrupt_skim(graph, network_file, base_network_file, skim_file, base_skim_file,
+                                                   logger)
+            # the full skim is run on a new graph, as skimming changes the graph
+            expected = full_skim(skim_graph(rdr_AEGraph.build_car_graph(network_file, network_db, logger),
+                                            blocked_centroid_flows))
+            assert_skims_equal(read_skim(skim_file), expected)
+
+
+def test_disrupt_skim_first_centroid_removed(tmp_path):
+    import rdr_AEGraph
+    import rdr_AESkimTree
+    from aequilibrae.paths import Graph
+    folder = str(tmp_path)
+    links, base_network_file, network_db = write_network(folder, 8888)
+    base_skim_file = os.path.join(folder, 'sp_base00.omx')
+    rdr_AESkimTree.run_base_skim(skim_graph(rdr_AEGraph.build_car_graph(base_network_file, network_db, logger)),
+                                 base_skim_file, logger)
+
+    # all links of the first centroid are removed; NetworkSkimming is not used as the reference here, as it skims
+    # the first centroid of such a graph anyway (see rdr_AESkimTree.skim_origins)
+    removed = list(links.index[(links['from_node_id'] == '1') | (links['to_node_id'] == '1')])
+    network_file = write_disrupted_network(folder, links, removed, 'disrupt')
+    skim_file = os.path.join(folder, 'sp_disrupt.omx')
+    graph = skim_graph(rdr_AEGraph.build_disrupted_car_graph(network_file, base_network_file, 'matrix', network_db,
+                                                             logger))
+    assert rdr_AESkimTree.run_disrupt_skim(graph, network_file, base_network_file, skim_file, base_skim_file, logger)
+    skims = read_skim(skim_file)
+
+    # the other centroids are skimmed as in a graph without the first centroid
+    other_graph = Graph()
+    other_graph.mode = 'c'
+    other_graph.network = rdr_AEGraph.get_graph_network(rdr_AEGraph.get_network_links(network_file, logger))
+    other_graph.prepare_graph(np.array(centroids[1:], dtype=np.uint32))
+    expected = full_skim(skim_graph(other_graph))
+    for skim_field in expected:
+        # the row of the first centroid is not skimmed, and the first centroid cannot be reached
+        assert np.isnan(skims[skim_field][0, :]).all()
+        assert np.isinf(skims[skim_field][1:, 0]).all()
+        np.testing.assert_array_equal(skims[skim_field][1:, 1:], expected[skim_field])
+
+
+def test_disrupt_skim_fallback(tmp_path):
+    import rdr_AEGraph
+    import rdr_AESkimTree
+    folder = str(tmp_path)
+    links, base_network_file, network_db = write_network(folder, 8888)
+    base_skim_file = os.path.join(folder, 'sp_base00.omx')
+    rdr_AESkimTree.run_base_skim(skim_graph(rdr_AEGraph.build_car_graph(base_network_file, network_db, logger)),
+                                 base_skim_file, logger)
+    network_file = write_disrupted_network(folder, links, [0, 5], 'disrupt')
+    skim_file = os.path.join(folder, 'sp_disrupt.omx')
+
+    def run_disrupt_skim(blocked_centroid_flows=True, network_file=network_file):
+        graph = skim_graph(rdr_AEGraph.build_car_graph(network_file, network_db, logger), blocked_centroid_flows)
+        return rdr_AESkimTree.run_disrupt_skim(graph, network_file, base_network_file, skim_file, base_skim_file,
+                                               logger)
+
+    # graph with a different blocked_centroid_flows setting than the trees
+    assert not run_disrupt_skim(blocked_centroid_flows=False)
+
+    # disrupted network that differs from the base network in more than capacity and link_available
+    changed = links.copy()
+    changed.loc[3, 'travel_time'] = changed.loc[3, 'travel_time'] + 1.0
+    assert not run_disrupt_skim(network_file=write_disrupted_network(folder, changed, [0, 5], 'changed'))
+    assert not run_disrupt_skim(network_file=write_disrupted_network(folder, links.iloc[:-2], [0, 5], 'fewer'))
+
+    # tree file of different centroids, e.g., written by a base run with another node table
+    tree_file = rdr_AESkimTree.get_tree_file(base_skim_file)
+    trees = dict(np.load(tree_file))
+    np.savez_compressed(tree_file, **dict(trees, centroids=trees['centroids'][:-1]))
+    assert not run_disrupt_skim()
+
+    # missing tree file, e.g., a base run of an earlier version
+    os.remove(tree_file)
+    assert not run_disrupt_skim()
+    assert not os.path.exists(skim_file)
+
+    # the trees are written again by the base skim
+    rdr_AESkimTree.run_base_skim(skim_graph(rdr_AEGraph.build_car_graph(base_network_file, network_db, logger)),
+                                 base_skim_file, logger)
+    assert run_disrupt_skim()
+    assert os.path.exists(skim_file)